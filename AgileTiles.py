@@ -287,6 +287,7 @@ class AgileTilesForm(MainAcrylicWindow, Ui_Form):
         self.app_data_db_path = self.toolkit.file_util.get_app_data_db_path(self.app_data_path, self.app_name)
         self.app_data_everything_db_path = self.toolkit.file_util.get_app_data_everything_db_path(self.app_data_path)
         self.app_data_everything_config_path = self.toolkit.file_util.get_app_data_everything_config_path(self.app_data_path)
+        self.app_data_file_index_path = self.toolkit.file_util.get_app_data_file_index_path(self.app_data_path)
         self.app_data_plugin_path = self.toolkit.file_util.get_app_data_plugin_path(self.app_data_path)
         self.app_data_network_path = self.toolkit.file_util.get_app_data_network_path(self.app_data_path)
         self.app_data_image_path = self.toolkit.file_util.get_app_data_image_path(self.app_data_path)
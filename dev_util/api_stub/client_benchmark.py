@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+客户端压测
+
+在本地桩服务上驱动真实的客户端类（CardStoreClient、DataClient、WeatherManager 等），
+按流程统计每秒请求数与 p95 延迟。使用 offscreen 平台，可在 Linux 无界面环境运行。
+
+使用方法:
+    python dev_util/api_stub/client_benchmark.py --requests 200 --concurrency 8 --latency 20
+    python dev_util/api_stub/client_benchmark.py --base-url http://127.0.0.1:6666 --flows weather,chat
+"""
+import os
+import sys
+import json
+import math
+import time
+
+# 无界面运行
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# 项目根目录加入搜索路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, QUrl
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+
+from src.client import common
+from src.client.card_store_client import CardStoreClient
+from src.module.UserData.Sync.data_client import DataClient
+from src.network_manager.WeatherManager.WeatherManager import WeatherManager
+from dev_util.api_stub.stub_server import StubServer, build_arg_parser, config_from_args
+
+
+class BenchmarkContext:
+    """模拟主程序对象，提供客户端需要的属性"""
+    access_token = "Bearer benchmark-token"
+    app_version = "v0.0.0"
+    username = "benchmark"
+
+    class info_logger:
+        @staticmethod
+        def error(message):
+            print(message)
+
+
+class RawPostClient(QObject):
+    """按卡片内的请求方式直接发送POST（翻译、聊天等请求逻辑内嵌在界面中）"""
+
+    def __init__(self, path, payload):
+        super().__init__()
+        self.path = path
+        self.payload = json.dumps(payload).encode("utf-8")
+        self.network_manager = QNetworkAccessManager(self)
+
+    def send(self):
+        request = QNetworkRequest(QUrl(common.BASE_URL + self.path))
+        request.setRawHeader(b"Authorization", bytes(BenchmarkContext.access_token, "utf-8"))
+        request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
+        reply = self.network_manager.post(request, self.payload)
+        # 流式回复需要持续读取，避免缓冲区堆积
+        reply.readyRead.connect(lambda: reply.readAll())
+
+
+def create_card_store_client(context):
+    client = CardStoreClient(context)
+    return client, client.store_network_manager, client.fetch_card_store_list
+
+
+def create_data_client(context):
+    client = DataClient()
+    return client, client.network_manager, lambda: client.pull_data(context.username, context.access_token)
+
+
+def create_weather_client(context):
+    client = WeatherManager(use_parent=context)
+    return client, client.weather_manager, lambda: client.get_weather_forecast("101010100")
+
+
+def create_translate_client(context):
+    client = RawPostClient("/translate/normal", {"text": "你好，世界", "sourceLang": "auto", "targetLang": "en"})
+    return client, client.network_manager, client.send
+
+
+def create_chat_client(context):
+    client = RawPostClient("/chat/normal/stream", {
+        "messages": [{"role": "user", "content": "你好"}], "provider": "benchmark", "model": "benchmark"
+    })
+    return client, client.network_manager, client.send
+
+
+# 流程名称 -> 客户端工厂，工厂返回 (客户端, 网络管理器, 发起请求的方法)
+FLOW_FACTORY_MAP = {
+    "card_store": create_card_store_client,
+    "data": create_data_client,
+    "weather": create_weather_client,
+    "translate": create_translate_client,
+    "chat": create_chat_client,
+}
+
+
+def percentile(sorted_values, percent):
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class FlowBenchmark(QObject):
+    """在固定并发窗口内循环发起同一流程的请求"""
+
+    def __init__(self, app, flow_name, total_requests, concurrency, context):
+        super().__init__()
+        self.app = app
+        self.flow_name = flow_name
+        self.total_requests = total_requests
+        self.sent_count = 0
+        self.done_count = 0
+        self.error_count = 0
+        self.latency_list = []
+        self.start_time = 0.0
+        self.end_time = 0.0
+        # 现有客户端每个实例只跟踪一个进行中的请求，因此每个并发槽位使用独立实例
+        self.slot_list = []
+        for index in range(concurrency):
+            client, network_manager, send = FLOW_FACTORY_MAP[flow_name](context)
+            slot = {"client": client, "send": send, "sent_at": 0.0}
+            network_manager.finished.connect(lambda reply, s=slot: self.on_finished(s, reply))
+            self.slot_list.append(slot)
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        for slot in self.slot_list:
+            self.send_next(slot)
+        if self.sent_count == 0:
+            self.app.quit()
+
+    def send_next(self, slot):
+        if self.sent_count >= self.total_requests:
+            return
+        self.sent_count += 1
+        slot["sent_at"] = time.perf_counter()
+        slot["send"]()
+
+    def on_finished(self, slot, reply):
+        self.latency_list.append((time.perf_counter() - slot["sent_at"]) * 1000.0)
+        if reply.error() != QNetworkReply.NoError:
+            self.error_count += 1
+        self.done_count += 1
+        if self.done_count >= self.total_requests:
+            self.end_time = time.perf_counter()
+            QTimer.singleShot(0, self.app.quit)
+            return
+        # 下一轮放到事件循环中发起，避免在客户端自身的回调处理完成前覆盖其状态
+        QTimer.singleShot(0, lambda: self.send_next(slot))
+
+    def result(self):
+        elapsed = max(self.end_time - self.start_time, 1e-9)
+        sorted_latency = sorted(self.latency_list)
+        return {
+            "flow": self.flow_name,
+            "requests": self.done_count,
+            "errors": self.error_count,
+            "rps": self.done_count / elapsed,
+            "p50_ms": percentile(sorted_latency, 50),
+            "p95_ms": percentile(sorted_latency, 95),
+            "max_ms": sorted_latency[-1] if sorted_latency else 0.0,
+        }
+
+
+def run_benchmark(app, flow_name_list, total_requests, concurrency):
+    context = BenchmarkContext()
+    result_list = []
+    for flow_name in flow_name_list:
+        benchmark = FlowBenchmark(app, flow_name, total_requests, concurrency, context)
+        QTimer.singleShot(0, benchmark.run)
+        app.exec()
+        result_list.append(benchmark.result())
+    return result_list
+
+
+def print_result_list(result_list):
+    print(f"{'flow':<12}{'requests':>10}{'errors':>8}{'rps':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for result in result_list:
+        print(f"{result['flow']:<12}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['max_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    parser.description = "灵卡面板客户端压测（默认启动内置桩服务）"
+    parser.set_defaults(port=0)
+    parser.add_argument("--base-url", default=None, help="使用已启动的服务，不启动内置桩服务")
+    parser.add_argument("--flows", default=",".join(FLOW_FACTORY_MAP.keys()), help="逗号分隔的流程名称")
+    parser.add_argument("--requests", type=int, default=100, help="每个流程的请求总数")
+    parser.add_argument("--concurrency", type=int, default=4, help="每个流程的并发数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args(argv)
+
+    flow_name_list = [name.strip() for name in args.flows.split(",") if name.strip()]
+    for flow_name in flow_name_list:
+        if flow_name not in FLOW_FACTORY_MAP:
+            parser.error(f"未知流程: {flow_name}，可选: {', '.join(FLOW_FACTORY_MAP.keys())}")
+
+    server = None
+    if args.base_url:
+        common.set_base_url(args.base_url)
+    else:
+        server = StubServer(args.host, args.port, args.fixtures, config_from_args(args), quiet=not args.verbose)
+        common.set_base_url(server.start())
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    try:
+        result_list = run_benchmark(app, flow_name_list, args.requests, max(1, args.concurrency))
+    finally:
+        if server is not None:
+            server.stop()
+    if args.json:
+        print(json.dumps(result_list, ensure_ascii=False, indent=4))
+    else:
+        print_result_list(result_list)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
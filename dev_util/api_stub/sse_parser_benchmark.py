@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+SSE解析基准测试
+
+按随机大小的分块把录制（或合成）的对话流喂给 SseParser，统计吞吐量，
+并与原来逐行 del buffer[:n] 的解析方式对比，同时校验两者解析出的增量一致。
+
+使用方法:
+    python dev_util/api_stub/sse_parser_benchmark.py --size 8
+    python dev_util/api_stub/sse_parser_benchmark.py --input recorded_stream.txt --max-chunk 65536
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# 项目根目录加入搜索路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.card.main_card.ChatCard.chat_component.sse_parser import SseParser, decode_event_data
+
+
+def build_stream(size_mb, seed):
+    """合成与桩服务格式相同的对话流（思考内容、回复内容和结束事件）"""
+    rng = random.Random(seed)
+    word_list = ["好的", "我们", "来看", "这个问题", "首先", "然后", "the", "answer", "is", "```python",
+                 "print('hello')", "```", "\n", "。", "，", "**重点**", "- 列表项"]
+    chunk_list = []
+    size = 0
+    target = int(size_mb * 1024 * 1024)
+    while size < target:
+        key = "reasoningContent" if rng.random() < 0.3 else "content"
+        delta = "".join(rng.choice(word_list) for _ in range(rng.randint(1, 6)))
+        line = "data:" + json.dumps({key: delta, "isFinished": False}, ensure_ascii=False) + "\n\n"
+        data = line.encode("utf-8")
+        chunk_list.append(data)
+        size += len(data)
+    chunk_list.append(("data:" + json.dumps({"content": "", "isFinished": True, "finishReason": "stop"})
+                       + "\n\n").encode("utf-8"))
+    return b"".join(chunk_list)
+
+
+def split_stream(stream, max_chunk, seed):
+    """按随机大小切分，模拟网络分包"""
+    rng = random.Random(seed)
+    chunk_list = []
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1, max_chunk)
+        chunk_list.append(stream[position:position + size])
+        position += size
+    return chunk_list
+
+
+def parse_with_sse_parser(chunk_list):
+    parser = SseParser()
+    delta_list = []
+    for chunk in chunk_list:
+        for event in parser.feed(chunk):
+            delta_list.extend(decode_event_data(event.data))
+    for event in parser.finish():
+        delta_list.extend(decode_event_data(event.data))
+    return delta_list
+
+
+def parse_legacy(chunk_list):
+    """原来的解析方式：每行都从缓冲区开头删除"""
+    buffer = bytearray()
+    delta_list = []
+    for chunk in chunk_list:
+        buffer.extend(chunk)
+        while b'\n' in buffer:
+            line_end = buffer.index(b'\n')
+            line = bytes(buffer[:line_end]).decode('utf-8', errors='ignore').strip()
+            del buffer[:line_end + 1]
+            if line.startswith("data:"):
+                delta_list.append(json.loads(line[5:].strip()))
+    return delta_list
+
+
+def run(name, func, chunk_list, total_size, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(chunk_list)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<12} {best * 1000:9.1f} ms  {total_size / 1024 / 1024 / best:8.1f} MB/s  {len(result)} 条增量")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE解析基准测试")
+    parser.add_argument("--input", help="录制的SSE数据文件（不指定时合成）")
+    parser.add_argument("--size", type=float, default=8, help="合成数据大小(MB)")
+    parser.add_argument("--max-chunk", type=int, default=16 * 1024, help="最大分块大小(字节)")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快）")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "rb") as f:
+            stream = f.read()
+    else:
+        stream = build_stream(args.size, args.seed)
+    chunk_list = split_stream(stream, args.max_chunk, args.seed)
+    print(f"数据 {len(stream) / 1024 / 1024:.1f} MB，{len(chunk_list)} 个分块")
+
+    result = run("SseParser", parse_with_sse_parser, chunk_list, len(stream), args.repeat)
+    legacy_result = run("legacy", parse_legacy, chunk_list, len(stream), args.repeat)
+    if result != legacy_result:
+        print("解析结果不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+离线接口桩服务
+
+按录制的 fixtures 回放后端接口，支持注入延迟、带宽限制与失败，用于在没有真实后端时
+对 src/client、src/network_manager 下的各个客户端做回归与压测。
+
+使用方法:
+    python dev_util/api_stub/stub_server.py --port 6666 --latency 50 --bandwidth 256 --failure-rate 0.05
+    然后以 AGILE_TILES_BASE_URL=http://127.0.0.1:6666 启动程序即可
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# 默认fixtures路径
+DEFAULT_FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "default.json")
+# 限速时单次写出的块大小
+CHUNK_SIZE = 4096
+
+
+class StubConfig:
+    """桩服务运行配置"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, bandwidth_kbps=0, failure_rate=0.0, failure_mode="http",
+                 seed=None):
+        """
+        :param latency_ms: 每个请求的固定延迟（毫秒）
+        :param jitter_ms: 延迟随机抖动上限（毫秒）
+        :param bandwidth_kbps: 响应带宽上限（KB/s），0表示不限速
+        :param failure_rate: 失败注入概率（0~1）
+        :param failure_mode: 失败方式，http：返回500，drop：直接断开连接
+        :param seed: 随机种子，便于复现
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def next_delay(self):
+        """计算本次请求的延迟（秒）"""
+        with self.lock:
+            jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms > 0 else 0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self):
+        """判断本次请求是否注入失败"""
+        if self.failure_rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < self.failure_rate
+
+
+def load_fixtures(fixtures_path):
+    """
+    读取fixtures文件，返回 {(method, path): route} 映射
+    路径以 /* 结尾的路由按前缀匹配
+    """
+    with open(fixtures_path, "r", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    route_map = {}
+    for route in fixtures.get("routes", []):
+        method = route.get("method", "GET").upper()
+        route_map[(method, route["path"])] = route
+    return route_map
+
+
+def match_route(route_map, method, path):
+    """根据方法和路径查找路由（先精确匹配，再按最长前缀匹配）"""
+    route = route_map.get((method, path))
+    if route is not None:
+        return route
+    best_route = None
+    best_length = -1
+    for (route_method, route_path), candidate in route_map.items():
+        if route_method != method or not route_path.endswith("/*"):
+            continue
+        prefix = route_path[:-1]
+        if path.startswith(prefix) and len(prefix) > best_length:
+            best_route = candidate
+            best_length = len(prefix)
+    return best_route
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """按fixtures回放响应的请求处理器"""
+    protocol_version = "HTTP/1.1"
+    # 以下由 StubServer 注入
+    route_map = {}
+    config = None
+    stats = None
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.handle_stub_request("GET")
+
+    def do_POST(self):
+        self.handle_stub_request("POST")
+
+    def do_PUT(self):
+        self.handle_stub_request("PUT")
+
+    def do_PATCH(self):
+        self.handle_stub_request("PATCH")
+
+    def do_DELETE(self):
+        self.handle_stub_request("DELETE")
+
+    def handle_stub_request(self, method):
+        # 读取请求体（保证长连接可复用）
+        content_length = int(self.headers.get("Content-Length", 0) or 0)
+        if content_length > 0:
+            self.rfile.read(content_length)
+        path = urlsplit(self.path).path
+        self.stats.record(method, path)
+        # 注入延迟
+        delay = self.config.next_delay()
+        if delay > 0:
+            time.sleep(delay)
+        # 注入失败
+        if self.config.should_fail():
+            self.stats.record_failure()
+            if self.config.failure_mode == "drop":
+                # 不写任何响应直接关闭连接
+                self.close_connection = True
+                return
+            self.send_json(500, {"code": 1, "msg": "桩服务注入失败", "data": None})
+            return
+        route = match_route(self.route_map, method, path)
+        if route is None:
+            self.send_json(404, {"code": 1, "msg": f"未找到fixture: {method} {path}", "data": None})
+            return
+        if "sse" in route:
+            self.send_sse(route)
+        else:
+            self.send_json(route.get("status", 200), route.get("body", {}))
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.write_throttled(data)
+
+    def send_sse(self, route):
+        """以 text/event-stream 逐条回放事件"""
+        interval = route.get("interval_ms", 0) / 1000.0
+        self.send_response(route.get("status", 200))
+        self.send_header("Content-Type", "text/event-stream;charset=UTF-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for event in route["sse"]:
+                self.write_throttled(("data:" + json.dumps(event, ensure_ascii=False) + "\n\n").encode("utf-8"))
+                self.wfile.flush()
+                if interval > 0:
+                    time.sleep(interval)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def write_throttled(self, data):
+        """按带宽上限分块写出"""
+        bandwidth = self.config.bandwidth_kbps * 1024
+        if bandwidth <= 0:
+            self.wfile.write(data)
+            return
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = data[start:start + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            self.wfile.flush()
+            time.sleep(len(chunk) / bandwidth)
+
+
+class StubStats:
+    """请求统计（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_count = {}
+        self.failure_count = 0
+
+    def record(self, method, path):
+        with self.lock:
+            key = f"{method} {path}"
+            self.request_count[key] = self.request_count.get(key, 0) + 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failure_count += 1
+
+
+class StubServer:
+    """可在后台线程中启动/停止的桩服务"""
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures_path=DEFAULT_FIXTURES_PATH, config=None, quiet=True):
+        self.stats = StubStats()
+        handler = type("BoundStubRequestHandler", (StubRequestHandler,), {
+            "route_map": load_fixtures(fixtures_path),
+            "config": config or StubConfig(),
+            "stats": self.stats,
+            "quiet": quiet,
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程启动服务，返回基础路径"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="api-stub-server", daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="灵卡面板离线接口桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6666)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_PATH, help="fixtures文件路径")
+    parser.add_argument("--latency", type=float, default=0, help="固定延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="延迟抖动上限（毫秒）")
+    parser.add_argument("--bandwidth", type=float, default=0, help="带宽上限（KB/s），0为不限")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="失败注入概率（0~1）")
+    parser.add_argument("--failure-mode", choices=["http", "drop"], default="http", help="失败方式")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--verbose", action="store_true", help="打印访问日志")
+    return parser
+
+
+def config_from_args(args):
+    return StubConfig(latency_ms=args.latency, jitter_ms=args.jitter, bandwidth_kbps=args.bandwidth,
+                      failure_rate=args.failure_rate, failure_mode=args.failure_mode, seed=args.seed)
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    server = StubServer(args.host, args.port, args.fixtures, config_from_args(args), quiet=not args.verbose)
+    print(f"桩服务已启动: {server.base_url}")
+    print(f"使用方式: AGILE_TILES_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print("请求统计:", json.dumps(server.stats.request_count, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
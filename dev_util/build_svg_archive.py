@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+生成svg图标归档（static/icon/svg_icon.pack），格式见 src/ui/svg_archive.py
+
+使用方法:
+    从 IconPark 图标目录生成:
+        python dev_util/build_svg_archive.py --svg-dir ./resources/img/IconPark/svg
+    从旧的 svg_dict.py 迁移:
+        python dev_util/build_svg_archive.py --from-dict ./src/ui/svg_dict.py
+"""
+import os
+import ast
+import sys
+import json
+import struct
+import argparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.ui.svg_archive import SVG_ARCHIVE_MAGIC, SVG_ARCHIVE_INDEX_LENGTH_FORMAT
+
+DEFAULT_OUTPUT_PATH = os.path.join(PROJECT_ROOT, "static", "icon", "svg_icon.pack")
+
+
+def read_svg_dir(root_dir):
+    """读取 IconPark 图标目录，返回 {分类: {名称: svg字符串}}"""
+    svg_map = {}
+    root_dir = os.path.abspath(root_dir)
+    for parent, dirnames, filenames in os.walk(root_dir):
+        for filename in filenames:
+            if not filename.endswith(".svg"):
+                continue
+            svg_type = os.path.relpath(parent, root_dir).split(os.sep)[0]
+            if svg_type == ".":
+                continue
+            with open(os.path.join(parent, filename), "r", encoding="utf-8") as f:
+                svg_str = f.read()
+            # 处理掉蓝色底色
+            svg_str = (svg_str
+                       .replace(' fill="#2F88FF"', "")
+                       .replace(' fill="#43CCF8"', "")
+                       .replace('white', "black"))
+            svg_map.setdefault(svg_type, {})[filename[:-len(".svg")]] = svg_str
+    return svg_map
+
+
+def read_svg_dict_file(dict_path):
+    """读取旧的 svg_dict.py（svg_dict={...}），不执行模块代码"""
+    with open(dict_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    _, _, literal = content.partition("=")
+    return ast.literal_eval(literal.strip())
+
+
+def write_svg_archive(svg_map, output_path=DEFAULT_OUTPUT_PATH):
+    """将 {分类: {名称: svg字符串}} 写入归档（按分类、名称排序，相同输入生成的文件完全一致）"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    index = {}
+    data_list = []
+    offset = 0
+    for svg_type in sorted(svg_map):
+        index[svg_type] = {}
+        for svg_name in sorted(svg_map[svg_type]):
+            data = svg_map[svg_type][svg_name].encode("utf-8")
+            index[svg_type][svg_name] = [offset, len(data)]
+            data_list.append(data)
+            offset += len(data)
+    index_data = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with open(output_path, "wb") as f:
+        f.write(SVG_ARCHIVE_MAGIC)
+        f.write(struct.pack(SVG_ARCHIVE_INDEX_LENGTH_FORMAT, len(index_data)))
+        f.write(index_data)
+        for data in data_list:
+            f.write(data)
+    return len(data_list)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成svg图标归档")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--svg-dir", help="IconPark svg 图标目录")
+    source_group.add_argument("--from-dict", help="旧的 svg_dict.py 路径")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="归档输出路径")
+    args = parser.parse_args(argv)
+
+    if args.svg_dir:
+        svg_map = read_svg_dir(args.svg_dir)
+    else:
+        svg_map = read_svg_dict_file(args.from_dict)
+    count = write_svg_archive(svg_map, args.output)
+    print(f"已写入 {count} 个图标: {args.output} ({os.path.getsize(args.output)} 字节)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
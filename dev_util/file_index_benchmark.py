@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+内置文件索引基准测试
+
+生成合成目录树（默认一百万个文件），统计首次建立索引、无变化增量刷新、少量变化增量刷新的耗时，
+以及子串、通配符、多关键词查询的耗时。Windows上可加 --everything 同时测试Everything后端（结果约定相同）。
+
+使用方法:
+    python dev_util/file_index_benchmark.py --files 1000000 --tree /tmp/file_index_tree
+    python dev_util/file_index_benchmark.py --tree D:/Data --no-generate --everything
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# 项目根目录加入搜索路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.thread_list.file_index_searcher import FileIndexSearcher
+
+WORD_LIST = ["report", "photo", "backup", "invoice", "project", "readme", "config", "data", "music", "video",
+             "报告", "照片", "项目", "笔记", "合同", "final", "draft", "old", "new", "test"]
+SUFFIX_LIST = ["txt", "md", "py", "jpg", "png", "mp3", "mp4", "pdf", "docx", "xlsx", "zip", "json"]
+QUERY_LIST = ["report", "照片", "final_", "*.pdf", "project*.py", "data 2023", "zzzz", "a"]
+
+
+def generate_tree(root, file_count, files_per_dir, seed):
+    """生成合成目录树（只创建空文件）"""
+    rng = random.Random(seed)
+    dir_list = [root]
+    created = 0
+    while created < file_count:
+        parent = rng.choice(dir_list[-200:])
+        path = os.path.join(parent, f"{rng.choice(WORD_LIST)}_{len(dir_list)}")
+        os.makedirs(path, exist_ok=True)
+        dir_list.append(path)
+        for _ in range(min(files_per_dir, file_count - created)):
+            name = f"{rng.choice(WORD_LIST)}_{rng.choice(WORD_LIST)}_{rng.randint(2000, 2030)}_{created}." \
+                   f"{rng.choice(SUFFIX_LIST)}"
+            open(os.path.join(path, name), "w").close()
+            created += 1
+    return dir_list
+
+
+def measure(title, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{title:<24} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def run_queries(title, searcher, repeat):
+    print(f"--- {title}")
+    for query in QUERY_LIST:
+        best = None
+        total = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, total, _ = searcher.search(query, offset=0, max_results=50)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{query:<16} {best * 1000:10.2f} ms  {total} 个结果")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内置文件索引基准测试")
+    parser.add_argument("--tree", default=os.path.join(tempfile.gettempdir(), "file_index_tree"), help="目录树路径")
+    parser.add_argument("--files", type=int, default=1000000, help="合成文件数")
+    parser.add_argument("--files-per-dir", type=int, default=50, help="每个目录的文件数")
+    parser.add_argument("--no-generate", action="store_true", help="不生成目录树，直接索引 --tree")
+    parser.add_argument("--index", default=os.path.join(tempfile.gettempdir(), "file_index_benchmark.db"),
+                        help="索引文件路径")
+    parser.add_argument("--repeat", type=int, default=3, help="查询重复次数（取最快）")
+    parser.add_argument("--everything", action="store_true", help="同时测试Everything后端")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    if not args.no_generate and not os.path.exists(args.tree):
+        os.makedirs(args.tree)
+        dir_list = measure(f"生成 {args.files} 个文件", lambda: generate_tree(args.tree, args.files,
+                                                                          args.files_per_dir, args.seed))
+    else:
+        dir_list = [args.tree]
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.index + suffix):
+            os.remove(args.index + suffix)
+
+    searcher = FileIndexSearcher(args.index, [args.tree])
+    measure("首次建立索引", searcher.refresh)
+    print(f"已索引 {searcher.get_file_count()} 个文件，索引文件 {os.path.getsize(args.index) / 1024 / 1024:.1f} MB")
+    measure("增量刷新（无变化）", searcher.refresh)
+    # 在部分目录中新增文件
+    rng = random.Random(args.seed)
+    for path in rng.sample(dir_list, min(100, len(dir_list))):
+        open(os.path.join(path, f"benchmark_new_{rng.randint(0, 1 << 30)}.txt"), "w").close()
+    measure("增量刷新（100个目录变化）", searcher.refresh)
+    run_queries("内置文件索引", searcher, args.repeat)
+    searcher.close()
+
+    if args.everything:
+        from src.thread_list.everything_search_thread import EverythingSearcher
+        run_queries("Everything", EverythingSearcher(everything_path=os.path.join(PROJECT_ROOT, "static", "thirdparty",
+                                                                                 "everything")), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
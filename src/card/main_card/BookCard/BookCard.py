@@ -1,22 +1,29 @@
-import re
 import os
 import time
-import cchardet as cchardet
+import tempfile
 from src.card.MainCardManager.MainCard import MainCard
 from PySide6 import QtCore
 from PySide6.QtCore import QRect, Qt, QCoreApplication
-from PySide6.QtGui import QFont, QColor
+from PySide6.QtGui import QFont, QColor, QTextCursor, QTextBlockFormat
 from PySide6.QtWidgets import (QWidget, QFrame, QLabel, QPushButton, QScrollArea, QTabWidget, QTextBrowser,
-                               QTreeWidget, QComboBox, QFileDialog, QPlainTextEdit, QTreeWidgetItem, QScrollBar, QHBoxLayout, QSizePolicy)
+                               QTreeWidget, QComboBox, QFileDialog, QPlainTextEdit, QTreeWidgetItem, QScrollBar, QHBoxLayout, QSizePolicy,
+                               QLineEdit)
 import src.ui.style_util as style_util
 from src.constant import data_save_constant
 from src.module import dialog_module
+from src.util import my_shiboken_util
 
+from .book_content import BookContentPipeline
+from .book_engine import BookEngine, BookIndexThread
+from .book_search import BookSearchService, MAX_RESULT_COUNT, normalize_keyword
 
-def get_encoding(file):
-    # 二进制方式读取，获取字节数据，检测类型
-    with open(file, 'rb') as f:
-        return cchardet.detect(f.read())['encoding']
+
+# 章节索引目录名
+BOOK_INDEX_DIR_NAME = "BookIndex"
+# 首次显示的段落数
+RENDER_FIRST_BATCH_SIZE = 200
+# 之后每批追加的段落数
+RENDER_BATCH_SIZE = 500
 
 
 class BookCard(MainCard):
@@ -51,13 +58,20 @@ class BookCard(MainCard):
 
     book_filename = None
     book_chapters = []
-    book_lines = None
+    book = None  # 阅读引擎
+    index_thread = None  # 建立索引的线程
+    search_index = None  # 全文索引
 
     def __init__(self, main_object=None, parent=None, theme=None, card=None, cache=None, data=None,
                  toolkit=None, logger=None, save_data_func=None):
         super().__init__(main_object=main_object, parent=parent, theme=theme, card=card, cache=cache, data=data,
                          toolkit=toolkit, logger=logger, save_data_func=save_data_func)
         self.book_data = self.data.setdefault(self.hardware_id, {})
+        self.retired_thread_set = set()  # 已被新书替换但仍在运行的索引线程
+        self.content_pipeline = BookContentPipeline()
+        self.search_service = BookSearchService()
+        self.search_keyword = ""  # 最近一次搜索的关键字
+        self.render_generation = 0  # 每次显示章节时递增，用于停止旧章节的分批追加
         self.init_config()
 
     def init_config(self):
@@ -68,6 +82,20 @@ class BookCard(MainCard):
         self.current_chapter = self.book_data.setdefault("currentChapter", None)
 
     def clear(self):
+        # 中止索引线程（不等待，每个块都会检查中止）并释放内存映射
+        # 已替换的线程在 load_file 中已断开信号，只需断开当前线程
+        if self.index_thread is not None:
+            self.index_thread.index_ready.disconnect()
+            self.index_thread.search_index_ready.disconnect()
+        for thread in [self.index_thread] + list(self.retired_thread_set):
+            if thread is not None:
+                thread.stop()
+        self.index_thread = None
+        self.retired_thread_set.clear()
+        self.render_generation += 1
+        self.content_pipeline.clear()
+        self.search_service.clear()
+        self.close_book()
         try:
             self.book_tab_widget.setVisible(False)
             self.book_tab_widget.deleteLater()
@@ -308,6 +336,40 @@ class BookCard(MainCard):
         self.text_push_button_setting_sure.setFont(font5)
         self.book_tab_widget.addTab(self.tab_11, "")
 
+        # 搜索区域
+        self.tab_search = QWidget()
+        self.tab_search.setObjectName(u"tab_search")
+        # 搜索区域 - 关键字
+        self.book_search_edit = QLineEdit(self.tab_search)
+        self.book_search_edit.setObjectName(u"book_search_edit")
+        self.book_search_edit.setGeometry(QRect(20, 20, self.card.width() - 150, 26))
+        self.book_search_edit.setFont(font3)
+        # 搜索区域 - 搜索按钮
+        self.push_button_book_search = QPushButton(self.tab_search)
+        self.push_button_book_search.setObjectName(u"push_button_book_search")
+        self.push_button_book_search.setGeometry(QRect(self.card.width() - 120, 20, 80, 26))
+        self.push_button_book_search.setFont(font1)
+        # 搜索区域 - 状态
+        self.book_search_status = QLabel(self.tab_search)
+        self.book_search_status.setObjectName(u"book_search_status")
+        self.book_search_status.setGeometry(QRect(20, 52, self.card.width() - 60, 21))
+        self.book_search_status.setFont(font3)
+        self.book_search_status.setStyleSheet(u"border: 0px solid #FF8D16;\n"
+                                              "border-radius: 0px;\n"
+                                              "background-color: rgba(0, 0, 0, 0);")
+        # 搜索区域 - 结果
+        self.book_search_tree_widget = QTreeWidget(self.tab_search)
+        self.book_search_tree_widget.headerItem().setText(0, "")
+        self.book_search_tree_widget.setObjectName(u"book_search_tree_widget")
+        self.book_search_tree_widget.setGeometry(QRect(20, 78, self.card.width() - 60, self.card.height() - 153))
+        self.book_search_tree_widget.setFont(font3)
+        self.book_search_tree_widget.setIndentation(10)
+        self.book_search_tree_widget.setColumnCount(1)
+        self.book_search_tree_widget.setAlternatingRowColors(True)
+        self.book_search_tree_widget.setRootIsDecorated(False)
+        self.book_search_tree_widget.header().setVisible(False)
+        self.book_tab_widget.addTab(self.tab_search, "")
+
         self.book_area.setWidget(self.scrollAreaWidgetContents_12)
         self.book_tab_widget.setCurrentIndex(0)
         # 其他初始化
@@ -340,6 +402,10 @@ class BookCard(MainCard):
         self.text_label_setting_font_size_minus.setText(QCoreApplication.translate("Form", u"10", None))
         self.book_tab_widget.setTabText(self.book_tab_widget.indexOf(self.tab_11),
                                         QCoreApplication.translate("Form", "设置", None))
+        self.book_search_edit.setPlaceholderText(QCoreApplication.translate("Form", "搜索书中内容", None))
+        self.push_button_book_search.setText(QCoreApplication.translate("Form", "搜索", None))
+        self.book_tab_widget.setTabText(self.book_tab_widget.indexOf(self.tab_search),
+                                        QCoreApplication.translate("Form", "搜索", None))
         # 设置浏览器不打开链接
         self.text_browser_book.setContextMenuPolicy(Qt.ContextMenuPolicy.NoContextMenu)
         # 绑定按钮事件
@@ -347,8 +413,12 @@ class BookCard(MainCard):
         self.text_push_button_setting_sure.clicked.connect(self.save_setting)
         self.push_button_book_chapter_last.clicked.connect(self.show_last)
         self.push_button_book_chapter_next.clicked.connect(self.show_next)
+        self.book_tree_widget.clicked.connect(self.onTreeClicked)
         self.text_push_button_setting_font_size_minus.clicked.connect(self.font_size_minus)
         self.text_push_button_setting_font_size_add.clicked.connect(self.font_size_add)
+        self.push_button_book_search.clicked.connect(self.search_book)
+        self.book_search_edit.returnPressed.connect(self.search_book)
+        self.book_search_tree_widget.itemClicked.connect(self.on_search_item_clicked)
         # 初始化滚动条同步
         self.sync_scrollbars()
         # 初始化书籍信息
@@ -397,8 +467,7 @@ class BookCard(MainCard):
     def init_book_info(self):
         # 如果之前打开过文件，则直接加载文件
         if self.current_file:
-            self.load_file(self.current_file)
-            self.book_tab_widget.setCurrentIndex(2)
+            self.load_file(self.current_file, tab_index=2)
         else:
             self.book_tab_widget.setCurrentIndex(0)
 
@@ -447,7 +516,12 @@ class BookCard(MainCard):
         file_name = QFileDialog.getOpenFileName(self.card, '打开书籍', path, filter='*.txt')
         self.load_file(file_name[0])
 
-    def load_file(self, file):
+    def load_file(self, file, tab_index=1):
+        """
+        打开书籍：在后台线程中检测编码并建立章节索引（已打开过的书籍直接读取持久化的索引）
+        :param file: 书籍路径
+        :param tab_index: 加载完成后跳转的选项卡
+        """
         # 文件不为空
         if file:
             # 判断文件是否存在
@@ -456,65 +530,87 @@ class BookCard(MainCard):
             # 更改目前打开的文件
             self.current_file = file
             self.book_filename = file.split('/')[-1].split('.')[0]
-            # 获取文件的编码格式
-            encodings = get_encoding(file)
-            with open(file, 'r', encoding=encodings, errors='ignore') as f:
-                # 打开文件,生成章节目录
-                self.book_chapters = []
-                # 包含了txt文本的全部内容
-                self.book_lines = f.readlines()
-                # 一种匹配章节目录的规则
-                self.matching_chapter_name()
-            # 如果没有可用的目录,那就显示全部
-            if not self.book_chapters:
-                self.book_chapters.append({self.book_filename: 0})
-            # 设置章节目录
-            self.set_chapters()
-            # 设置文本浏览器的内容
-            self.show_content()
-            # 跳转目录
-            self.book_tab_widget.setCurrentIndex(1)
-            self.save_info()
-            # 文件大小(MB)
-            book_size = self.toolkit.file_util.get_file_size(file)
-            # 总字数
-            book_total_words = self.toolkit.file_util.get_txt_file_words_number(file, encodings)
-            # 生成书籍信息 书籍名;文件路径;文件大小;章节数;总字数;创建时间;修改时间
-            book_message_map = {
-                "书籍名称": self.book_filename,
-                "文件大小": book_size,
-                "章节数量": str(len(self.book_chapters)) + "章",
-                "总字符数": book_total_words,
-                "创建时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getctime(file))),
-                "修改时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(file))),
-                "访问时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getatime(file))),
-                "文件路径": file,
-            }
-            line_start = '<p style="line-height:150%">'
-            style_start = '<font color="#2d76b6">'
-            style_end = "</font>"
-            line_end = "</p>"
-            book_info_str = ""
-            for key, value in book_message_map.items():
-                book_info_str += line_start + style_start + key + "： " + style_end + str(value) + line_end
-            self.text_label_book_browser.setText(book_info_str)
+            self.text_label_book_browser.setText("正在解析书籍...")
+            # 旧的索引线程结果作废
+            if self.index_thread is not None:
+                self.index_thread.index_ready.disconnect()
+                self.index_thread.search_index_ready.disconnect()
+                self.index_thread.requestInterruption()
+                self.retired_thread_set.add(self.index_thread)
+            self.index_thread = BookIndexThread(file, self.get_index_dir())
+            self.index_thread.index_ready.connect(lambda path, index: self.on_index_ready(path, index, tab_index))
+            self.index_thread.search_index_ready.connect(self.on_search_index_ready)
+            self.index_thread.finished.connect(lambda thread=self.index_thread: self.on_index_thread_finished(thread))
+            self.index_thread.start()
         else:  # 文件为空，说明没有选择文件
             print('您没有选择文件！')
 
-    def matching_chapter_name(self):
-        # 一种匹配章节目录的规则
-        pattern = r"(第)([\u4e00-\u9fa5a-zA-Z0-9\s]{1,7})[章|节|章节|回|集|卷|篇|册|部][^\n]{0,35}()?(|\n)"
-        last_index = 0
-        for i in range(len(self.book_lines)):
-            line = self.book_lines[i].strip()
-            if line != "" and re.search(pattern, line):
-                line = re.search(pattern, line).group()
-                line = line.replace("\n", "").replace("=", "")
-                if len(line) < 30:  # 标题30字以内
-                    if last_index != 0 and (i - last_index) < 30:  # 章节最小间隔
-                        continue
-                    self.book_chapters.append({line: i})
-                    last_index = i
+    def get_index_dir(self):
+        app_data_path = getattr(self.main_object, "app_data_path", None) or tempfile.gettempdir()
+        return os.path.join(app_data_path, BOOK_INDEX_DIR_NAME)
+
+    def on_index_thread_finished(self, thread):
+        if thread is self.index_thread:
+            self.index_thread = None
+        self.retired_thread_set.discard(thread)
+        thread.deleteLater()
+
+    def on_index_ready(self, file, index, tab_index):
+        if file != self.current_file:
+            return
+        if index is None:
+            self.text_label_book_browser.setText("书籍解析失败")
+            return
+        self.close_book()
+        self.book = BookEngine(index)
+        self.content_pipeline.set_book(self.book)
+        self.book_chapters = self.book.chapter_titles
+        if self.current_chapter is None or not 0 <= self.current_chapter < len(self.book_chapters):
+            self.current_chapter = 0
+        # 设置章节目录
+        self.set_chapters()
+        # 设置文本浏览器的内容
+        self.show_content()
+        # 跳转目录
+        self.book_tab_widget.setCurrentIndex(tab_index)
+        self.save_info()
+        # 生成书籍信息 书籍名;文件路径;文件大小;章节数;总字数;创建时间;修改时间
+        book_message_map = {
+            "书籍名称": self.book_filename,
+            "文件大小": self.toolkit.file_util.get_file_size(file),
+            "章节数量": str(len(self.book_chapters)) + "章",
+            "总字符数": f"{self.book.char_count}字",
+            "创建时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getctime(file))),
+            "修改时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(file))),
+            "访问时间": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getatime(file))),
+            "文件路径": file,
+        }
+        line_start = '<p style="line-height:150%">'
+        style_start = '<font color="#2d76b6">'
+        style_end = "</font>"
+        line_end = "</p>"
+        self.text_label_book_browser.setText("".join(
+            line_start + style_start + key + "： " + style_end + str(value) + line_end
+            for key, value in book_message_map.items()
+        ))
+
+    def on_search_index_ready(self, file, search_index):
+        if file != self.current_file or self.book is None:
+            return
+        self.search_index = search_index
+        self.book_search_status.setText("全文索引已就绪" if search_index is not None else "全文索引建立失败")
+
+    def close_book(self):
+        self.content_pipeline.set_book(None)
+        # 旧书的搜索结果作废
+        self.search_service.cancel()
+        self.search_index = None
+        self.book_search_tree_widget.clear()
+        self.book_search_status.setText("正在建立全文索引...")
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        self.book_chapters = []
 
     # 设置章节目录
     def set_chapters(self):
@@ -524,10 +620,9 @@ class BookCard(MainCard):
         __sortingEnabled = self.book_tree_widget.isSortingEnabled()
         for i, value in enumerate(self.book_chapters):
             item = QTreeWidgetItem(self.book_tree_widget)
-            item.setText(0, _translate("MyMainWindow", list(value.keys())[0]))
+            item.setText(0, _translate("MyMainWindow", value))
             self.book_tree_widget.addTopLevelItem(item)
         self.book_tree_widget.setSortingEnabled(__sortingEnabled)
-        self.book_tree_widget.clicked.connect(self.onTreeClicked)
         # 当前章节
         self.book_tree_widget.setCurrentItem(self.book_tree_widget.topLevelItem(self.current_chapter), 0)
         # 为当前章节设置背景色
@@ -536,53 +631,63 @@ class BookCard(MainCard):
         self.book_tree_widget.header().setVisible(False)
 
     # 设置文本浏览器的内容
-    def show_content(self):
+    def show_content(self, render_all=False):
+        """
+        显示当前章节
+        :param render_all: 一次性显示整章（跳转到搜索结果时需要完整文档）
+        """
         if len(self.book_chapters) == 0:
             return
         # 设置字体
         font = QFont()
         font.setPointSize(int(self.font_size))
         self.text_browser_book.setFont(font)
-        # 将文件内容添加到文本浏览器中
-        self.text_browser_book.setText(self.to_browser_content(self.get_content()))
+        # 将文件内容添加到文本浏览器中，长章节先显示开头部分，其余分批追加
+        paragraph_list = self.to_browser_paragraphs(self.get_content())
+        self.render_generation += 1
+        if render_all:
+            self.text_browser_book.setText("".join(paragraph_list))
+        else:
+            self.text_browser_book.setText("".join(paragraph_list[:RENDER_FIRST_BATCH_SIZE]))
+        if not render_all and len(paragraph_list) > RENDER_FIRST_BATCH_SIZE:
+            self.append_paragraphs(self.render_generation, paragraph_list, RENDER_FIRST_BATCH_SIZE)
         # 设置字体
         style_util.set_font_and_right_click_style(self.main_object, self.text_browser_book)
         # 展示章节名
-        self.book_chapter_title.setText(list(self.book_chapters[self.current_chapter].keys())[0])
+        self.book_chapter_title.setText(self.book_chapters[self.current_chapter])
+        # 预加载下一章
+        self.content_pipeline.prefetch(self.current_chapter + 1)
+
+    def append_paragraphs(self, generation, paragraph_list, start):
+        """在事件循环空闲时追加下一批段落，翻页后旧章节的追加自动停止"""
+        if generation != self.render_generation or not my_shiboken_util.is_qobject_valid(self.text_browser_book):
+            return
+        end = start + RENDER_BATCH_SIZE
+        cursor = QTextCursor(self.text_browser_book.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        # 新段落的第一行会并入插入的空段落，需要带上相同的行高
+        block_format = QTextBlockFormat()
+        block_format.setLineHeight(self.get_line_height(), QTextBlockFormat.LineHeightTypes.FixedHeight.value)
+        cursor.insertBlock(block_format)
+        cursor.insertHtml("".join(paragraph_list[start:end]))
+        if end < len(paragraph_list):
+            QtCore.QTimer.singleShot(0, lambda: self.append_paragraphs(generation, paragraph_list, end))
 
     # 获取章节内容
     def get_content(self):
-        index = self.current_chapter
-        # 起始行
-        start = list(self.book_chapters[index].values())[0]
-        # 如果是终章
-        if index == self.book_tree_widget.topLevelItemCount() - 1:
-            content_text = "".join(self.book_lines[start:-1])
-        else:
-            # 终止行
-            end = list(self.book_chapters[index + 1].values())[0]
-            content_text = "".join(self.book_lines[start:end])
-        # 去除部分小说广告
-        if self.text_filtration is None:
-            self.text_filtration = ""
-        advertisement_list = self.text_filtration.split("\n")
-        for advertisement in advertisement_list:
-            if advertisement == "":
-                continue
-            content_text = re.sub(advertisement, "", content_text)
-        # 将三个及以上连着的换行符替换为两个换行符
-        content_text = re.sub(r"(\n){3,}", r"\n\n", content_text)
-        # 将最后的空行和换行符都去掉
-        content_text = re.sub(r"(\n){2,}$", "\n", content_text)
-        return content_text
+        # 过滤规则只在变化时重新编译，清洗后的章节命中缓存时直接返回
+        self.content_pipeline.set_filters(self.text_filtration or "")
+        return self.content_pipeline.get_chapter(self.current_chapter)
+
+    def get_line_height(self):
+        return int(float(self.line_spacing) * 20)
+
+    def to_browser_paragraphs(self, content_text):
+        paragraph_start = "<p style='line-height:" + str(self.get_line_height()) + "px;width:100%;'>"
+        return [paragraph_start + content + "</p>" for content in content_text.split("\n")]
 
     def to_browser_content(self, content_text):
-        content_html = ""
-        content_list = content_text.split("\n")
-        line_height = str(int(float(self.line_spacing) * 20))
-        for content in content_list:
-            content_html += "<p style='line-height:" + str(line_height) + "px;width:100%;'>" + content + "</p>"
-        return content_html
+        return "".join(self.to_browser_paragraphs(content_text))
 
     # 点击目录跳转到章节
     def onTreeClicked(self, index):
@@ -595,6 +700,61 @@ class BookCard(MainCard):
         self.book_tab_widget.setCurrentIndex(2)
         self.save_info()
 
+    # 全文搜索
+    def search_book(self):
+        keyword = normalize_keyword(self.book_search_edit.text())
+        if not keyword or self.book is None:
+            return
+        if self.search_index is None:
+            self.book_search_status.setText("正在建立全文索引，请稍后再试")
+            return
+        self.search_keyword = keyword
+        self.book_search_tree_widget.clear()
+        self.book_search_status.setText("正在搜索...")
+        self.search_service.search(self.book, self.search_index, keyword,
+                                   self.on_search_result, self.on_search_finished)
+
+    def on_search_result(self, result_list):
+        """逐批显示搜索结果"""
+        for chapter_index, ordinal, snippet in result_list:
+            item = QTreeWidgetItem(self.book_search_tree_widget)
+            item.setText(0, f"{self.book_chapters[chapter_index]}：{snippet}")
+            item.setData(0, Qt.ItemDataRole.UserRole, (chapter_index, ordinal))
+        self.book_search_status.setText(f"已找到{self.book_search_tree_widget.topLevelItemCount()}处...")
+
+    def on_search_finished(self, count):
+        if count >= MAX_RESULT_COUNT:
+            self.book_search_status.setText(f"找到超过{MAX_RESULT_COUNT}处，仅显示前{MAX_RESULT_COUNT}处")
+        else:
+            self.book_search_status.setText(f"共找到{count}处")
+
+    # 点击搜索结果跳转到章节中的对应位置
+    def on_search_item_clicked(self, item, column=0):
+        chapter_index, ordinal = item.data(0, Qt.ItemDataRole.UserRole)
+        if not 0 <= chapter_index < len(self.book_chapters):
+            return
+        self.book_tree_widget.topLevelItem(self.current_chapter).setBackground(0, QColor(0, 0, 0, 0))
+        self.current_chapter = chapter_index
+        self.book_tree_widget.topLevelItem(self.current_chapter).setBackground(0, QColor(15, 136, 235))
+        self.show_content(render_all=True)
+        self.book_tab_widget.setCurrentIndex(2)
+        self.locate_keyword(self.search_keyword, ordinal)
+        self.save_info()
+
+    def locate_keyword(self, keyword, ordinal):
+        """选中章节中第ordinal处关键字（过滤规则删掉部分内容时退回到最后一处）"""
+        document = self.text_browser_book.document()
+        cursor = QTextCursor(document)
+        found_cursor = None
+        for _ in range(ordinal + 1):
+            cursor = document.find(keyword, cursor)
+            if cursor.isNull():
+                break
+            found_cursor = cursor
+        if found_cursor is not None:
+            self.text_browser_book.setTextCursor(found_cursor)
+            self.text_browser_book.ensureCursorVisible()
+
     # 展示上一章
     def show_last(self):
         if self.current_chapter <= 0 or self.book_tree_widget.topLevelItem(self.current_chapter - 1) is None:
@@ -647,6 +807,8 @@ class BookCard(MainCard):
         style_util.set_button_style(self.text_push_button_setting_font_size_minus, is_dark)
         style_util.set_button_style(self.text_push_button_setting_font_size_add, is_dark)
         style_util.set_combo_box_style(self.text_interval_combo_box, is_dark)
+        style_util.set_button_style(self.push_button_book_search, is_dark)
+        style_util.set_line_edit_style(self.book_search_edit, is_dark)
         # 调整横线样式
         if is_dark:
             line_style = "border: 1px solid white;"
@@ -684,8 +846,10 @@ class BookCard(MainCard):
         # 书籍目录区域
         if is_dark:
             self.book_tree_widget.setStyleSheet(tree_widget_dark_style)
+            self.book_search_tree_widget.setStyleSheet(tree_widget_dark_style)
         else:
             self.book_tree_widget.setStyleSheet(tree_widget_light_style)
+            self.book_search_tree_widget.setStyleSheet(tree_widget_light_style)
         # 外部滚动条样式
         if is_dark:
             self.external_scrollbar.setStyleSheet(style_util.scroll_bar_style)
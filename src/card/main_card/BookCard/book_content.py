@@ -0,0 +1,161 @@
+# -- coding: utf-8 --
+import re
+import traceback
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+# 缓存的已清洗章节数
+CHAPTER_CACHE_SIZE = 8
+# 三个及以上连着的换行符
+MULTI_NEWLINE_PATTERN = re.compile(r"\n{3,}")
+# 末尾的空行
+TRAILING_NEWLINE_PATTERN = re.compile(r"\n{2,}$")
+
+
+def compile_filters(text_filtration):
+    """
+    将字符串过滤列表（每行一个正则）编译为正则列表，无效的正则会被跳过
+
+    规则都不含分组、反向引用和全局内联标志时合并为一个组合正则（只扫描一遍文本），
+    否则（合并会改变分组编号或标志的作用范围）或合并编译失败时逐条编译，按顺序依次替换。
+    :return: 编译后的正则列表，没有过滤规则时为空列表
+    """
+    compiled_list = []
+    for advertisement in (text_filtration or "").split("\n"):
+        if advertisement == "":
+            continue
+        try:
+            compiled_list.append(re.compile(advertisement))
+        except re.error as e:
+            print(f"无效的过滤规则:{advertisement},{e}")
+    if len(compiled_list) <= 1:
+        return compiled_list
+    default_flags = re.compile("").flags
+    if any(compiled.groups or compiled.flags != default_flags for compiled in compiled_list):
+        return compiled_list
+    try:
+        return [re.compile("|".join(f"(?:{compiled.pattern})" for compiled in compiled_list))]
+    except re.error as e:
+        print(f"合并过滤规则失败，逐条过滤:{e}")
+        return compiled_list
+
+
+def clean_chapter_text(content_text, filter_pattern_list):
+    """去除广告并整理空行（可在工作线程中调用）"""
+    # 去除部分小说广告
+    for filter_pattern in filter_pattern_list:
+        content_text = filter_pattern.sub("", content_text)
+    # 将三个及以上连着的换行符替换为两个换行符
+    content_text = MULTI_NEWLINE_PATTERN.sub("\n\n", content_text)
+    # 将最后的空行和换行符都去掉
+    return TRAILING_NEWLINE_PATTERN.sub("\n", content_text)
+
+
+class ChapterPrefetchSignals(QObject):
+    # 预加载完成信号(批次, 章节下标, 清洗后的内容)
+    finished = Signal(int, int, str)
+
+
+class ChapterPrefetchTask(QRunnable):
+    """在线程池中读取并清洗章节"""
+
+    def __init__(self, signals, generation, book, chapter_index, filter_pattern_list):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.book = book
+        self.chapter_index = chapter_index
+        self.filter_pattern_list = filter_pattern_list
+
+    def run(self):
+        try:
+            text = clean_chapter_text(self.book.get_chapter_text(self.chapter_index), self.filter_pattern_list)
+        except ValueError:
+            # 书籍已关闭（内存映射已释放）
+            return
+        except Exception:
+            print(f"预加载章节失败:{traceback.format_exc()}")
+            return
+        self.signals.finished.emit(self.generation, self.chapter_index, text)
+
+
+class BookContentPipeline(QObject):
+    """
+    章节内容管道
+
+    过滤规则只在设置变化时编译一次（能合并时合并为一个正则），清洗后的章节保存在小容量LRU缓存中，
+    并可在后台预加载下一章，翻页时直接命中缓存。
+    """
+
+    def __init__(self, parent=None, cache_size=CHAPTER_CACHE_SIZE):
+        super().__init__(parent)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # 章节下标 -> 清洗后的内容
+        self.book = None
+        self.text_filtration = None
+        self.filter_pattern_list = []
+        # 书籍或过滤规则变化时递增，丢弃旧的预加载结果
+        self.generation = 0
+        self.pending_set = set()  # 预加载中的章节下标
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.signals = ChapterPrefetchSignals()
+        self.signals.finished.connect(self._on_prefetched)
+
+    def set_book(self, book):
+        if book is self.book:
+            return
+        self.book = book
+        self._reset()
+
+    def set_filters(self, text_filtration):
+        if text_filtration == self.text_filtration:
+            return
+        self.text_filtration = text_filtration
+        self.filter_pattern_list = compile_filters(text_filtration)
+        self._reset()
+
+    def get_chapter(self, chapter_index):
+        """获取清洗后的章节内容（缓存未命中时同步读取）"""
+        text = self.cache.get(chapter_index)
+        if text is not None:
+            self.cache.move_to_end(chapter_index)
+            return text
+        text = clean_chapter_text(self.book.get_chapter_text(chapter_index), self.filter_pattern_list)
+        self._put(chapter_index, text)
+        return text
+
+    def prefetch(self, chapter_index):
+        """在后台预加载章节"""
+        if self.book is None or not 0 <= chapter_index < self.book.chapter_count:
+            return
+        if chapter_index in self.cache or chapter_index in self.pending_set:
+            return
+        self.pending_set.add(chapter_index)
+        self.thread_pool.start(ChapterPrefetchTask(self.signals, self.generation, self.book, chapter_index,
+                                                   self.filter_pattern_list))
+
+    def clear(self):
+        self.book = None
+        self._reset()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+
+    def _reset(self):
+        self.generation += 1
+        self.cache.clear()
+        self.pending_set.clear()
+
+    def _put(self, chapter_index, text):
+        self.cache[chapter_index] = text
+        self.cache.move_to_end(chapter_index)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _on_prefetched(self, generation, chapter_index, text):
+        if generation != self.generation:
+            return
+        self.pending_set.discard(chapter_index)
+        self._put(chapter_index, text)
@@ -0,0 +1,333 @@
+# -- coding: utf-8 --
+import os
+import re
+import json
+import mmap
+import codecs
+import hashlib
+import traceback
+
+import cchardet as cchardet
+from PySide6.QtCore import QThread, Signal
+
+from .book_search import load_search_index
+
+
+# 索引格式版本（章节规则或索引结构变化时递增，旧索引自动重建）
+INDEX_VERSION = 1
+# 编码检测采样大小（字节）
+ENCODING_SAMPLE_SIZE = 128 * 1024
+# 文件指纹采样大小（字节，头、中、尾各一段）
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+# 流式读取的块大小
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+# 一种匹配章节目录的规则
+CHAPTER_PATTERN = re.compile(r"(第)([\u4e00-\u9fa5a-zA-Z0-9\s]{1,7})[章|节|章节|回|集|卷|篇|册|部][^\n]{0,35}()?(|\n)")
+# 章节标题最大长度
+CHAPTER_TITLE_MAX_LENGTH = 30
+# 章节最小间隔行数
+CHAPTER_MIN_LINE_INTERVAL = 30
+# 索引目录的总大小上限（超出后按最近使用时间删除其它书籍的索引）
+MAX_INDEX_DIR_BYTES = 1024 * 1024 * 1024
+
+
+def normalize_encoding(encoding):
+    """统一编码名称：GB2312 提升为超集 GB18030，识别失败或纯ASCII按UTF-8处理"""
+    if not encoding:
+        return "utf-8"
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return "utf-8"
+    if name in ("gb2312", "gbk", "ascii"):
+        return "gb18030" if name != "ascii" else "utf-8"
+    return name
+
+
+def detect_encoding(file_path):
+    """根据文件头、中、尾的采样检测编码，不读取整个文件"""
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+        for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF32_LE, "utf-32"),
+                              (codecs.BOM_UTF32_BE, "utf-32"), (codecs.BOM_UTF16_LE, "utf-16"),
+                              (codecs.BOM_UTF16_BE, "utf-16")):
+            if head.startswith(bom):
+                return encoding
+        return normalize_encoding(cchardet.detect(read_samples(f, ENCODING_SAMPLE_SIZE))["encoding"])
+
+
+def read_samples(f, sample_size):
+    """读取文件头、中、尾三段采样"""
+    size = os.fstat(f.fileno()).st_size
+    if size <= sample_size * 3:
+        f.seek(0)
+        return f.read()
+    sample_list = []
+    for offset in (0, size // 2, size - sample_size):
+        f.seek(offset)
+        sample_list.append(f.read(sample_size))
+    return b"".join(sample_list)
+
+
+def get_file_fingerprint(file_path):
+    """文件指纹（大小 + 修改时间 + 头、中、尾采样的哈希），用作章节索引的键"""
+    with open(file_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        sha1 = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode("ascii"))
+        sha1.update(read_samples(f, FINGERPRINT_SAMPLE_SIZE))
+    return sha1.hexdigest()
+
+
+def is_ascii_compatible(encoding):
+    """换行符是否为单字节 \\n（UTF-16/32 需要先转码）"""
+    return not codecs.lookup(encoding).name.startswith(("utf-16", "utf-32"))
+
+
+def transcode_to_utf8(file_path, encoding, target_path):
+    """将UTF-16/32文件流式转码为UTF-8，之后按UTF-8建立索引"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    temp_path = target_path + ".tmp"
+    with open(file_path, "rb") as source, open(temp_path, "wb") as target:
+        while True:
+            chunk = source.read(READ_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                target.write(text.encode("utf-8"))
+            if not chunk:
+                break
+    os.replace(temp_path, target_path)
+
+
+def build_chapter_index(data_path, encoding, default_title, is_interrupted=None):
+    """
+    单次流式扫描建立章节索引
+    :param data_path: 文本文件路径（单字节换行的编码）
+    :param encoding: 文件编码
+    :param default_title: 没有匹配到章节时使用的标题
+    :param is_interrupted: 返回True时中止扫描
+    :return: (章节列表 [[标题, 起始字节]], 总字符数)，中止时返回None
+    """
+    # 只有包含"第"字的行才可能是章节标题，先按字节过滤，避免逐行解码和正则匹配
+    try:
+        marker = "第".encode(encoding.replace("-sig", ""))
+    except UnicodeEncodeError:
+        # 编码中没有"第"字，不可能匹配到章节
+        marker = None
+    chapter_list = []
+    char_count = 0
+    crlf_count = 0
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    offset = 0
+    line_index = 0
+    last_line_index = 0
+    remainder = b""
+    with open(data_path, "rb") as f:
+        while True:
+            if is_interrupted is not None and is_interrupted():
+                return None
+            chunk = f.read(READ_CHUNK_SIZE)
+            char_count += len(decoder.decode(chunk, final=not chunk))
+            crlf_count += chunk.count(b"\r\n")
+            if chunk:
+                line_list = (remainder + chunk).split(b"\n")
+                remainder = line_list.pop()
+            else:
+                # 最后一行（没有换行符结尾）
+                line_list = [remainder] if remainder else []
+            for raw_line in line_list:
+                if marker is not None and marker in raw_line:
+                    line = raw_line.decode(encoding, errors="ignore").strip()
+                    match = CHAPTER_PATTERN.search(line) if line else None
+                    if match is not None:
+                        title = match.group().replace("\n", "").replace("=", "")
+                        # 标题30字以内，且与上一章节间隔足够
+                        if len(title) < CHAPTER_TITLE_MAX_LENGTH and (
+                                last_line_index == 0 or line_index - last_line_index >= CHAPTER_MIN_LINE_INTERVAL):
+                            chapter_list.append([title, offset])
+                            last_line_index = line_index
+                offset += len(raw_line) + 1
+                line_index += 1
+            if not chunk:
+                break
+    # 如果没有可用的目录,那就显示全部
+    if not chapter_list:
+        chapter_list.append([default_title, 0])
+    # 与文本模式读取一致，\r\n 按一个字符计算
+    return chapter_list, char_count - crlf_count
+
+
+def load_book_index(file_path, index_dir, is_interrupted=None):
+    """
+    获取书籍索引，优先使用按文件指纹持久化的索引
+    :param file_path: 书籍路径
+    :param index_dir: 索引目录
+    :return: 索引字典，中止时返回None
+    """
+    fingerprint = get_file_fingerprint(file_path)
+    index_path = os.path.join(index_dir, fingerprint + ".json")
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            # 未转码的书籍移动位置后指纹不变，索引仍可使用
+            if index.get("version") == INDEX_VERSION and (
+                    not index["transcoded"] or os.path.exists(index["data_path"])):
+                if not index["transcoded"]:
+                    index["data_path"] = file_path
+                # 记录最近使用时间，用于淘汰
+                os.utime(index_path)
+                return index
+        except (OSError, ValueError, KeyError):
+            print(f"书籍索引损坏，重新建立:{index_path}")
+    os.makedirs(index_dir, exist_ok=True)
+    encoding = detect_encoding(file_path)
+    data_path = file_path
+    transcoded = False
+    if not is_ascii_compatible(encoding):
+        data_path = os.path.join(index_dir, fingerprint + ".txt")
+        transcode_to_utf8(file_path, encoding, data_path)
+        encoding = "utf-8"
+        transcoded = True
+    default_title = os.path.splitext(os.path.basename(file_path))[0]
+    result = build_chapter_index(data_path, encoding, default_title, is_interrupted)
+    if result is None:
+        return None
+    chapter_list, char_count = result
+    index = {
+        "version": INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "encoding": encoding,
+        "data_path": data_path,
+        "transcoded": transcoded,
+        "size": os.path.getsize(data_path),
+        "char_count": char_count,
+        "chapters": chapter_list,
+    }
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(temp_path, index_path)
+    return index
+
+
+def prune_index_dir(index_dir, keep_fingerprint, max_bytes=MAX_INDEX_DIR_BYTES):
+    """
+    按最近使用时间淘汰其它书籍的索引文件（章节索引、全文索引、转码文件），直到总大小不超过上限
+    书籍修改或重新下载后指纹会变化，旧指纹的文件只能靠淘汰清理
+    """
+    group_map = {}  # 指纹 -> [最近使用时间, 总大小, 文件路径列表]
+    with os.scandir(index_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            group = group_map.setdefault(entry.name.split(".", 1)[0], [0, 0, []])
+            group[0] = max(group[0], stat.st_mtime)
+            group[1] += stat.st_size
+            group[2].append(entry.path)
+    total_size = sum(group[1] for group in group_map.values())
+    for fingerprint, (_, size, path_list) in sorted(group_map.items(), key=lambda item: item[1][0]):
+        if total_size <= max_bytes:
+            break
+        if fingerprint == keep_fingerprint:
+            continue
+        try:
+            for path in path_list:
+                os.remove(path)
+        except OSError:
+            # 其它卡片正在使用（Windows下无法删除打开的文件）
+            continue
+        total_size -= size
+
+
+class BookEngine:
+    """
+    书籍阅读引擎
+
+    按章节索引中的字节偏移从内存映射中切片读取章节，内存占用只与当前章节大小有关。
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.encoding = index["encoding"]
+        self.chapter_titles = [chapter[0] for chapter in index["chapters"]]
+        self.chapter_offsets = [chapter[1] for chapter in index["chapters"]]
+        self.file = None
+        self.data = b""
+        if index["size"] > 0:
+            self.file = open(index["data_path"], "rb")
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.chapter_offsets.append(len(self.data))
+
+    @property
+    def chapter_count(self):
+        return len(self.chapter_titles)
+
+    @property
+    def char_count(self):
+        return self.index["char_count"]
+
+    def get_chapter_title(self, chapter_index):
+        return self.chapter_titles[chapter_index]
+
+    def get_chapter_range(self, chapter_index):
+        """章节的字节范围 (起始, 结束)"""
+        return self.chapter_offsets[chapter_index], self.chapter_offsets[chapter_index + 1]
+
+    def get_chapter_text(self, chapter_index):
+        start, end = self.get_chapter_range(chapter_index)
+        return self.data[start:end].decode(self.encoding, errors="ignore").replace("\r\n", "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.data.close()
+            self.file.close()
+            self.file = None
+            self.data = b""
+
+
+class BookIndexThread(QThread):
+    """在后台检测编码并建立（或读取已持久化的）章节索引，之后继续建立全文索引"""
+    # 索引完成信号(书籍路径, 索引字典，失败时为None)
+    index_ready = Signal(str, object)
+    # 全文索引完成信号(书籍路径, BookSearchIndex，失败时为None)
+    search_index_ready = Signal(str, object)
+    # 已请求中止但仍在收尾的线程，保持引用直到线程结束
+    stopping_thread_set = set()
+
+    def __init__(self, file_path, index_dir, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.index_dir = index_dir
+
+    def stop(self):
+        """请求中止，不等待线程结束（卡片关闭后线程自行收尾并释放）"""
+        self.requestInterruption()
+        self.finished.connect(lambda: BookIndexThread.stopping_thread_set.discard(self))
+        if self.isRunning():
+            BookIndexThread.stopping_thread_set.add(self)
+
+    def run(self):
+        index = None
+        try:
+            index = load_book_index(self.file_path, self.index_dir, self.isInterruptionRequested)
+        except Exception:
+            print(f"建立书籍索引失败:{traceback.format_exc()}")
+        if self.isInterruptionRequested():
+            return
+        self.index_ready.emit(self.file_path, index)
+        if index is None:
+            return
+        # 章节索引就绪后即可阅读，全文索引在同一线程中继续建立
+        search_index = None
+        try:
+            search_index = load_search_index(index, self.index_dir, self.isInterruptionRequested)
+        except Exception:
+            print(f"建立书籍全文索引失败:{traceback.format_exc()}")
+        if self.isInterruptionRequested():
+            return
+        self.search_index_ready.emit(self.file_path, search_index)
+        try:
+            prune_index_dir(self.index_dir, index["fingerprint"])
+        except OSError:
+            print(f"清理书籍索引失败:{traceback.format_exc()}")
@@ -0,0 +1,361 @@
+# -- coding: utf-8 --
+import os
+import sqlite3
+import traceback
+from array import array
+from bisect import bisect_right
+from itertools import repeat
+from operator import and_, mul, rshift
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+# 索引格式版本（保存在 PRAGMA user_version 中）
+SEARCH_INDEX_VERSION = 3
+# 分块大小（字节，按行对齐）
+SEARCH_BLOCK_SIZE = 64 * 1024
+# 流式读取的块大小
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+# 二元组（及单字）散列后的桶数 2^GRAM_BUCKET_BITS，桶数越多误判的候选块越少，索引越大
+GRAM_BUCKET_BITS = 18
+# 斐波那契散列的乘数（2^32 / 黄金分割比）
+FIBONACCI_MULTIPLIER = 0x9E3779B1
+# 每个分段的块数，一个分段内每个桶的块位图在内存中累积，写出后清空
+SEGMENT_BLOCK_COUNT = 256
+# 单次搜索的最大结果数
+MAX_RESULT_COUNT = 500
+# 每批发送的结果数
+RESULT_BATCH_SIZE = 20
+# 结果摘要的上下文长度
+SNIPPET_CONTEXT_LENGTH = 16
+
+
+def normalize_keyword(keyword):
+    """搜索关键字不跨行，忽略大小写"""
+    return keyword.replace("\r", "").replace("\n", "").strip().lower()
+
+
+def get_bigram_keys(data):
+    """UTF-16-LE编码的文本中每对相邻码元组成的32位整数（两个偏移读取，全部在C层完成）"""
+    key_set = set(array("I", data[:len(data) // 4 * 4]))
+    key_set.update(array("I", data[2:2 + (len(data) - 2) // 4 * 4]))
+    return key_set
+
+
+def get_bucket_set(key_set):
+    """键按斐波那契散列取32位乘积的高位作为桶号"""
+    hash_iter = map(and_, map(mul, key_set, repeat(FIBONACCI_MULTIPLIER)), repeat(0xFFFFFFFF))
+    return set(map(rshift, hash_iter, repeat(32 - GRAM_BUCKET_BITS)))
+
+
+def get_text_buckets(text):
+    """文本块的索引桶：全部相邻二元组和单字"""
+    data = text.encode("utf-16-le")
+    key_set = get_bigram_keys(data)
+    key_set.update(array("H", data))
+    return get_bucket_set(key_set)
+
+
+def get_keyword_buckets(keyword):
+    """关键字的索引桶：两个及以上字符时为全部相邻二元组，只有一个字符时为该字符"""
+    data = keyword.encode("utf-16-le")
+    if len(keyword) < 2:
+        return get_bucket_set(set(array("H", data)))
+    return get_bucket_set(get_bigram_keys(data))
+
+
+def create_search_db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE blocks (
+            block_id INTEGER PRIMARY KEY,
+            offset INTEGER NOT NULL
+        );
+        CREATE TABLE postings (
+            bucket INTEGER NOT NULL,
+            segment_start INTEGER NOT NULL,
+            bitmap BLOB NOT NULL,
+            PRIMARY KEY (bucket, segment_start)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def build_search_index(data_path, encoding, db_path, is_interrupted=None):
+    """
+    建立二元组分块倒排索引并写入SQLite数据库（流式扫描，可在工作线程中调用）
+
+    文本按行对齐切成约64KB的块，为每个相邻二元组（以及单个字符，用于单字查询）记录出现过的块。
+    常用汉字几乎出现在每个块中，按单字求交集筛不掉多少块，二元组则稀疏得多。
+    二元组哈希到固定数量的桶中，索引大小与不同二元组的数量无关，桶冲突只会多出几个候选块。
+    查询时对关键字所有二元组所在桶的块位图求交集得到候选块，只需解码并校验候选块。
+    关键字不跨行，因此匹配结果不会跨越块边界。
+    每 SEGMENT_BLOCK_COUNT 个块写出一个分段，内存占用与书籍大小无关。
+    :return: 是否完成，中止时删除未完成的数据库并返回False
+    """
+    temp_path = db_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = create_search_db(temp_path)
+    bitmap_map = {}  # 桶 -> 分段内的块位图
+    segment_start = 0
+    block_id = 0
+
+    def flush():
+        # 位图按小端保存并去掉末尾的零字节
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                         ((bucket, segment_start, bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"))
+                          for bucket, bitmap in sorted(bitmap_map.items())))
+        bitmap_map.clear()
+
+    completed = False
+    try:
+        offset = 0
+        remainder = b""
+        with open(data_path, "rb") as f:
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                data = remainder + chunk
+                if chunk:
+                    # 只处理到最后一个换行符，剩余部分并入下一次读取
+                    cut = data.rfind(b"\n") + 1
+                    if cut == 0:
+                        remainder = data
+                        continue
+                    data, remainder = data[:cut], data[cut:]
+                else:
+                    remainder = b""
+                position = 0
+                while position < len(data):
+                    if is_interrupted is not None and is_interrupted():
+                        return False
+                    end = position + SEARCH_BLOCK_SIZE
+                    if end < len(data):
+                        # 块结尾对齐到换行符
+                        newline = data.find(b"\n", end)
+                        end = len(data) if newline < 0 else newline + 1
+                    else:
+                        end = len(data)
+                    text = data[position:end].decode(encoding, errors="ignore").lower()
+                    bit = 1 << (block_id - segment_start)
+                    for bucket in get_text_buckets(text):
+                        bitmap_map[bucket] = bitmap_map.get(bucket, 0) | bit
+                    conn.execute("INSERT INTO blocks VALUES (?, ?)", (block_id, offset + position))
+                    block_id += 1
+                    position = end
+                    if block_id - segment_start >= SEGMENT_BLOCK_COUNT:
+                        flush()
+                        segment_start = block_id
+                offset += len(data)
+                if not chunk:
+                    break
+        flush()
+        # 末尾偏移，便于取最后一块的范围
+        conn.execute("INSERT INTO blocks VALUES (?, ?)", (block_id, offset))
+        conn.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        conn.commit()
+        completed = True
+    finally:
+        conn.close()
+        if not completed:
+            os.remove(temp_path)
+    os.replace(temp_path, db_path)
+    return True
+
+
+def load_search_index(index, index_dir, is_interrupted=None):
+    """
+    获取书籍的全文索引，优先使用按文件指纹持久化的索引
+    :param index: 章节索引（book_engine.load_book_index 的结果）
+    :param index_dir: 索引目录
+    :return: BookSearchIndex，中止时返回None
+    """
+    db_path = os.path.join(index_dir, index["fingerprint"] + ".search.db")
+    if os.path.exists(db_path):
+        try:
+            search_index = BookSearchIndex(db_path)
+            if search_index.version == SEARCH_INDEX_VERSION:
+                return search_index
+            search_index.close()
+        except sqlite3.Error:
+            print(f"书籍全文索引损坏，重新建立:{db_path}")
+        os.remove(db_path)
+    if not build_search_index(index["data_path"], index["encoding"], db_path, is_interrupted):
+        return None
+    return BookSearchIndex(db_path)
+
+
+class BookSearchIndex:
+    """
+    书籍全文索引（二元组或字符所在的桶 -> 块位图）
+
+    倒排表留在SQLite数据库中，查询时只读取关键字所在的桶，内存中只保存块偏移。
+    由建立索引的线程打开，在搜索线程中查询，同一时间只有一个线程使用。
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.block_offsets = []
+        if self.version == SEARCH_INDEX_VERSION:
+            self.block_offsets = [row[0] for row in self.conn.execute("SELECT offset FROM blocks ORDER BY block_id")]
+
+    def get_bitmap(self, bucket):
+        """桶内二元组出现过的块位图（各分段按起始块号移位后合并）"""
+        bitmap = 0
+        for segment_start, value in self.conn.execute(
+                "SELECT segment_start, bitmap FROM postings WHERE bucket = ?", (bucket,)):
+            bitmap |= int.from_bytes(value, "little") << segment_start
+        return bitmap
+
+    def get_candidate_blocks(self, keyword):
+        """包含关键字全部二元组的块（按顺序，桶冲突时可能多出少量不含关键字的块）"""
+        bucket_set = get_keyword_buckets(keyword)
+        if not bucket_set:
+            return []
+        bitmap = -1
+        # 先与最稀有的桶求交集，尽早得到空集
+        for bucket_bitmap in sorted(map(self.get_bitmap, bucket_set), key=lambda b: bin(b).count("1")):
+            bitmap &= bucket_bitmap
+            if not bitmap:
+                return []
+        block_list = []
+        while bitmap:
+            # 取最低位的1
+            low_bit = bitmap & -bitmap
+            block_list.append(low_bit.bit_length() - 1)
+            bitmap ^= low_bit
+        return block_list
+
+    def get_block_range(self, block_id):
+        return self.block_offsets[block_id], self.block_offsets[block_id + 1]
+
+    def close(self):
+        self.conn.close()
+
+
+class BookSearchSignals(QObject):
+    # 一批搜索结果(搜索id, 结果列表)，结果为 (章节下标, 章节内序号, 摘要)
+    result_found = Signal(int, list)
+    # 搜索完成(搜索id, 结果总数)
+    finished = Signal(int, int)
+
+
+class BookSearchTask(QRunnable):
+    """在线程池中校验候选块并逐批发送结果"""
+
+    def __init__(self, service, search_id, book, search_index, keyword):
+        super().__init__()
+        self.service = service
+        self.signals = service.signals
+        self.search_id = search_id
+        self.book = book
+        self.search_index = search_index
+        self.keyword = keyword
+
+    def run(self):
+        count = 0
+        try:
+            count = self.search()
+        except ValueError:
+            # 书籍已关闭（内存映射已释放）
+            pass
+        except Exception:
+            print(f"书籍搜索失败:{traceback.format_exc()}")
+        self.signals.finished.emit(self.search_id, count)
+
+    def search(self):
+        keyword = self.keyword
+        encoding = self.book.encoding
+        # 计算字节偏移时不能带BOM
+        raw_encoding = encoding.replace("-sig", "")
+        chapter_offsets = self.book.chapter_offsets
+        ordinal_map = {}  # 章节下标 -> 已找到的匹配数
+        batch = []
+        count = 0
+        for block_id in self.search_index.get_candidate_blocks(keyword):
+            if self.service.is_cancelled(self.search_id):
+                return count
+            start, end = self.search_index.get_block_range(block_id)
+            text = self.book.data[start:end].decode(encoding, errors="ignore")
+            lower_text = text.lower()
+            position = lower_text.find(keyword)
+            last_position = 0
+            byte_offset = start
+            while position >= 0:
+                # 增量计算匹配位置的字节偏移，用于定位章节
+                byte_offset += len(text[last_position:position].encode(raw_encoding, errors="ignore"))
+                last_position = position
+                chapter_index = max(bisect_right(chapter_offsets, byte_offset) - 1, 0)
+                ordinal = ordinal_map.get(chapter_index, 0)
+                ordinal_map[chapter_index] = ordinal + 1
+                snippet = text[max(position - SNIPPET_CONTEXT_LENGTH, 0):
+                               position + len(keyword) + SNIPPET_CONTEXT_LENGTH]
+                batch.append((chapter_index, ordinal, snippet.replace("\r", "").replace("\n", " ")))
+                count += 1
+                if count >= MAX_RESULT_COUNT:
+                    self.signals.result_found.emit(self.search_id, batch)
+                    return count
+                if len(batch) >= RESULT_BATCH_SIZE:
+                    self.signals.result_found.emit(self.search_id, batch)
+                    batch = []
+                position = lower_text.find(keyword, position + len(keyword))
+        if batch:
+            self.signals.result_found.emit(self.search_id, batch)
+        return count
+
+
+class BookSearchService(QObject):
+    """
+    书籍全文搜索服务
+
+    新的搜索会取消旧搜索，结果在GUI线程逐批回调。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.signals = BookSearchSignals()
+        self.signals.result_found.connect(self._on_result_found)
+        self.signals.finished.connect(self._on_finished)
+        self.current_search_id = 0
+        self.result_callback = None
+        self.finished_callback = None
+
+    def search(self, book, search_index, keyword, result_callback, finished_callback):
+        """
+        搜索关键字
+        :param result_callback: 一批结果的回调，参数为 [(章节下标, 章节内序号, 摘要)]
+        :param finished_callback: 完成回调，参数为结果总数
+        """
+        self.cancel()
+        self.current_search_id += 1
+        self.result_callback = result_callback
+        self.finished_callback = finished_callback
+        self.thread_pool.start(BookSearchTask(self, self.current_search_id, book, search_index,
+                                              normalize_keyword(keyword)))
+
+    def cancel(self):
+        # 搜索id变化后，运行中的任务会在下一个块停止
+        self.current_search_id += 1
+        self.result_callback = None
+        self.finished_callback = None
+
+    def is_cancelled(self, search_id):
+        return search_id != self.current_search_id
+
+    def clear(self):
+        self.cancel()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+
+    def _on_result_found(self, search_id, result_list):
+        if search_id == self.current_search_id and self.result_callback is not None:
+            self.result_callback(result_list)
+
+    def _on_finished(self, search_id, count):
+        if search_id == self.current_search_id and self.finished_callback is not None:
+            self.finished_callback(count)
@@ -0,0 +1,596 @@
+# coding:utf-8
+import os
+import math
+import uuid
+import sqlite3
+import tempfile
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QEvent, QAbstractListModel, QModelIndex, QPersistentModelIndex, QRect, QPoint, QSize
+from PySide6.QtGui import QTextDocument, QAbstractTextDocumentLayout, QPalette, QColor, QPainter, QGuiApplication
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView, QMenu, QTextBrowser, QFrame
+
+
+# 内存中保留的消息数（更早或更新的消息在滚动到边缘时从记录中分页加载）
+MAX_LOADED_MESSAGE_COUNT = 60
+# 每次分页加载的消息数
+PAGE_SIZE = 20
+# 缓存的排版文档数
+DOCUMENT_CACHE_SIZE = 64
+# 缓存的高度数（超出后整体清空）
+HEIGHT_CACHE_SIZE = 4096
+# 头像大小
+AVATAR_SIZE = 40
+# 头像与气泡的间距
+AVATAR_SPACING = 10
+# 气泡内边距
+BUBBLE_PADDING = 10
+# 气泡最大宽度占比
+BUBBLE_WIDTH_RATIO = 0.8
+# 行外边距
+ROW_MARGIN = 10
+# 行间距（上下各一半）
+ROW_SPACING = 3
+# 流式输出时的光标
+STREAM_CURSOR = "▌"
+# 消息角色
+ROLE_USER = "user"
+ROLE_ASSISTANT = "assistant"
+ROLE_REASONING = "reasoning"
+
+
+def prepare_markdown(markdown):
+    # 对内容进行处理
+    return markdown.replace("~", " &tilde; ")
+
+
+def get_bubble_colors(role, is_dark):
+    """气泡配色 (背景色, 文字颜色, 链接颜色, 边框颜色)"""
+    if is_dark:
+        if role == ROLE_USER:
+            return "#2a2a2a", "#e0e0e0", "#b0b0ff", None
+        if role == ROLE_REASONING:
+            return "#333333", "#b0b0b0", "#9090ff", "#555555"
+        return "#1e1e1e", "#f0f0f0", "#b0b0ff", None
+    if role == ROLE_USER:
+        return "#f0f0f0", "#333333", "#5050b0", None
+    if role == ROLE_REASONING:
+        return "#f5f5f5", "#666666", "#404090", "#d0d0d0"
+    return "#eaeaea", "#333333", "#5050b0", None
+
+
+class ChatTranscriptStore:
+    """
+    对话记录（SQLite临时文件）
+
+    所有消息在添加时写入记录，内存中只保留当前窗口内的消息，窗口外的消息按需分页读取。
+    只在GUI线程中使用，窗口关闭时删除。
+    """
+
+    def __init__(self):
+        store_dir = os.path.join(tempfile.gettempdir(), "AgileTilesChat")
+        os.makedirs(store_dir, exist_ok=True)
+        self.db_path = os.path.join(store_dir, f"{uuid.uuid4().hex}.db")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                role TEXT NOT NULL,
+                text TEXT NOT NULL,
+                provider TEXT,
+                show_avatar INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def insert(self, message):
+        cursor = self.conn.execute(
+            "INSERT INTO messages (role, text, provider, show_avatar) VALUES (?, ?, ?, ?)",
+            (message["role"], message["text"], message["provider"], int(message["show_avatar"]))
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def update(self, message):
+        self.conn.execute("UPDATE messages SET role = ?, text = ? WHERE id = ?",
+                          (message["role"], message["text"], message["id"]))
+        self.conn.commit()
+
+    def load_before(self, message_id, limit=PAGE_SIZE):
+        """读取id之前的limit条消息（按顺序）"""
+        rows = self.conn.execute(
+            "SELECT id, role, text, provider, show_avatar FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (message_id, limit)
+        ).fetchall()
+        return [self._to_message(row) for row in reversed(rows)]
+
+    def load_after(self, message_id, limit=PAGE_SIZE):
+        """读取id之后的limit条消息（按顺序）"""
+        rows = self.conn.execute(
+            "SELECT id, role, text, provider, show_avatar FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+            (message_id, limit)
+        ).fetchall()
+        return [self._to_message(row) for row in rows]
+
+    def has_before(self, message_id):
+        return self.conn.execute("SELECT 1 FROM messages WHERE id < ? LIMIT 1", (message_id,)).fetchone() is not None
+
+    def has_after(self, message_id):
+        return self.conn.execute("SELECT 1 FROM messages WHERE id > ? LIMIT 1", (message_id,)).fetchone() is not None
+
+    def get_last_id(self):
+        row = self.conn.execute("SELECT MAX(id) FROM messages").fetchone()
+        return row[0] or 0
+
+    def close(self):
+        try:
+            self.conn.close()
+            os.remove(self.db_path)
+        except OSError as e:
+            print(f"删除对话记录失败:{e}")
+
+    @staticmethod
+    def _to_message(row):
+        return {
+            "id": row[0],
+            "role": row[1],
+            "text": row[2],
+            "provider": row[3],
+            "show_avatar": bool(row[4]),
+            "live": False,
+            "document": None,
+            "version": 0,
+        }
+
+
+class ChatTranscriptModel(QAbstractListModel):
+    """
+    对话消息模型
+
+    只持有连续的一段消息（最多约 MAX_LOADED_MESSAGE_COUNT 条），其余保存在 ChatTranscriptStore 中。
+    流式输出中的消息（live）持有自己的排版文档，由 MarkdownStreamRenderer 增量写入，不会被移出窗口。
+    """
+    MessageRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.message_list = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.message_list)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.message_list):
+            return None
+        message = self.message_list[index.row()]
+        if role == self.MessageRole:
+            return message
+        if role == Qt.ItemDataRole.DisplayRole:
+            return message["text"]
+        return None
+
+    def add_message(self, role, text, provider=None, show_avatar=True, live=False):
+        """
+        添加消息
+        :param live: 是否为流式输出中的消息（持有自己的排版文档）
+        :return: 消息字典
+        """
+        if self.has_newer():
+            # 正在浏览较早的消息时添加新消息，先回到最新的一页
+            self.reload_latest()
+        message = {
+            "role": role,
+            "text": text,
+            "provider": provider,
+            "show_avatar": show_avatar,
+            "live": live,
+            "document": None,
+            "version": 0,
+        }
+        if live:
+            document = QTextDocument(self)
+            document.setPlainText(STREAM_CURSOR)
+            message["document"] = document
+        message["id"] = self.store.insert(message)
+        row = len(self.message_list)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.message_list.append(message)
+        self.endInsertRows()
+        return message
+
+    def refresh_message(self, message):
+        """流式消息的文档已更新"""
+        row = self.row_of(message)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def finish_message(self, message, text, role=None):
+        """
+        设置消息的最终内容（流式消息结束后释放其文档，之后按需排版并缓存）
+        """
+        message["text"] = text
+        if role is not None:
+            message["role"] = role
+        message["live"] = False
+        if message["document"] is not None:
+            message["document"].deleteLater()
+            message["document"] = None
+        message["version"] += 1
+        self.store.update(message)
+        self.refresh_message(message)
+
+    def set_role(self, message, role):
+        message["role"] = role
+        message["version"] += 1
+        self.store.update(message)
+        self.refresh_message(message)
+
+    def row_of(self, message):
+        # 需要查找的通常是最新的消息，从后往前找
+        for row in range(len(self.message_list) - 1, -1, -1):
+            if self.message_list[row] is message:
+                return row
+        return -1
+
+    def has_older(self):
+        return bool(self.message_list) and self.store.has_before(self.message_list[0]["id"])
+
+    def has_newer(self):
+        return bool(self.message_list) and self.store.has_after(self.message_list[-1]["id"])
+
+    def load_older(self):
+        """加载更早的一页消息，返回加载的条数"""
+        if not self.message_list:
+            return 0
+        message_list = self.store.load_before(self.message_list[0]["id"])
+        if message_list:
+            self.beginInsertRows(QModelIndex(), 0, len(message_list) - 1)
+            self.message_list[:0] = message_list
+            self.endInsertRows()
+        return len(message_list)
+
+    def load_newer(self):
+        """加载更新的一页消息，返回加载的条数"""
+        if not self.message_list:
+            return 0
+        message_list = self.store.load_after(self.message_list[-1]["id"])
+        if message_list:
+            row = len(self.message_list)
+            self.beginInsertRows(QModelIndex(), row, row + len(message_list) - 1)
+            self.message_list.extend(message_list)
+            self.endInsertRows()
+        return len(message_list)
+
+    def reload_latest(self):
+        """只保留最新的一页消息"""
+        self.beginResetModel()
+        self.message_list = self.store.load_before(self.store.get_last_id() + 1)
+        self.endResetModel()
+
+    def trim_top(self, max_count=MAX_LOADED_MESSAGE_COUNT):
+        """移出窗口顶部超出数量的消息（流式消息之前停止）"""
+        count = 0
+        while count < len(self.message_list) - max_count and not self.message_list[count]["live"]:
+            count += 1
+        if count:
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+            del self.message_list[:count]
+            self.endRemoveRows()
+
+    def trim_bottom(self, max_count=MAX_LOADED_MESSAGE_COUNT):
+        """移出窗口底部超出数量的消息（遇到流式消息时停止）"""
+        count = 0
+        while count < len(self.message_list) - max_count and not self.message_list[-count - 1]["live"]:
+            count += 1
+        if count:
+            row = len(self.message_list) - count
+            self.beginRemoveRows(QModelIndex(), row, len(self.message_list) - 1)
+            del self.message_list[row:]
+            self.endRemoveRows()
+
+
+class MessageTextBrowser(QTextBrowser):
+    """叠加在气泡上的只读文本框，用于选择和复制部分内容"""
+
+    def __init__(self, text_color, link_color, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setOpenExternalLinks(True)
+        self.setStyleSheet(f"QTextBrowser {{ background: transparent; border: none; color: {text_color}; }}")
+        palette = self.palette()
+        palette.setColor(QPalette.ColorRole.Link, QColor(link_color))
+        self.setPalette(palette)
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        copy_action = menu.addAction("复制")
+        copy_action.setEnabled(self.textCursor().hasSelection())
+        copy_action.triggered.connect(self.copy)
+        select_all_action = menu.addAction("全选")
+        select_all_action.triggered.connect(self.selectAll)
+        menu.exec(event.globalPos())
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """
+    消息气泡绘制代理
+
+    只为可见（或刚测量过）的消息排版，排版好的文档按消息版本放在LRU缓存中，高度按宽度缓存，
+    窗口宽度变化时只重新排版缓存中的文档。
+    """
+
+    def __init__(self, is_dark=False, get_avatar=None, parent=None):
+        super().__init__(parent)
+        self.is_dark = is_dark
+        self.get_avatar = get_avatar
+        self.document_cache = OrderedDict()  # (消息id, 版本, 字体) -> QTextDocument
+        self.height_cache = {}  # (消息id, 版本, 字体, 宽度) -> 高度
+
+    def clear_cache(self):
+        self.document_cache.clear()
+        self.height_cache.clear()
+
+    def get_content_width(self, view_width):
+        """气泡内文本的最大宽度"""
+        width = view_width - AVATAR_SIZE - AVATAR_SPACING - ROW_MARGIN * 2
+        return max(int(width * BUBBLE_WIDTH_RATIO) - BUBBLE_PADDING * 2, 50)
+
+    def get_document(self, message, content_width):
+        font = self.parent().font()
+        document = message["document"]
+        if document is None:
+            key = (message["id"], message["version"], font.key())
+            document = self.document_cache.get(key)
+            if document is None:
+                document = QTextDocument()
+                document.setUndoRedoEnabled(False)
+                document.setDocumentMargin(0)
+                document.setDefaultFont(font)
+                document.setMarkdown(prepare_markdown(message["text"]))
+                self.document_cache[key] = document
+                while len(self.document_cache) > DOCUMENT_CACHE_SIZE:
+                    self.document_cache.popitem(last=False)
+            else:
+                self.document_cache.move_to_end(key)
+        else:
+            if document.documentMargin() != 0:
+                document.setDocumentMargin(0)
+            if document.defaultFont() != font:
+                document.setDefaultFont(font)
+        if document.textWidth() != content_width:
+            document.setTextWidth(content_width)
+        return document
+
+    def sizeHint(self, option, index):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        content_width = self.get_content_width(self.parent().viewport().width())
+        key = (message["id"], message["version"], self.parent().font().key(), content_width)
+        height = None if message["live"] else self.height_cache.get(key)
+        if height is None:
+            document = self.get_document(message, content_width)
+            bubble_height = math.ceil(document.size().height()) + BUBBLE_PADDING * 2
+            height = max(bubble_height, AVATAR_SIZE if message["show_avatar"] else 0) + ROW_SPACING * 2
+            if not message["live"]:
+                if len(self.height_cache) >= HEIGHT_CACHE_SIZE:
+                    self.height_cache.clear()
+                self.height_cache[key] = height
+        return QSize(self.parent().viewport().width(), height)
+
+    def get_layout(self, message, row_rect):
+        """消息的排版文档、头像区域和气泡区域"""
+        rect = row_rect.adjusted(ROW_MARGIN, ROW_SPACING, -ROW_MARGIN, -ROW_SPACING)
+        content_width = self.get_content_width(row_rect.width())
+        document = self.get_document(message, content_width)
+        bubble_width = min(math.ceil(document.idealWidth()), content_width) + BUBBLE_PADDING * 2
+        bubble_height = math.ceil(document.size().height()) + BUBBLE_PADDING * 2
+        if message["role"] == ROLE_USER:
+            avatar_rect = QRect(rect.right() - AVATAR_SIZE + 1, rect.top(), AVATAR_SIZE, AVATAR_SIZE)
+            bubble_rect = QRect(avatar_rect.left() - AVATAR_SPACING - bubble_width, rect.top(),
+                                bubble_width, bubble_height)
+        else:
+            avatar_rect = QRect(rect.left(), rect.top(), AVATAR_SIZE, AVATAR_SIZE)
+            bubble_rect = QRect(avatar_rect.right() + 1 + AVATAR_SPACING, rect.top(), bubble_width, bubble_height)
+        return document, avatar_rect, bubble_rect
+
+    def createEditor(self, parent, option, index):
+        """选择文本用的只读文本框，与气泡内容的排版一致"""
+        message = index.data(ChatTranscriptModel.MessageRole)
+        _, text_color, link_color, _ = get_bubble_colors(message["role"], self.is_dark)
+        editor = MessageTextBrowser(text_color, link_color, parent)
+        editor.setFont(self.parent().font())
+        editor.document().setDocumentMargin(0)
+        editor.setMarkdown(prepare_markdown(message["text"]))
+        return editor
+
+    def setEditorData(self, editor, index):
+        # 内容在创建时已设置（QTextBrowser的用户属性是html，不能用默认实现）
+        pass
+
+    def setModelData(self, editor, model, index):
+        # 只读
+        pass
+
+    def updateEditorGeometry(self, editor, option, index):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        _, _, bubble_rect = self.get_layout(message, option.rect)
+        editor.setGeometry(bubble_rect.adjusted(BUBBLE_PADDING, BUBBLE_PADDING, -BUBBLE_PADDING, -BUBBLE_PADDING))
+
+    def paint(self, painter, option, index):
+        message = index.data(ChatTranscriptModel.MessageRole)
+        document, avatar_rect, bubble_rect = self.get_layout(message, option.rect)
+        bg_color, text_color, link_color, border_color = get_bubble_colors(message["role"], self.is_dark)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # 头像
+        avatar = self.get_avatar(message) if message["show_avatar"] and self.get_avatar is not None else None
+        if avatar is not None:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 255, 255))
+            painter.drawRoundedRect(avatar_rect, 5, 5)
+            painter.drawPixmap(avatar_rect, avatar)
+        # 气泡
+        if border_color is not None:
+            painter.setPen(QColor(border_color))
+        else:
+            painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(bg_color))
+        painter.drawRoundedRect(bubble_rect, 10, 10)
+        # 内容（打开了选择文本框时由文本框绘制）
+        if message is not self.parent().selection_message:
+            painter.translate(bubble_rect.left() + BUBBLE_PADDING, bubble_rect.top() + BUBBLE_PADDING)
+            context = QAbstractTextDocumentLayout.PaintContext()
+            context.palette.setColor(QPalette.ColorRole.Text, QColor(text_color))
+            context.palette.setColor(QPalette.ColorRole.Link, QColor(link_color))
+            document.documentLayout().draw(painter, context)
+        painter.restore()
+
+
+class ChatTranscriptView(QListView):
+    """
+    对话记录视图
+
+    只绘制可见的消息；滚动到顶部（底部）时从对话记录中分页加载更早（更新）的消息，
+    并移出另一端超出数量的消息，内存和排版开销只与窗口内的消息数有关。
+    点击消息时在气泡上打开只读文本框（持久编辑器）选择部分内容，消息滚出窗口后关闭。
+    """
+
+    def __init__(self, model, is_dark=False, get_avatar=None, get_live_text=None, parent=None):
+        """
+        :param model: ChatTranscriptModel
+        :param is_dark: 是否为深色主题
+        :param get_avatar: 获取消息头像的函数，参数为消息
+        :param get_live_text: 获取流式消息当前内容的函数，参数为消息（用于复制）
+        """
+        super().__init__(parent)
+        self.get_live_text = get_live_text
+        self.selection_index = QPersistentModelIndex()  # 打开了选择文本框的消息
+        self.selection_message = None
+        self.setModel(model)
+        self.message_delegate = ChatMessageDelegate(is_dark, get_avatar, self)
+        self.setItemDelegate(self.message_delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(False)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.clicked.connect(self.open_selection_editor)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        # 消息内容变化时重新测量高度
+        model.dataChanged.connect(lambda top_left, bottom_right: self.message_delegate.sizeHintChanged.emit(top_left))
+        self.loading = False
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # 字体变化后缓存的排版全部失效，重新测量高度
+        if event.type() == QEvent.Type.FontChange:
+            self.message_delegate.clear_cache()
+            self.scheduleDelayedItemsLayout()
+
+    def is_at_bottom(self, tolerance=50):
+        scrollbar = self.verticalScrollBar()
+        return scrollbar.maximum() - scrollbar.value() <= tolerance
+
+    def update_layout_now(self):
+        """立即完成延迟的排版，使滚动条范围是最新的"""
+        self.executeDelayedItemsLayout()
+
+    def trim_history(self):
+        """停留在底部时，移出顶部超出数量的消息"""
+        if self.is_at_bottom():
+            self.model().trim_top()
+
+    def open_selection_editor(self, index):
+        """在消息上打开只读文本框，返回文本框（流式消息的内容还在变化，不打开）"""
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message is None or message["live"]:
+            return None
+        if message is not self.selection_message:
+            self.close_selection_editor()
+            self.selection_index = QPersistentModelIndex(index)
+            self.selection_message = message
+            self.openPersistentEditor(index)
+        editor = self.indexWidget(index)
+        if editor is not None:
+            editor.setFocus()
+        return editor
+
+    def close_selection_editor(self):
+        if self.selection_message is None:
+            return
+        if self.selection_index.isValid():
+            self.closePersistentEditor(self.model().index(self.selection_index.row()))
+        self.selection_index = QPersistentModelIndex()
+        self.selection_message = None
+        self.viewport().update()
+
+    def is_selection_visible(self):
+        """打开了选择文本框的消息是否仍在窗口中"""
+        if not self.selection_index.isValid():
+            return False
+        rect = self.visualRect(self.model().index(self.selection_index.row()))
+        return self.viewport().rect().intersects(rect)
+
+    def on_scroll(self, value):
+        # 选择文本框所在的消息滚出窗口（或已被移出）后关闭
+        if self.selection_message is not None and not self.is_selection_visible():
+            self.close_selection_editor()
+        if self.loading:
+            return
+        scrollbar = self.verticalScrollBar()
+        model = self.model()
+        if value == scrollbar.minimum() and model.has_older():
+            self.load_page(model.load_older, model.trim_bottom)
+        elif value == scrollbar.maximum() and model.has_newer():
+            self.load_page(model.load_newer, model.trim_top)
+
+    def load_page(self, load_func, trim_func):
+        """分页加载消息，保持当前可见的消息位置不变"""
+        self.loading = True
+        try:
+            anchor_index = self.indexAt(QPoint(0, 0))
+            anchor_message = anchor_index.data(ChatTranscriptModel.MessageRole)
+            anchor_top = self.visualRect(anchor_index).top()
+            load_func()
+            trim_func()
+            self.update_layout_now()
+            row = self.model().row_of(anchor_message) if anchor_message is not None else -1
+            if row >= 0:
+                offset = self.visualRect(self.model().index(row)).top() - anchor_top
+                self.verticalScrollBar().setValue(self.verticalScrollBar().value() + offset)
+        finally:
+            self.loading = False
+
+    def show_context_menu(self, position):
+        index = self.indexAt(position)
+        if not index.isValid():
+            return
+        message = index.data(ChatTranscriptModel.MessageRole)
+        if message["live"]:
+            # 流式消息的内容还没有写入消息
+            text = self.get_live_text(message) if self.get_live_text is not None else ""
+        else:
+            text = message["text"]
+        menu = QMenu(self)
+        copy_action = menu.addAction("复制")
+        copy_action.triggered.connect(lambda: QGuiApplication.clipboard().setText(text))
+        if not message["live"]:
+            # 菜单显示期间消息可能被移出窗口，使用持久索引
+            persistent_index = QPersistentModelIndex(index)
+            select_all_action = menu.addAction("全选")
+            select_all_action.triggered.connect(lambda: self.select_all(persistent_index))
+        menu.exec(self.viewport().mapToGlobal(position))
+
+    def select_all(self, persistent_index):
+        if not persistent_index.isValid():
+            return
+        editor = self.open_selection_editor(self.model().index(persistent_index.row()))
+        if editor is not None:
+            editor.selectAll()
@@ -0,0 +1,163 @@
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtGui import QTextCursor, QTextBlockFormat, QTextCharFormat, QTextFormat, QFontDatabase
+
+from src.card.main_card.ChatCard.chat_component.ChatTranscript.ChatTranscript import prepare_markdown, STREAM_CURSOR
+
+
+# 重绘间隔（毫秒，约30帧）
+RENDER_INTERVAL = 33
+
+
+def is_fence_close(line):
+    """代码块结束行（只有反引号）"""
+    line = line.strip()
+    return len(line) >= 3 and not line.strip("`")
+
+
+def find_stable_length(markdown):
+    """
+    查找已完成的Markdown块的长度：代码块之外的空行之前的内容不会再被后续文本改变，
+    顶格的代码块开始后（尚未结束），开始行之前的内容也已完成
+    :return: (已完成部分的长度（0表示还没有完成的块）, 是否停在尚未结束的顶格代码块的开始行)
+    """
+    stable_length = 0
+    in_fence = False
+    fence_position = -1  # 当前顶格代码块开始行的位置
+    position = 0
+    while True:
+        line_end = markdown.find("\n", position)
+        if line_end < 0:
+            # 最后一行尚未结束
+            break
+        line = markdown[position:line_end]
+        stripped = line.strip()
+        if in_fence:
+            if is_fence_close(stripped):
+                in_fence = False
+        elif stripped.startswith("```"):
+            in_fence = True
+            fence_position = position if line.startswith("```") else -1
+        elif not stripped:
+            stable_length = line_end + 1
+        position = line_end + 1
+    if in_fence and fence_position >= 0:
+        return fence_position, True
+    return stable_length, False
+
+
+class MarkdownStreamRenderer(QObject):
+    """
+    流式Markdown渲染器
+
+    收到的文本先累积，每帧最多重绘一次；已完成的块追加到文档后不再改变，
+    每次只重新渲染末尾未完成的块。顶格代码块中已完成的行直接作为等宽文本追加，
+    只有最后一行未完成的行会被重绘，单个token的开销与回复总长度无关。
+    """
+
+    def __init__(self, document, prefix="", rendered_callback=None, parent=None):
+        """
+        :param document: 显示内容的文档（流式消息的排版文档）
+        :param prefix: 初始内容
+        :param rendered_callback: 每次重绘后的回调（如滚动到底部）
+        """
+        super().__init__(parent)
+        self.document = document
+        self.rendered_callback = rendered_callback
+        self.chunk_list = [prefix] if prefix else []
+        self.tail_markdown = ""  # 未完成块的Markdown（代码块中为未完成的行）
+        self.tail_position = 0  # 未完成块在文档中的起始位置
+        self.in_code_block = False  # 是否正在输出顶格代码块
+        self.code_block_format = QTextBlockFormat()
+        self.code_char_format = QTextCharFormat()
+        self.code_char_format.setFontFamilies([QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont).family()])
+        self.code_char_format.setFontFixedPitch(True)
+        # 文档只追加不撤销，关闭撤销栈避免内存随回复增长
+        self.document.setUndoRedoEnabled(False)
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(RENDER_INTERVAL)
+        self.render_timer.timeout.connect(self.render)
+
+    def append(self, text):
+        """追加文本，在下一帧重绘"""
+        if not text:
+            return
+        self.chunk_list.append(text)
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def render(self):
+        markdown = self.tail_markdown + "".join(self.chunk_list)
+        self.chunk_list = []
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(self.tail_position)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        while True:
+            if self.in_code_block:
+                markdown = self.append_code_lines(cursor, markdown)
+                if self.in_code_block:
+                    # 未完成的行
+                    self.tail_position = cursor.position()
+                    self.tail_markdown = markdown
+                    cursor.insertText(markdown + STREAM_CURSOR, self.code_char_format)
+                    break
+            stable_length, at_code_block = find_stable_length(markdown)
+            if markdown[:stable_length].strip():
+                # 已完成的块追加到文档，之后的内容从新的空白段落开始
+                cursor.insertMarkdown(prepare_markdown(markdown[:stable_length]))
+                cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+            markdown = markdown[stable_length:]
+            self.tail_position = cursor.position()
+            if at_code_block:
+                markdown = self.start_code_block(cursor, markdown)
+                continue
+            self.tail_markdown = markdown
+            cursor.insertMarkdown(prepare_markdown(markdown + STREAM_CURSOR))
+            break
+        if self.rendered_callback is not None:
+            self.rendered_callback()
+
+    def start_code_block(self, cursor, markdown):
+        """
+        开始顶格代码块：当前（空白）段落改为代码格式
+        :return: 开始行之后的内容
+        """
+        line_end = markdown.find("\n")
+        self.code_block_format = QTextBlockFormat()
+        self.code_block_format.setNonBreakableLines(True)
+        self.code_block_format.setProperty(QTextFormat.Property.BlockCodeFence, ord("`"))
+        language = markdown[:line_end].strip().lstrip("`").strip()
+        if language:
+            self.code_block_format.setProperty(QTextFormat.Property.BlockCodeLanguage, language)
+        cursor.setBlockFormat(self.code_block_format)
+        cursor.setBlockCharFormat(self.code_char_format)
+        self.in_code_block = True
+        return markdown[line_end + 1:]
+
+    def append_code_lines(self, cursor, markdown):
+        """
+        追加代码块中已完成的行，遇到结束行时恢复为普通段落
+        :return: 剩余的内容
+        """
+        position = 0
+        while True:
+            line_end = markdown.find("\n", position)
+            if line_end < 0:
+                return markdown[position:]
+            line = markdown[position:line_end]
+            position = line_end + 1
+            if is_fence_close(line):
+                # 代码块结束，当前（空白）段落恢复为普通格式
+                cursor.setBlockFormat(QTextBlockFormat())
+                cursor.setBlockCharFormat(QTextCharFormat())
+                cursor.setCharFormat(QTextCharFormat())
+                self.in_code_block = False
+                return markdown[position:]
+            cursor.insertText(line.rstrip("\r"), self.code_char_format)
+            cursor.insertBlock(self.code_block_format, self.code_char_format)
+
+    def finish(self):
+        """停止流式渲染（最终内容由调用方整体重新渲染一次）"""
+        self.render_timer.stop()
+        self.chunk_list = []
@@ -5,27 +5,40 @@ import traceback
 
 from src.util import my_shiboken_util
 
-from PySide6.QtCore import Signal, Qt, QUrl, QEasingCurve, QPropertyAnimation
+from PySide6.QtCore import Signal, Qt, QUrl, QEasingCurve, QPropertyAnimation, QThread
 from PySide6.QtGui import QPixmap
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QApplication, \
-    QComboBox, QScrollArea, QSizePolicy
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox
 
-from src.card.main_card.ChatCard.chat_component.ChatBubble.ChatBubble import ChatBubble
+from src.card.main_card.ChatCard.chat_component.ChatTranscript.ChatTranscript import ChatTranscriptStore, \
+    ChatTranscriptModel, ChatTranscriptView, ROLE_USER, ROLE_ASSISTANT, ROLE_REASONING
+from src.card.main_card.ChatCard.chat_component.ChatTranscript.MarkdownStreamRenderer import MarkdownStreamRenderer
 from src.card.main_card.ChatCard.chat_component.EnterTextEdit.EnterTextEdit import EnterTextEdit
 from src.card.main_card.ChatCard.chat_component.chat_form import Ui_Form
+from src.card.main_card.ChatCard.chat_component import chat_context
+from src.card.main_card.ChatCard.chat_component.sse_parser import SseStreamWorker
 from src.client import common
 from src.my_component.AgileTilesAcrylicWindow.AgileTilesAcrylicWindow import AgileTilesAcrylicWindow
 import src.ui.style_util as style_util
 
 
+# 保留的响应开头数据大小（请求失败时服务端返回的错误JSON）
+RESPONSE_HEAD_SIZE = 4 * 1024
+
+
 class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
     use_parent = None
     setting_config = None
     setting_signal = Signal(str)
+    # 转发给解析线程的SSE数据(请求批次, 数据)
+    sse_data_received = Signal(int, object)
+    # 对话请求结束(请求批次)
+    sse_stream_closed = Signal(int)
     mode_list = None
     # 请求
     call_count_reply = None
+    # 请求上下文的token预算
+    context_token_budget = chat_context.CONTEXT_TOKEN_BUDGET
 
     def __init__(self, parent=None, use_parent=None, ai_title=None, ai_actor=None, content=None, icon=None):
         super(ChatWindow, self).__init__(is_dark=use_parent.is_dark, form_theme_mode=use_parent.form_theme_mode,
@@ -121,19 +134,71 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
             print(e)
 
     def init_ui(self, ai_title):
-        # 聊天区域
-        self.chat_scroll = QScrollArea()
-        self.chat_scroll.setWidgetResizable(True)
-        self.chat_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.chat_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.chat_scroll.setStyleSheet(style_util.scroll_bar_style)
-        self.chat_container = QWidget()
-        self.chat_layout = QVBoxLayout(self.chat_container)
-        self.chat_layout.setAlignment(Qt.AlignTop)
-        self.chat_layout.setSpacing(5)
-        self.chat_layout.setContentsMargins(10, 10, 10, 10)
-        self.chat_scroll.setWidget(self.chat_container)
-        self.verticalLayout.addWidget(self.chat_scroll)
+        # 聊天区域（只绘制可见的消息，较早的消息保存在对话记录中，滚动时分页加载）
+        self.transcript_store = ChatTranscriptStore()
+        self.transcript_model = ChatTranscriptModel(self.transcript_store, self)
+        self.chat_view = ChatTranscriptView(self.transcript_model, is_dark=self.is_dark,
+                                            get_avatar=self.get_message_avatar,
+                                            get_live_text=self.get_live_text)
+        self.chat_view.setStyleSheet("QListView { background: transparent; border: none; }" +
+                                     style_util.scroll_bar_style)
+        self.verticalLayout.addWidget(self.chat_view)
+
+        # 回答状态栏（结束对话按钮和结束原因提示）
+        response_bar = QWidget()
+        response_bar.setFixedHeight(30)  # 固定高度
+        response_layout = QHBoxLayout(response_bar)
+        response_layout.setContentsMargins(40, 0, 40, 0)  # 左右边距
+        response_layout.setSpacing(5)
+
+        # 左侧占位弹簧
+        response_layout.addStretch(3)
+
+        # 结束提示标签
+        self.finish_reason_label = QLabel()
+        self.finish_reason_label.setVisible(False)  # 初始不可见
+        self.finish_reason_label.setAlignment(Qt.AlignCenter)
+        self.finish_reason_label.setStyleSheet("""
+            QLabel {
+                background-color: rgba(255, 100, 100, 0.15);
+                border-radius: 5px;
+                padding: 2px 8px;
+                font-size: 10px;
+                color: #ff3333;
+                font-weight: bold;
+            }
+        """)
+        response_layout.addWidget(self.finish_reason_label, 1)
+
+        # 结束对话按钮
+        self.stop_button = QPushButton()
+        self.stop_button.setVisible(False)  # 回答时才显示
+        self.stop_button.setIcon(style_util.get_icon_by_path("Character/close-one", custom_color="#FF0000"))
+        self.stop_button.setText("结束对话")
+        self.stop_button.setToolTip("结束回答")
+        self.stop_button.setFixedHeight(24)
+        self.stop_button.setStyleSheet("""
+            QPushButton {
+                background-color: rgba(255, 100, 100, 0.2);
+                border: none;
+                border-radius: 12px;
+                padding: 2px 8px;
+                font-size: 10px;
+                color: #ff3333;
+            }
+            QPushButton:hover {
+                background-color: rgba(255, 100, 100, 0.3);
+            }
+            QPushButton:pressed {
+                background-color: rgba(255, 100, 100, 0.4);
+            }
+        """)
+        self.stop_button.clicked.connect(self.stop_response)
+        response_layout.addWidget(self.stop_button, 1, alignment=Qt.AlignRight)
+
+        # 右侧占位弹簧
+        response_layout.addStretch(3)
+        self.verticalLayout.addWidget(response_bar)
 
         # 输入区域
         input_widget = QWidget()
@@ -184,22 +249,32 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
             "hunyuan": self.create_avatar(is_user=False, provider="hunyuan"),
             "spark": self.create_avatar(is_user=False, provider="spark"),
         }
-        # 透明占位头像
-        self.transparent_avatar = self.create_transparent_avatar()
-
         # 网络管理器
         self.network_manager = QNetworkAccessManager(self)
 
         # SSE相关状态
-        self.current_reply_bubble = None  # 最终回复气泡
-        self.current_reasoning_bubble = None  # 思考过程气泡
+        self.current_reply_message = None  # 最终回复消息
+        self.current_reasoning_message = None  # 思考过程消息
+        self.current_provider = None  # 当前回答的ai厂商
         self.current_reply = ""
         self.current_reasoning = ""
+        self.reply_renderer = None  # 回复消息的流式渲染器
+        self.reasoning_renderer = None  # 思考消息的流式渲染器
         self.sse_reply = None
-        self.buffer = bytearray()
-        self.current_ai_message_container = None  # 记录当前AI消息容器
-        self.stop_button = None  # 结束对话按钮
+        self.response_head = bytearray()  # 响应开头的数据（请求失败时用于解析错误信息）
         self.stop_response_tag = False
+        self.sse_generation = 0  # 请求批次，用于丢弃已停止请求的增量
+        self.stream_active = False
+        # SSE解析线程（行切分和JSON解析不占用GUI线程）
+        self.sse_thread = QThread(self)
+        self.sse_worker = SseStreamWorker()
+        self.sse_worker.moveToThread(self.sse_thread)
+        self.sse_thread.finished.connect(self.sse_worker.deleteLater)
+        self.sse_data_received.connect(self.sse_worker.feed)
+        self.sse_stream_closed.connect(self.sse_worker.finish)
+        self.sse_worker.deltas_parsed.connect(self.handle_deltas)
+        self.sse_worker.stream_finished.connect(self.handle_stream_finished)
+        self.sse_thread.start()
 
         # 初始化模型选择
         if ai_title == "DeepSeek":
@@ -245,7 +320,7 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
                 prologue = content["prologue"]
 
             # 添加开场白并显示
-            self.add_message(prologue, is_user=False, provider=provider, is_actor=True)
+            self.add_message(prologue, is_user=False, provider=provider)
 
             # 将开场白添加到历史记录
             self.history.append({
@@ -319,7 +394,7 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
 
     def smooth_scroll_to(self, target_value, duration=500):
         """平滑滚动到指定位置"""
-        scrollbar = self.chat_scroll.verticalScrollBar()
+        scrollbar = self.chat_view.verticalScrollBar()
         current_value = scrollbar.value()
 
         # 如果已经在目标位置，直接返回
@@ -341,39 +416,17 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
     def scroll_to_bottom(self, must_scroll=False):
         """平滑滚动到底部"""
         try:
-            scrollbar = self.chat_scroll.verticalScrollBar()
             # 如果滚动条距离底部太远就不滚动
-            if not must_scroll and (scrollbar.maximum() - scrollbar.value()) > 50:
+            if not must_scroll and not self.chat_view.is_at_bottom():
                 return
+            # 先完成延迟的排版，滚动条范围才是最新的
+            self.chat_view.update_layout_now()
+            scrollbar = self.chat_view.verticalScrollBar()
             # 使用平滑滚动动画
             self.smooth_scroll_to(scrollbar.maximum())
         except Exception as e:
             print(f"滚动到底部时出错: {e}")
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-
-        # 使用动画更新气泡宽度
-        self.update_bubble_widths_with_animation()
-
-    def update_bubble_widths_with_animation(self, duration=500):
-        """使用动画更新气泡宽度"""
-        for i in range(self.chat_layout.count()):
-            widget = self.chat_layout.itemAt(i).widget()
-            if widget:
-                for child in widget.findChildren(ChatBubble):
-                    if child.parent() and child.parent().parent():
-                        max_width = int(child.parent().parent().width() * 0.95)
-
-                        # 使用动画平滑过渡
-                        if child.maximumWidth() != max_width:
-                            anim = QPropertyAnimation(child, b"maximumWidth")
-                            anim.setDuration(duration)
-                            anim.setStartValue(child.maximumWidth())
-                            anim.setEndValue(max_width)
-                            anim.setEasingCurve(QEasingCurve.OutQuad)
-                            anim.start()
-
     def create_avatar(self, is_user=False, is_vip=False, provider="deepseek"):
         if is_user:
             if is_vip:
@@ -387,212 +440,78 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
                 return QPixmap(":static/img/IconPark/png/" + image_end_path)
             return self.use_parent.toolkit.style_util.get_pixmap_by_path("Custom/" + provider, is_dark=self.is_dark)
 
-    def create_transparent_avatar(self):
-        """创建透明占位头像"""
-        pixmap = QPixmap(40, 40)
-        pixmap.fill(Qt.transparent)
-        return pixmap
-
-    def add_message(self, text, is_user, is_reasoning=False, parent_container=None, provider="deepseek", is_actor=False):
+    def get_message_avatar(self, message):
+        """消息的头像"""
+        if message["role"] == ROLE_USER:
+            return self.user_avatar
+        return self.bot_avatar_map.get(message["provider"], self.bot_avatar_map["deepseek"])
+
+    def get_live_text(self, message):
+        """流式消息的当前内容（复制时使用）"""
+        if message is self.current_reply_message:
+            return self.current_reply
+        if message is self.current_reasoning_message:
+            return self.current_reasoning
+        return ""
+
+    def add_message(self, text, is_user, provider="deepseek", live=False, show_avatar=True):
         """
-        添加消息气泡
+        添加消息
         :param text: 消息文本
         :param is_user: 是否是用户消息
-        :param is_reasoning: 是否是思考气泡
-        :param parent_container: 父容器（用于AI消息的思考和回复气泡共享同一容器）
         :param provider: ai厂商
-        :param is_actor: 是否是角色，角色需要开场白
-        :return: 气泡控件
+        :param live: 是否为流式输出的消息（由 MarkdownStreamRenderer 增量渲染）
+        :param show_avatar: 是否显示头像（同一回答的第二条消息不显示）
+        :return: 消息
         """
-        # 如果是AI消息且没有指定父容器，创建新的消息容器
-        if not is_user and not parent_container:
-            # 创建消息行容器
-            parent_container = QWidget()
-            container_layout = QHBoxLayout(parent_container)
-            container_layout.setContentsMargins(0, 0, 0, 0)
-            container_layout.setSpacing(10)
-
-            # 创建头像标签
-            avatar_label = QLabel()
-            avatar_label.setPixmap(self.bot_avatar_map[provider])
-            avatar_label.setFixedSize(40, 40)
-            avatar_label.setScaledContents(True)
-            avatar_label.setStyleSheet("""
-            QLabel {
-                background-color: rgb(255, 255, 255);
-                border: 0px solid white;
-                border-radius: 5px;
-            }""")
-
-            # 创建气泡容器（垂直布局，用于放置思考气泡和回复气泡）
-            bubble_container = QWidget()
-            bubble_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            bubble_layout = QVBoxLayout(bubble_container)
-            bubble_layout.setContentsMargins(0, 0, 0, 0)
-            bubble_layout.setSpacing(2)  # 减小气泡间距
-
-            # 创建角色的开场白气泡
-            if is_actor:
-                bubble = ChatBubble(
-                    text=text,
-                    is_user=is_user,
-                    is_dark=self.is_dark,
-                    is_reasoning=is_reasoning
-                )
-                style_util.set_font_and_right_click_style(self.use_parent, bubble)
-                bubble_layout.addWidget(bubble)
-
-            # 设置对齐方式
-            container_layout.addWidget(avatar_label, 1, alignment=Qt.AlignTop)
-            container_layout.addWidget(bubble_container, 3)
-            container_layout.addStretch(1)
-
-            # 添加到聊天区域
-            self.chat_layout.addWidget(parent_container)
-            self.current_ai_message_container = parent_container
-
-            if is_actor:
-                # 返回气泡容器用于后续添加气泡
-                return bubble_container, parent_container
-
-            # 新增：创建底部布局（包含停止按钮和结束提示标签）
-            bottom_container = QWidget()
-            bottom_container.setFixedHeight(30)  # 固定高度
-            bottom_layout = QHBoxLayout(bottom_container)
-            bottom_layout.setContentsMargins(40, 0, 40, 0)  # 左右边距
-            bottom_layout.setSpacing(5)
-
-            # 左侧占位弹簧
-            bottom_layout.addStretch(3)
-
-            # 新增：结束提示标签
-            self.finish_reason_label = QLabel()
-            self.finish_reason_label.setVisible(False)  # 初始不可见
-            self.finish_reason_label.setAlignment(Qt.AlignCenter)
-            self.finish_reason_label.setStyleSheet("""
-                QLabel {
-                    background-color: rgba(255, 100, 100, 0.15);
-                    border-radius: 5px;
-                    padding: 2px 8px;
-                    font-size: 10px;
-                    color: #ff3333;
-                    font-weight: bold;
-                }
-            """)
-            bottom_layout.addWidget(self.finish_reason_label, 1)
-
-            # 结束对话按钮
-            self.stop_button = QPushButton()
-            self.stop_button.setIcon(style_util.get_icon_by_path("Character/close-one", custom_color="#FF0000"))
-            self.stop_button.setText("结束对话")
-            self.stop_button.setToolTip("结束回答")
-            self.stop_button.setFixedHeight(24)
-            self.stop_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(255, 100, 100, 0.2);
-                    border: none;
-                    border-radius: 12px;
-                    padding: 2px 8px;
-                    font-size: 10px;
-                    color: #ff3333;
-                }
-                QPushButton:hover {
-                    background-color: rgba(255, 100, 100, 0.3);
-                }
-                QPushButton:pressed {
-                    background-color: rgba(255, 100, 100, 0.4);
-                }
-            """)
-            self.stop_button.clicked.connect(self.stop_response)
-            bottom_layout.addWidget(self.stop_button, 1, alignment=Qt.AlignRight)
-
-            # 右侧占位弹簧
-            bottom_layout.addStretch(3)
-
-            # 添加到底部布局
-            self.chat_layout.addWidget(bottom_container)
-            self.scroll_to_bottom(must_scroll=True)
-
-            # 返回气泡容器用于后续添加气泡
-            return bubble_container, parent_container
-
-        # 如果是用户消息，创建完整的消息容器
-        elif is_user:
-            # 创建消息行容器
-            message_container = QWidget()
-            container_layout = QHBoxLayout(message_container)
-            container_layout.setContentsMargins(0, 0, 0, 0)
-            container_layout.setSpacing(10)
-
-            # 创建头像标签
-            avatar_label = QLabel()
-            avatar_label.setPixmap(self.user_avatar)
-            avatar_label.setFixedSize(40, 40)
-            avatar_label.setScaledContents(True)
-            avatar_label.setStyleSheet("""
-            QLabel {
-                background-color: rgb(255, 255, 255);
-                border: 0px solid white;
-                border-radius: 5px;
-            }""")
-
-            # 创建气泡容器
-            bubble_container = QWidget()
-            bubble_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            bubble_layout = QVBoxLayout(bubble_container)
-            bubble_layout.setContentsMargins(0, 0, 0, 0)
-            bubble_layout.setSpacing(0)
-
-            # 创建气泡
-            bubble = ChatBubble(
-                text=text,
-                is_user=is_user,
-                is_dark=self.is_dark,
-                is_reasoning=is_reasoning
-            )
-            style_util.set_font_and_right_click_style(self.use_parent, bubble)
-            bubble_layout.addWidget(bubble)
-
-            # 计算最大宽度
-            max_width = int(QApplication.primaryScreen().size().width() * 0.8)
-            bubble.setMaximumWidth(max_width)
-
-            # 设置对齐方式
-            container_layout.addStretch(1)
-            container_layout.addWidget(bubble_container, 3)
-            container_layout.addWidget(avatar_label, 1, alignment=Qt.AlignTop)
-
-            self.chat_layout.addWidget(message_container)
-            self.scroll_to_bottom()
-
-            return bubble, message_container
-
-        # 如果是AI消息的子气泡（思考或回复）
+        message = self.transcript_model.add_message(ROLE_USER if is_user else ROLE_ASSISTANT, text,
+                                                    provider=provider, show_avatar=show_avatar, live=live)
+        # 停留在底部时，较早的消息移出内存
+        self.chat_view.trim_history()
+        self.scroll_to_bottom(must_scroll=not is_user)
+        return message
+
+    def create_stream_renderer(self, message, prefix=""):
+        """为流式消息创建渲染器，每次重绘后更新消息高度并滚动到底部"""
+        return MarkdownStreamRenderer(message["document"], prefix=prefix,
+                                      rendered_callback=lambda: self.on_stream_rendered(message), parent=self)
+
+    def on_stream_rendered(self, message):
+        self.transcript_model.refresh_message(message)
+        self.scroll_to_bottom()
+
+    def start_reasoning_message(self):
+        """开始显示思考过程：回复还没有内容时，回复的占位消息转为思考消息，回复消息在收到内容时再添加"""
+        self.current_reasoning = "思考:\n"
+        if self.current_reply_message is not None and not self.current_reply:
+            self.current_reasoning_message = self.current_reply_message
+            self.transcript_model.set_role(self.current_reasoning_message, ROLE_REASONING)
+            self.current_reply_message = None
+            if self.reply_renderer is not None:
+                self.reply_renderer.finish()
+                self.reply_renderer.deleteLater()
+                self.reply_renderer = None
         else:
-            # 获取父容器中的气泡布局
-            bubble_container = parent_container.layout().itemAt(1).widget().layout()
-
-            # 创建气泡
-            bubble = ChatBubble(
-                text=text,
-                is_user=is_user,
-                is_dark=self.is_dark,
-                is_reasoning=is_reasoning
-            )
-            style_util.set_font_and_right_click_style(self.use_parent, bubble)
-
-            # 计算最大宽度
-            max_width = int(QApplication.primaryScreen().size().width() * 0.8)
-            bubble.setMaximumWidth(max_width)
-
-            # 思考气泡放在顶部，回复气泡放在底部
-            if is_reasoning:
-                bubble_container.insertWidget(0, bubble)
-            else:
-                bubble_container.addWidget(bubble)
-
-            self.scroll_to_bottom(must_scroll=True)
-            return bubble, parent_container
+            self.current_reasoning_message = self.transcript_model.add_message(
+                ROLE_REASONING, "", provider=self.current_provider, show_avatar=False, live=True)
+        self.reasoning_renderer = self.create_stream_renderer(self.current_reasoning_message,
+                                                              prefix=self.current_reasoning)
+
+    def finish_stream_messages(self, reply_text=None, reasoning_text=None):
+        """停止流式渲染，以完整内容重新渲染流式消息（去掉光标）"""
+        self.stop_stream_renderers()
+        if self.current_reasoning_message is not None:
+            self.transcript_model.finish_message(
+                self.current_reasoning_message, self.current_reasoning if reasoning_text is None else reasoning_text)
+        if self.current_reply_message is not None:
+            self.transcript_model.finish_message(
+                self.current_reply_message, self.current_reply if reply_text is None else reply_text)
+
+    def reset_stream_state(self):
+        self.current_reasoning_message = None
+        self.current_reply_message = None
+        self.current_reasoning = ""
+        self.current_reply = ""
 
     def send_message(self):
         text = self.input_field.toPlainText().strip()
@@ -613,21 +532,22 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
         # 将用户消息添加到历史记录
         self.history.append({"role": "user", "content": text})
 
-        # 创建AI消息容器（包含气泡布局）
-        bubble_container, message_container = self.add_message("", False, provider=provider)
-        self.current_ai_message_container = message_container
-
-        # 在容器中添加实际回复气泡（初始状态）
-        self.current_reply_bubble, _ = self.add_message("▌", False, is_reasoning=False,
-                                                        parent_container=message_container, provider=provider)
-        self.current_reply_bubble.setVisible(True)
+        # 添加AI回复消息（初始显示光标，收到内容后流式渲染）
+        self.current_provider = provider
+        self.current_reply_message = self.add_message("", False, provider=provider, live=True)
         self.current_reply = ""
+        self.reply_renderer = self.create_stream_renderer(self.current_reply_message)
 
-        # 初始状态不创建思考气泡
-        self.current_reasoning_bubble = None
+        # 初始状态不创建思考消息
+        self.current_reasoning_message = None
         self.current_reasoning = ""
+        self.reasoning_renderer = None
 
-        self.buffer = bytearray()
+        # 显示结束对话按钮
+        self.finish_reason_label.setVisible(False)
+        self.stop_button.setVisible(True)
+
+        self.response_head = bytearray()
 
         # 取消任何正在进行的请求
         if self.sse_reply and self.sse_reply.isRunning():
@@ -643,17 +563,20 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
         request.setRawHeader(b"Authorization", bytes(self.use_parent.access_token, "utf-8"))
         request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
 
-        # 创建请求数据
+        # 创建请求数据（只发送预算内的上下文，较早的对话压缩为摘要）
+        messages, token_count = chat_context.build_context_messages(self.history, self.context_token_budget)
         request_data = {
-            "messages": self.history,
+            "messages": messages,
             "provider": provider,
             "model": model
         }
-        data = json.dumps(request_data)
-        data_str = data.encode('utf-8')
-        print(f"请求数据:{json.dumps(request_data, indent=4, ensure_ascii=False, sort_keys=True)}")
+        data_str = chat_context.encode_request_body(request_data)
+        print(f"请求数据:{provider}/{model}，消息{len(messages)}/{len(self.history)}条，"
+              f"约{token_count}tokens，{len(data_str)}字节")
 
         # 发送POST请求
+        self.sse_generation += 1
+        self.stream_active = True
         self.sse_reply = self.network_manager.post(request, data_str)
 
         # 连接信号
@@ -664,89 +587,70 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
     def handle_ready_read(self):
         if not self.sse_reply:
             return
+        data = self.sse_reply.readAll().data()
+        if len(self.response_head) < RESPONSE_HEAD_SIZE:
+            self.response_head.extend(data[:RESPONSE_HEAD_SIZE - len(self.response_head)])
+        # 交给解析线程，解析出的增量通过 handle_deltas 返回
+        self.sse_data_received.emit(self.sse_generation, data)
+
+    def handle_deltas(self, generation, delta_list):
+        # 已停止、出错或已结束的请求
+        if generation != self.sse_generation or not self.stream_active:
+            return
         # 确保停止按钮可见
         if self.stop_button:
             self.stop_button.setVisible(True)
 
-        self.buffer.extend(self.sse_reply.readAll())
+        for json_data in delta_list:
+            try:
+                content = json_data.get("content", "")
+                reasoning_content = json_data.get("reasoningContent", "")
+                is_finished = json_data.get("isFinished", False)
+                # 新增：获取结束原因
+                finish_reason = json_data.get("finishReason", "")
+            except AttributeError:
+                print(f"增量格式错误: {json_data}")
+                continue
+
+            # 1. 接收到思考信息：展示思考消息
+            if reasoning_content and not self.current_reasoning_message:
+                self.start_reasoning_message()
+
+            # 更新思考消息（每帧最多重绘一次）
+            if reasoning_content and self.current_reasoning_message:
+                self.current_reasoning += reasoning_content
+                self.reasoning_renderer.append(reasoning_content)
+
+            # 2. 接收到实际回复内容：思考之后的回复作为新消息显示在思考消息下方
+            if content and not self.current_reply_message:
+                self.current_reply_message = self.add_message("", False, provider=self.current_provider,
+                                                              live=True, show_avatar=False)
+                self.reply_renderer = self.create_stream_renderer(self.current_reply_message)
+
+            # 更新回复消息（每帧最多重绘一次，重绘后滚动到底部）
+            if content and self.current_reply_message:
+                self.current_reply += content
+                self.reply_renderer.append(content)
+
+            # 如果结束则重置状态并将AI回复添加到历史记录
+            if is_finished:
+                self.stream_active = False
+                # 移除消息中的光标
+                self.finish_stream_messages()
+
+                # 将AI回复添加到历史记录
+                if self.current_reply:
+                    self.history.append({
+                        "role": "assistant",
+                        "content": self.current_reply
+                    })
 
-        while b'\n' in self.buffer:
-            line_end = self.buffer.index(b'\n')
-            line = bytes(self.buffer[:line_end]).decode('utf-8', errors='ignore').strip()
-            del self.buffer[:line_end + 1]
+                # 新增：处理结束原因提示
+                self.handle_finish_reason(finish_reason)
 
-            if line.startswith("data:"):
-                is_end = False
-                try:
-                    json_data = json.loads(line[5:].strip())
-                    content = json_data.get("content", "")
-                    reasoning_content = json_data.get("reasoningContent", "")
-                    is_finished = json_data.get("isFinished", False)
-                    # 新增：获取结束原因
-                    finish_reason = json_data.get("finishReason", "")
-
-                    # 1. 接收到思考信息：展示思考气泡，隐藏实际回复气泡
-                    if reasoning_content and not self.current_reasoning_bubble:
-                        # 创建思考气泡（位于回复气泡上方）
-                        self.current_reasoning_bubble, _ = self.add_message("▌", False, is_reasoning=True,
-                                                                            parent_container=self.current_ai_message_container)
-                        self.current_reasoning = "思考:\n"
-                        self.current_reply_bubble.setVisible(False)  # 隐藏回复气泡
-
-                    # 更新思考气泡
-                    if reasoning_content and self.current_reasoning_bubble:
-                        self.current_reasoning += reasoning_content
-                        display_text = self.current_reasoning + ("▌" if not is_finished else "")
-                        self.current_reasoning_bubble.setMarkdown(display_text)
-                        self.current_reasoning_bubble.adjustSize()
-
-                    # 2. 接收到实际回复内容：展示实际回复气泡，如果思考气泡没有内容就隐藏思考气泡
-                    if content and self.current_reasoning_bubble:
-                        # 显示回复气泡
-                        self.current_reply_bubble.setVisible(True)
-                        # 如果思考气泡没有内容就隐藏思考气泡
-                        if self.current_reasoning == "":
-                            self.current_reasoning_bubble.setVisible(False)
-
-                    # 更新回复气泡
-                    if content and self.current_reply_bubble:
-                        self.current_reply += content
-                        display_text = self.current_reply + ("▌" if not is_finished else "")
-                        self.current_reply_bubble.setMarkdown(display_text)
-                        self.current_reply_bubble.adjustSize()
-
-                    # 滚动到底部
-                    self.scroll_to_bottom()
-
-                    # 如果结束则重置状态并将AI回复添加到历史记录
-                    if is_finished:
-                        is_end = True
-                        # 移除气泡中的光标
-                        if self.current_reasoning_bubble:
-                            self.current_reasoning_bubble.setMarkdown(self.current_reasoning)
-                        if self.current_reply_bubble:
-                            self.current_reply_bubble.setMarkdown(self.current_reply)
-
-                        # 将AI回复添加到历史记录
-                        if self.current_reply:
-                            self.history.append({
-                                "role": "assistant",
-                                "content": self.current_reply
-                            })
-
-                        # 新增：处理结束原因提示
-                        self.handle_finish_reason(finish_reason)
-
-                        # 重置状态
-                        self.current_reasoning_bubble = None
-                        self.current_reply_bubble = None
-                        self.current_ai_message_container = None
-                        self.current_reasoning = ""
-                        self.current_reply = ""
-                except json.JSONDecodeError:
-                    print(f"JSON解析错误: {line}")
-                if is_end:
-                    break
+                # 重置状态
+                self.reset_stream_state()
+                break
 
     # 新增：处理结束原因提示的方法
     def handle_finish_reason(self, finish_reason):
@@ -766,6 +670,14 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
             self.stop_button.setVisible(False)
 
     def handle_finished(self):
+        # 数据可能还在解析线程中排队，全部解析完成后（handle_stream_finished）再结束本次回答
+        self.sse_stream_closed.emit(self.sse_generation)
+
+    def handle_stream_finished(self, generation):
+        # 已停止的请求
+        if generation != self.sse_generation:
+            return
+        self.stream_active = False
         # 重新启用控件
         self.set_controls_enabled(True)
         # 隐藏停止按钮
@@ -774,52 +686,18 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
 
         try:
             if self.sse_reply:
-                if self.buffer:
-                    try:
-                        line = bytes(self.buffer).decode('utf-8', errors='ignore').strip()
-                        if line.startswith("data:"):
-                            json_data = json.loads(line[5:].strip())
-                            content = json_data.get("content", "")
-                            reasoning_content = json_data.get("reasoningContent", "")
-                            is_finished = json_data.get("isFinished", False)
-
-                            # 更新气泡
-                            if reasoning_content and self.current_reasoning_bubble:
-                                self.current_reasoning += reasoning_content
-                                self.current_reasoning_bubble.setMarkdown(self.current_reasoning)
-
-                            if content and self.current_reply_bubble:
-                                self.current_reply += content
-                                self.current_reply_bubble.setMarkdown(self.current_reply)
-
-                            # 处理未完成的回复
-                            if is_finished and self.current_reply:
-                                self.history.append({
-                                    "role": "assistant",
-                                    "content": self.current_reply
-                                })
-                    except json.JSONDecodeError:
-                        print("完成时JSON解析错误")
-
                 # 确保重置状态
-                if self.current_reasoning_bubble:
-                    self.current_reasoning_bubble.setMarkdown(self.current_reasoning)
-
-                if self.current_reply_bubble:
-                    self.current_reply_bubble.setMarkdown(self.current_reply)
+                has_reply_message = self.current_reply_message is not None
+                self.finish_stream_messages()
 
-                    # 确保将最终回复添加到历史记录
-                    if self.current_reply:
-                        self.history.append({
-                            "role": "assistant",
-                            "content": self.current_reply
-                        })
+                # 确保将最终回复添加到历史记录
+                if has_reply_message and self.current_reply:
+                    self.history.append({
+                        "role": "assistant",
+                        "content": self.current_reply
+                    })
 
-                self.current_reasoning_bubble = None
-                self.current_reply_bubble = None
-                self.current_ai_message_container = None
-                self.current_reasoning = ""
-                self.current_reply = ""
+                self.reset_stream_state()
 
                 # 设置输入焦点
                 self.input_field.setFocus()
@@ -829,7 +707,7 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
                 if self.sse_reply is not None and my_shiboken_util.is_qobject_valid(self.sse_reply):
                     self.sse_reply.deleteLater()
                 self.sse_reply = None
-                self.buffer = bytearray()
+                self.response_head = bytearray()
         except Exception as e:
             print(f"处理完成时错误: {e}")
 
@@ -837,6 +715,8 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
         self.update_call_count()
 
     def handle_error(self, code):
+        # 之后到达的增量不再显示
+        self.stream_active = False
         # 重新启用控件
         self.set_controls_enabled(True)
         # 停止响应的tag
@@ -846,10 +726,10 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
         try:
             if self.sse_reply:
                 # 尝试读取响应体获取错误详情
-                error_data = self.sse_reply.readAll()
+                error_data = self.sse_reply.readAll().data()
                 try:
                     # 解析JSON响应
-                    json_data = json.loads(bytes(self.buffer).decode('utf-8'))
+                    json_data = json.loads(bytes(self.response_head + error_data).decode('utf-8'))
                     cloud_error = json_data.get("error", "未知错误")
                     if cloud_error == "Too Many Requests":
                         cloud_error = "今日使用次数已达上限"
@@ -857,29 +737,26 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
                     # 解析失败则使用HTTP错误信息
                     cloud_error = self.sse_reply.errorString()
 
-                # 更新气泡显示错误信息
-                if self.current_reply_bubble:
-                    error_msg = f"**网络错误**\n```\n{cloud_error}\n```"
-                    self.current_reply_bubble.setMarkdown(error_msg)
-
-                if self.current_reasoning_bubble:
-                    self.current_reasoning_bubble.setMarkdown("请求失败")
+                # 更新消息显示错误信息
+                error_msg = f"**网络错误**\n```\n{cloud_error}\n```"
+                has_reasoning_message = self.current_reasoning_message is not None
+                has_reply_message = self.current_reply_message is not None
+                self.finish_stream_messages(reply_text=error_msg, reasoning_text="请求失败")
+                if has_reasoning_message and not has_reply_message:
+                    # 思考过程中出错，错误信息显示在思考消息下方
+                    self.add_message(error_msg, False, provider=self.current_provider, show_avatar=False)
 
                 # 移除最后一条用户消息（因为请求失败）
                 if self.history and self.history[-1]["role"] == "user":
                     self.history.pop()
 
-                self.current_reasoning_bubble = None
-                self.current_reply_bubble = None
-                self.current_ai_message_container = None
-                self.current_reasoning = ""
-                self.current_reply = ""
+                self.reset_stream_state()
 
                 # 在执行删除操作前，检查C++对象是否存活
                 if self.sse_reply is not None and my_shiboken_util.is_qobject_valid(self.sse_reply):
                     self.sse_reply.deleteLater()
                 self.sse_reply = None
-                self.buffer = bytearray()
+                self.response_head = bytearray()
         except Exception as e:
             print(f"处理错误时发生错误: {e}")
 
@@ -895,22 +772,17 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
             self.set_controls_enabled(True)
 
             if self.sse_reply and self.sse_reply.isRunning():
-                # 终止SSE请求
+                # 终止SSE请求，解析线程中还未返回的增量随旧批次丢弃
                 self.sse_reply.abort()
+                self.sse_generation += 1
+                self.stream_active = False
 
                 # 获取当前内容
-                current_content = ""
+                current_content = self.current_reply.replace("▌", "")
 
-                # 更新气泡显示已停止（不显示错误信息）
-                if self.current_reply_bubble:
-                    # 移除光标并添加停止提示
-                    current_content = self.current_reply.replace("▌", "")
-                    self.current_reply_bubble.setMarkdown(current_content + "\n\n**回答已停止**")
-
-                # 如果有思考气泡，也更新其内容
-                if self.current_reasoning_bubble:
-                    current_reasoning = self.current_reasoning.replace("▌", "")
-                    self.current_reasoning_bubble.setMarkdown(current_reasoning)
+                # 更新消息显示已停止（不显示错误信息），思考消息也去掉光标
+                self.finish_stream_messages(reply_text=current_content + "\n\n**回答已停止**",
+                                            reasoning_text=self.current_reasoning.replace("▌", ""))
 
                 # 将已接收的内容添加到历史记录（如果内容不为空）
                 if self.current_reply.strip():
@@ -923,17 +795,13 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
                 self.finish_reason_label.setVisible(False)
 
                 # 重置状态
-                self.current_reasoning_bubble = None
-                self.current_reply_bubble = None
-                self.current_ai_message_container = None
-                self.current_reasoning = ""
-                self.current_reply = ""
+                self.reset_stream_state()
 
                 # 清理资源
                 if self.sse_reply is not None:
                     self.sse_reply.deleteLater()
                 self.sse_reply = None
-                self.buffer = bytearray()
+                self.response_head = bytearray()
 
                 # 隐藏停止按钮
                 if self.stop_button:
@@ -952,6 +820,15 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
         # 停止响应
         self.stop_response_tag = True
 
+    def stop_stream_renderers(self):
+        """停止流式渲染，之后由调用方用完整内容重新渲染消息"""
+        for renderer in (self.reply_renderer, self.reasoning_renderer):
+            if renderer is not None:
+                renderer.finish()
+                renderer.deleteLater()
+        self.reply_renderer = None
+        self.reasoning_renderer = None
+
     def set_controls_enabled(self, enabled):
         """设置输入控件启用状态"""
         self.send_btn.setEnabled(enabled)
@@ -982,5 +859,10 @@ class ChatWindow(AgileTilesAcrylicWindow, Ui_Form):
             self.stop_response()
         except Exception as e:
             print(f"删除对话请求失败: {traceback.format_exc()}")
+        # 结束SSE解析线程
+        self.sse_thread.quit()
+        self.sse_thread.wait()
+        # 删除对话记录
+        self.transcript_store.close()
         # 调用父类方法
         super().closeEvent(event)
\ No newline at end of file
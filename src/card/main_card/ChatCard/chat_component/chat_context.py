@@ -0,0 +1,84 @@
+# coding:utf-8
+import re
+import json
+from functools import lru_cache
+
+
+# 请求上下文的token预算（估算值）
+CONTEXT_TOKEN_BUDGET = 8000
+# 更早对话摘要的token预算
+SUMMARY_TOKEN_BUDGET = 400
+# 摘要中每条消息保留的字数
+SUMMARY_MESSAGE_LENGTH = 60
+# 每条消息的固定开销（角色、分隔符等）
+MESSAGE_TOKEN_OVERHEAD = 4
+# 中日韩字符（大约一个字一个token）
+CJK_PATTERN = re.compile(r"[⺀-鿿가-힯豈-﫿＀-￯]")
+
+
+@lru_cache(maxsize=2048)
+def estimate_tokens(text):
+    """估算文本的token数：中日韩字符按一字一个，其余按四个字符一个"""
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4 + MESSAGE_TOKEN_OVERHEAD
+
+
+def summarize_messages(message_list, token_budget=SUMMARY_TOKEN_BUDGET):
+    """将被省略的较早对话压缩为摘要（从最近的开始保留，直到用完预算）"""
+    line_list = []
+    used = 0
+    for message in reversed(message_list):
+        content = " ".join(message["content"].split())
+        if len(content) > SUMMARY_MESSAGE_LENGTH:
+            content = content[:SUMMARY_MESSAGE_LENGTH] + "…"
+        line = ("用户：" if message["role"] == "user" else "助手：") + content
+        tokens = estimate_tokens(line)
+        if used + tokens > token_budget:
+            break
+        line_list.append(line)
+        used += tokens
+    line_list.reverse()
+    return "\n".join(line_list)
+
+
+def build_context_messages(history, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    按token预算构建请求的消息列表
+
+    系统消息（人设）和最近的对话原样保留，超出预算的较早对话被省略，
+    并以摘要的形式附在保留的第一条用户消息前。最新一条消息总是保留。
+    :param history: 完整的历史消息
+    :param token_budget: token预算
+    :return: (消息列表, 估算的token数)
+    """
+    system_list = [message for message in history if message["role"] == "system"]
+    dialog_list = [message for message in history if message["role"] != "system"]
+    system_tokens = sum(estimate_tokens(message["content"]) for message in system_list)
+    token_list = [estimate_tokens(message["content"]) for message in dialog_list]
+    if system_tokens + sum(token_list) <= token_budget:
+        return history, system_tokens + sum(token_list)
+    # 需要省略较早的对话时，为摘要预留预算
+    used = system_tokens
+    kept_count = 0
+    for tokens in reversed(token_list):
+        if kept_count and used + tokens > token_budget - SUMMARY_TOKEN_BUDGET:
+            break
+        used += tokens
+        kept_count += 1
+    kept_list = dialog_list[len(dialog_list) - kept_count:]
+    # 部分模型要求对话以用户消息开始
+    while len(kept_list) > 1 and kept_list[0]["role"] != "user":
+        used -= estimate_tokens(kept_list[0]["content"])
+        kept_list = kept_list[1:]
+    dropped_list = dialog_list[:len(dialog_list) - len(kept_list)]
+    summary = summarize_messages(dropped_list)
+    if summary and kept_list[0]["role"] == "user":
+        content = f"（以下是之前对话的摘要，供参考）\n{summary}\n\n{kept_list[0]['content']}"
+        used += estimate_tokens(content) - estimate_tokens(kept_list[0]["content"])
+        kept_list = [{"role": "user", "content": content}] + kept_list[1:]
+    return system_list + kept_list, used
+
+
+def encode_request_body(request_data):
+    """紧凑编码请求体：去掉多余空白，中文直接按UTF-8编码（转义形式每个字占6字节）"""
+    return json.dumps(request_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,155 @@
+# coding:utf-8
+import json
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+
+class SseEvent:
+    """一条SSE事件"""
+
+    def __init__(self, data, event="message", event_id=""):
+        self.data = data
+        self.event = event
+        self.id = event_id
+
+
+class SseParser:
+    """
+    增量SSE（text/event-stream）解析器
+
+    每次追加数据后只查找最后一个换行符，把完整的行整段解码再切分，不完整的最后一行留在缓冲区，
+    缓冲区每个分块只压缩一次（原来每解析一行都要在缓冲区中查找、复制和删除）。
+    支持多行 data 字段、event/id/retry 字段和注释行，空行时派发事件。
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()  # 不完整的最后一行
+        self.data_lines = []
+        self.event_type = ""
+        self.last_event_id = ""  # 最近的事件id（重新连接时作为 Last-Event-ID 发送）
+        self.retry = None  # 服务端建议的重连间隔（毫秒）
+
+    def reset(self):
+        """新的连接开始时丢弃未完成的事件（保留 last_event_id 与 retry）"""
+        self.buffer = bytearray()
+        self.data_lines = []
+        self.event_type = ""
+
+    def feed(self, data):
+        """
+        追加数据并解析
+        :return: 解析出的完整事件列表
+        """
+        event_list = []
+        line_end = data.rfind(b"\n")
+        if line_end < 0:
+            self.buffer += data
+            return event_list
+        # 通过内存视图切片和解码，不额外复制分块
+        view = memoryview(data)
+        if self.buffer:
+            # 按换行符对齐，UTF-8多字节字符不会被截断
+            self.buffer += view[:line_end]
+            text = self.buffer.decode("utf-8", errors="ignore")
+            self.buffer = bytearray()
+        else:
+            text = str(view[:line_end], "utf-8", "ignore")
+        self.buffer += view[line_end + 1:]
+        for line in text.split("\n"):
+            self._process_line(line, event_list)
+        return event_list
+
+    def finish(self):
+        """数据流结束：解析最后一行（没有换行符结尾）并派发未完成的事件"""
+        event_list = []
+        if self.buffer:
+            self._process_line(self.buffer.decode("utf-8", errors="ignore"), event_list)
+        self._dispatch(event_list)
+        self.reset()
+        return event_list
+
+    def _process_line(self, line, event_list):
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line:
+            self._dispatch(event_list)
+            return
+        if line.startswith(":"):
+            # 注释（心跳）
+            return
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self.data_lines.append(value)
+        elif field == "event":
+            self.event_type = value
+        elif field == "id":
+            self.last_event_id = value
+        elif field == "retry" and value.isdigit():
+            self.retry = int(value)
+
+    def _dispatch(self, event_list):
+        if self.data_lines:
+            event_list.append(SseEvent("\n".join(self.data_lines), self.event_type or "message", self.last_event_id))
+        self.data_lines = []
+        self.event_type = ""
+
+
+def decode_event_data(data):
+    """
+    解析事件中的JSON增量
+    :return: 增量字典列表（不规范的服务端把多条JSON放在一个事件的多行 data 中时逐行解析）
+    """
+    try:
+        return [json.loads(data)]
+    except json.JSONDecodeError:
+        pass
+    delta_list = []
+    for line in data.split("\n"):
+        if not line.strip():
+            continue
+        try:
+            delta_list.append(json.loads(line))
+        except json.JSONDecodeError:
+            print(f"JSON解析错误: {line}")
+    return delta_list
+
+
+class SseStreamWorker(QObject):
+    """
+    SSE解析工作对象（移动到独立线程中运行）
+
+    GUI线程只负责读取网络数据并转发，行切分和JSON解析都在工作线程中完成，
+    解析出的增量按批次通过信号返回。
+    """
+    # 解析出的增量(请求批次, 增量字典列表)
+    deltas_parsed = Signal(int, list)
+    # 数据流已结束且全部解析完成(请求批次)
+    stream_finished = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parser = SseParser()
+        self.generation = 0
+
+    @Slot(int, object)
+    def feed(self, generation, data):
+        if generation != self.generation:
+            # 新的请求
+            self.generation = generation
+            self.parser.reset()
+        self.emit_deltas(generation, self.parser.feed(data))
+
+    @Slot(int)
+    def finish(self, generation):
+        if generation == self.generation:
+            self.emit_deltas(generation, self.parser.finish())
+        self.stream_finished.emit(generation)
+
+    def emit_deltas(self, generation, event_list):
+        delta_list = []
+        for event in event_list:
+            delta_list.extend(decode_event_data(event.data))
+        if delta_list:
+            self.deltas_parsed.emit(generation, delta_list)
@@ -1,17 +1,24 @@
 import os
+import sys
 import subprocess
 import webbrowser
-from urllib.parse import unquote, quote
-from PySide6.QtCore import QRect, Qt
-from PySide6.QtGui import QFont, QTextCursor, QTextOption
-from PySide6.QtWidgets import (QLabel, QPushButton, QLineEdit, QTextBrowser,
+from PySide6.QtCore import QRect, Qt, QTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import (QLabel, QPushButton, QLineEdit,
                                QWidget, QStackedWidget, QVBoxLayout, QHBoxLayout,
                                QSizePolicy)
 from src.card.MainCardManager.MainCard import MainCard
-from src.thread_list.everything_search_thread import EverythingStatusThread, EverythingSearchThread
+from src.card.main_card.FileSearchCard.file_search_result_view import FileSearchResultModel, FileSearchResultView, \
+    RESULT_PAGE_SIZE
+from src.thread_list.everything_search_thread import EverythingStatusThread, FileSearchServiceThread
+from src.thread_list.file_search_backend import get_default_backend, BACKEND_INDEX
+from src.thread_list.file_index_searcher import MAX_COUNT_RESULTS
 from src.ui import style_util
 from src.my_component.LoadAnimation.LoadAnimation import LoadAnimation
 
+# 输入停止多久后开始搜索（毫秒）
+SEARCH_DEBOUNCE_INTERVAL = 250
+
 file_type_map_list = [
     # 音频
     {
@@ -110,14 +117,15 @@ class FileSearchCard(MainCard):
 
     # 搜索相关
     status_thread = None
-    search_thread = None
+    search_service = None  # 常驻的搜索服务线程
+    search_timer = None  # 输入防抖定时器
+    search_generation = 0  # 当前查询的批次
     is_indexing = False
     current_search_text = ""
-    current_offset = 0
-    has_more_results = False
     total_results = 0
-    displayed_results = 0
     everything_path = None  # Everything安装路径
+    search_backend = None  # 搜索后端（Everything或内置文件索引）
+    index_root_list = None  # 内置文件索引的目录列表（默认用户目录）
     is_ready = False  # Everything是否就绪
     load_ok = False
 
@@ -126,6 +134,9 @@ class FileSearchCard(MainCard):
         super().__init__(main_object=main_object, parent=parent, theme=theme, card=card, cache=cache, data=data,
                          toolkit=toolkit, logger=logger, save_data_func=save_data_func)
         self.everything_path = "./static/thirdparty/everything/"
+        self.search_backend = get_default_backend()
+        if isinstance(data, dict):
+            self.index_root_list = data.get("indexRootList")
 
         # 图标路径
         self.file_icon_path = "Base/save"
@@ -152,10 +163,11 @@ class FileSearchCard(MainCard):
                     self.status_thread.stop()
             except Exception as e:
                 print(e)
-            # 停止搜索线程
+            # 停止搜索服务
             try:
-                if self.search_thread and self.search_thread.isRunning():
-                    self.search_thread.stop()
+                self.search_timer.stop()
+                if self.search_service and self.search_service.isRunning():
+                    self.search_service.stop()
             except Exception as e:
                 print(e)
             # 清理UI元素
@@ -163,8 +175,8 @@ class FileSearchCard(MainCard):
             self.line_edit_search.deleteLater()
             self.push_button_search.setVisible(False)
             self.push_button_search.deleteLater()
-            self.text_browser_results.setVisible(False)
-            self.text_browser_results.deleteLater()
+            self.result_view.setVisible(False)
+            self.result_view.deleteLater()
             self.label_status.setVisible(False)
             self.label_status.deleteLater()
             self.label_indexing.setVisible(False)
@@ -173,8 +185,6 @@ class FileSearchCard(MainCard):
             self.label_ready_status.deleteLater()
             self.load_animation.setVisible(False)
             self.load_animation.deleteLater()
-            self.label_loading_more.setVisible(False)
-            self.label_loading_more.deleteLater()
         except Exception as e:
             print(e)
         super().clear()
@@ -185,12 +195,12 @@ class FileSearchCard(MainCard):
         """
         try:
             # 如果有搜索器实例且启动了Everything进程，则关闭它
-            if (hasattr(self, 'search_thread') and
-                    self.search_thread and
-                    hasattr(self.search_thread.searcher, 'everything_process') and
-                    self.search_thread.searcher.everything_process):
+            if (hasattr(self, 'search_service') and
+                    self.search_service and
+                    hasattr(self.search_service.searcher, 'everything_process') and
+                    self.search_service.searcher.everything_process):
 
-                process = self.search_thread.searcher.everything_process
+                process = self.search_service.searcher.everything_process
                 if process.poll() is None:  # 检查进程是否仍在运行
                     process.terminate()  # 终止进程
                     try:
@@ -275,6 +285,12 @@ class FileSearchCard(MainCard):
         self.line_edit_search.setPlaceholderText("输入搜索本地文件/文件夹的关键词...")
         self.line_edit_search.setMinimumHeight(25)
         self.line_edit_search.returnPressed.connect(self.start_search)
+        # 边输入边搜索（停止输入一段时间后才搜索）
+        self.search_timer = QTimer(self.main_widget)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_INTERVAL)
+        self.search_timer.timeout.connect(self.start_search)
+        self.line_edit_search.textEdited.connect(self.on_search_text_edited)
         search_layout.addWidget(self.line_edit_search)
 
         # 清理按钮
@@ -328,24 +344,15 @@ class FileSearchCard(MainCard):
 
         main_layout.addLayout(status_layout)
 
-        # 结果显示区域
-        self.text_browser_results = QTextBrowser()
-        self.text_browser_results.setObjectName(u"text_browser_results")
-        self.text_browser_results.setFont(font1)
-        self.text_browser_results.setOpenLinks(False)
-        self.text_browser_results.setWordWrapMode(QTextOption.WrapMode.WrapAnywhere)        # 禁用智能换行改为按照宽度换行
-        self.text_browser_results.anchorClicked.connect(self.on_result_clicked)
-        self.text_browser_results.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        main_layout.addWidget(self.text_browser_results)
-
-        # 加载更多提示标签
-        self.label_loading_more = QLabel()
-        self.label_loading_more.setObjectName(u"label_loading_more")
-        self.label_loading_more.setFont(font2)
-        self.label_loading_more.setAlignment(Qt.AlignCenter)
-        self.label_loading_more.setText("滚动加载更多结果...")
-        self.label_loading_more.hide()
-        main_layout.addWidget(self.label_loading_more)
+        # 结果显示区域（只绘制可见的行，滚动时按块加载）
+        self.result_model = FileSearchResultModel(self.main_widget)
+        self.result_model.page_requested.connect(self.request_result_page)
+        self.result_view = FileSearchResultView(self.result_model, self.suffix_icon_map, self.main_object.is_dark)
+        self.result_view.setObjectName(u"result_view")
+        self.result_view.setFont(font1)
+        self.result_view.result_clicked.connect(self.on_result_clicked)
+        self.result_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        main_layout.addWidget(self.result_view)
 
         # 加载动画 - 使用覆盖层方式
         self.load_animation = LoadAnimation(self.main_widget, self.theme)
@@ -353,10 +360,6 @@ class FileSearchCard(MainCard):
         self.load_animation.setFixedSize(60, 60)
         self.load_animation.hide()
 
-        # 连接滚动条信号
-        scroll_bar = self.text_browser_results.verticalScrollBar()
-        scroll_bar.valueChanged.connect(self.on_scroll)
-
         # 设置样式
         self.refresh_theme()
 
@@ -418,9 +421,14 @@ class FileSearchCard(MainCard):
         # 创建并启动状态线程
         self.status_thread = EverythingStatusThread(everything_path=self.everything_path,
                                                     db_path=self.main_object.app_data_everything_db_path,
-                                                    config_path=self.main_object.app_data_everything_config_path)
+                                                    config_path=self.main_object.app_data_everything_config_path,
+                                                    backend=self.search_backend,
+                                                    index_path=self.main_object.app_data_file_index_path,
+                                                    root_list=self.index_root_list)
         self.status_thread.status_updated.connect(self.on_status_updated)
         self.status_thread.error_occurred.connect(self.on_status_error)
+        self.status_thread.backend_selected.connect(self.on_backend_selected)
+        self.status_thread.index_progress.connect(self.on_index_progress)
         self.status_thread.start()
 
     def on_status_updated(self, message, is_ready):
@@ -442,6 +450,16 @@ class FileSearchCard(MainCard):
             # 重置加载状态
             self.load_ok = False
 
+    def on_backend_selected(self, backend):
+        """确定搜索后端（Everything不可用时使用内置文件索引）"""
+        self.search_backend = backend
+        if backend == BACKEND_INDEX:
+            self.tip_label.hide()
+
+    def on_index_progress(self, message):
+        """内置文件索引进度"""
+        self.mask_label.setText(message)
+
     def on_status_error(self, error_msg):
         """状态错误处理"""
         self.label_ready_status.show()
@@ -454,12 +472,44 @@ class FileSearchCard(MainCard):
         self.mask_label.setText(f"Everything错误: {error_msg}")
 
     def start_clean(self):
+        self.search_timer.stop()
+        if self.search_service:
+            self.search_service.cancel()
         self.line_edit_search.clear()
         self.label_status.setText("请输入搜索关键词")
-        self.text_browser_results.clear()
+        self.result_model.clear()
+        self.load_animation.hide()
 
-    def start_search(self, offset=0):
-        """开始搜索"""
+    def on_search_text_edited(self, text):
+        """输入变化后重新计时，连续输入时只搜索最后一次"""
+        if self.is_ready:
+            self.search_timer.start()
+
+    def get_search_service(self):
+        """获取搜索服务（后端变化时重新创建）"""
+        if self.search_service and self.search_service.backend != self.search_backend:
+            self.search_service.stop()
+            self.search_service = None
+        if self.search_service is None:
+            self.search_service = FileSearchServiceThread(
+                everything_path=self.everything_path,
+                db_path=self.main_object.app_data_everything_db_path,
+                config_path=self.main_object.app_data_everything_config_path,
+                backend=self.search_backend,
+                index_path=self.main_object.app_data_file_index_path,
+                root_list=self.index_root_list
+            )
+            self.search_service.search_finished.connect(self.on_search_finished)
+            self.search_service.search_error.connect(self.on_search_error)
+            self.search_service.page_loaded.connect(self.on_page_loaded)
+            self.search_service.page_error.connect(self.on_page_error)
+            self.search_service.indexing_status.connect(self.on_indexing_status)
+            self.search_service.start()
+        return self.search_service
+
+    def start_search(self):
+        """开始搜索（后续结果由结果模型在滚动时按页请求）"""
+        self.search_timer.stop()
         if not self.is_ready:
             self.label_status.setText("Everything未就绪，无法搜索")
             return
@@ -467,158 +517,69 @@ class FileSearchCard(MainCard):
         search_text = self.line_edit_search.text().strip()
         if not search_text:
             self.label_status.setText("请输入搜索关键词")
-            # 清空结果显示
-            self.text_browser_results.clear()
+            # 取消进行中的搜索并清空结果显示
+            if self.search_service:
+                self.search_service.cancel()
+            self.result_model.clear()
+            self.load_animation.hide()
             return
 
-        # 如果是新的搜索，重置状态
-        if offset == 0:
-            self.current_search_text = search_text
-            self.current_offset = 0
-            self.has_more_results = True
-            self.total_results = 0
-            self.displayed_results = 0
-
-            # 清空结果显示
-            self.text_browser_results.clear()
-            self.label_status.setText(f"正在搜索: {search_text}")
-
-            # 显示加载动画
-            self.load_animation.show()
-            self.load_animation.load()
-        else:
-            # 显示加载更多提示
-            self.label_loading_more.show()
-
-        # 停止之前的搜索线程
-        if self.search_thread and self.search_thread.isRunning():
-            self.search_thread.stop()
-
-        # 创建并启动搜索线程
-        self.search_thread = EverythingSearchThread(
-            search_text=search_text,
-            everything_path=self.everything_path,
-            db_path=self.main_object.app_data_everything_db_path,
-            config_path=self.main_object.app_data_everything_config_path,
-            offset=offset,
-            limit=50
-        )
-        self.search_thread.search_finished.connect(self.on_search_finished)
-        self.search_thread.search_error.connect(self.on_search_error)
-        self.search_thread.indexing_status.connect(self.on_indexing_status)
-        self.search_thread.start()
-
-    def on_search_finished(self, results, total_results, has_more):
-        """搜索完成处理"""
-        self.load_animation.hide()
-        self.label_loading_more.hide()
+        self.current_search_text = search_text
+        self.total_results = 0
+        self.label_status.setText(f"正在搜索: {search_text}")
 
-        # 更新结果
-        if results:
-            self.append_results_to_browser(results)
+        # 显示加载动画
+        self.load_animation.show()
+        self.load_animation.load()
 
-        # 更新状态
-        self.total_results = total_results
-        self.has_more_results = has_more
-        self.current_offset += len(results)
-
-        if self.displayed_results == 0:
-            self.label_status.setOpenExternalLinks(True)
-            self.label_status.setText("未找到匹配的文件(可能是everything安装问题,<a href=\"https://www.agiletiles.com/help/help.html#%E6%9C%AC%E5%9C%B0%E6%90%9C%E7%B4%A2\" style=\"color:rgb(20, 161, 248);\">点击这里</a>查看帮助)")
-        else:
-            more_text = "，还有更多结果..." if has_more else ""
-            self.label_status.setText(f"已找到 {total_results} 个结果，已显示 {self.displayed_results} 个{more_text}")
-
-    def append_results_to_browser(self, results):
-        """将结果追加到浏览器中"""
-        if not results:
-            return
+        # 提交给搜索服务（新的查询会取消旧的查询）
+        self.search_generation = self.get_search_service().search(search_text, limit=RESULT_PAGE_SIZE)
 
-        html_content = ""
-        for result in results:
-            # 提取文件名和路径
-            file_name = result.filename
-            file_suffix_list = os.path.splitext(file_name)
-            file_suffix = file_suffix_list[1].replace(".", "").lower() if len(file_suffix_list) > 1 else ""
-            file_path = result.path
-            file_type = "文件夹" if result.is_folder else "文件"
-            # 使用新函数格式化文件大小
-            file_size = "0B" if result.is_folder else self.format_file_size(result.size)
-            modified_time = result.date_modified.strftime("%Y-%m-%d %H:%M:%S")
-
-            # 对文件路径进行URL编码，特别是处理空格等特殊字符
-            encoded_path = quote(file_path.replace("\\", "/"))  # 转换为正斜杠并编码
-
-            # 根据文件类型选择图标或字符
-            if result.is_folder:
-                # 使用文字字符📁代替文件夹图标
-                icon_html = '<span style="font-size: 26px; vertical-align: middle;">📁</span>'
-            else:
-                if file_suffix in self.suffix_icon_map:
-                    icon_path = self.suffix_icon_map[file_suffix]
-                else:
-                    icon_path = self.suffix_icon_map["file"]
-                icon_path = ":static/img/IconPark/grey/" + icon_path + ".png"
-                icon_html = f'<img src="{icon_path}" width="26" height="26" style="vertical-align: middle;">'
-
-            # 创建可点击的链接
-            html_content += f'<div style="margin-bottom: 5px;">'
-            html_content += f'{icon_html}'
-            html_content += f'<a href="file:///{encoded_path}" style="color: #409EFF; font-weight: bold; text-decoration: none; font-size: 14px; vertical-align: middle;">&nbsp;{file_name}</a>'
-            html_content += f'</div>'
-            html_content += f'<div style="color: #666; font-size: 12px; margin-bottom: 10px;">{file_path}<br>'
-            html_content += f'类型: <span style="font-weight: bold; font-size: 12px;"> {file_type} </span>'
-            html_content += f' | 大小: <span style="font-weight: bold; font-size: 12px;"> {file_size} </span>'
-            html_content += f' | 修改时间: <span style="font-weight: bold; font-size: 12px;"> {modified_time} </span>'
-            html_content += f'<br></div>'
-
-        # 保存当前滚动位置
-        scroll_bar = self.text_browser_results.verticalScrollBar()
-        scroll_pos = scroll_bar.value()
-
-        # 追加内容
-        cursor = self.text_browser_results.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.text_browser_results.setTextCursor(cursor)
-        self.text_browser_results.insertHtml(html_content)
-
-        # 恢复滚动位置
-        scroll_bar.setValue(scroll_pos)
-
-        # 更新计数
-        self.displayed_results += len(results)
-
-    def format_file_size(self, size_bytes):
-        """
-        将文件大小从字节转换为合适的单位进行展示
+    def request_result_page(self, offset, limit):
+        """结果模型请求当前查询的一页结果（可以是已被移出缓存的第一页）"""
+        if self.search_service and self.current_search_text:
+            self.search_service.load_page(self.search_generation, self.current_search_text, offset, limit)
 
-        Args:
-            size_bytes (int): 文件大小（字节）
+    def on_page_loaded(self, generation, offset, results):
+        """滚动时请求的一页已返回"""
+        if generation == self.search_generation:
+            self.result_model.set_page(offset, results)
 
-        Returns:
-            str: 格式化后的文件大小字符串
-        """
-        if size_bytes == 0:
-            return "0 B"
+    def on_page_error(self, generation, offset, error_msg):
+        """页请求失败，之后滚动到这些行时重新请求"""
+        if generation != self.search_generation:
+            return
+        self.result_model.cancel_page_request(offset)
+        self.label_status.setText(f"搜索错误: {error_msg}")
+        self.logger.card_error("文件搜索", f"搜索错误: {error_msg}")
 
-        size_units = ["B", "KB", "MB", "GB", "TB"]
-        unit_index = 0
-        size_value = float(size_bytes)
+    def on_search_finished(self, generation, results, total_results, has_more):
+        """搜索完成处理"""
+        # 已被新的查询取代
+        if generation != self.search_generation:
+            return
+        self.load_animation.hide()
 
-        while size_value >= 1024 and unit_index < len(size_units) - 1:
-            size_value /= 1024
-            unit_index += 1
+        # 更新结果
+        self.total_results = total_results
+        self.result_model.set_results(results, total_results)
+        self.result_view.scrollToTop()
 
-        # 如果是整数，显示为整数格式
-        if size_value.is_integer():
-            return f"{int(size_value)} {size_units[unit_index]}"
+        # 更新状态
+        if total_results == 0:
+            self.label_status.setOpenExternalLinks(True)
+            self.label_status.setText("未找到匹配的文件(可能是everything安装问题,<a href=\"https://www.agiletiles.com/help/help.html#%E6%9C%AC%E5%9C%B0%E6%90%9C%E7%B4%A2\" style=\"color:rgb(20, 161, 248);\">点击这里</a>查看帮助)")
+        elif self.search_backend == BACKEND_INDEX and total_results >= MAX_COUNT_RESULTS:
+            # 内置文件索引只统计到上限
+            self.label_status.setText(f"已找到超过 {MAX_COUNT_RESULTS} 个结果")
         else:
-            return f"{size_value:.1f} {size_units[unit_index]}"
+            self.label_status.setText(f"已找到 {total_results} 个结果")
 
-    def on_search_error(self, error_msg):
+    def on_search_error(self, generation, error_msg):
         """搜索错误处理"""
+        if generation != self.search_generation:
+            return
         self.load_animation.hide()
-        self.label_loading_more.hide()
         self.label_status.setText(f"搜索错误: {error_msg}")
         self.logger.card_error("文件搜索", f"搜索错误: {error_msg}")
 
@@ -631,35 +592,17 @@ class FileSearchCard(MainCard):
             self.label_indexing.setText("")
             self.label_indexing.hide()
 
-    def on_scroll(self, value):
-        """滚动事件处理"""
-        scroll_bar = self.text_browser_results.verticalScrollBar()
-
-        # 检查是否滚动到底部
-        if (value >= scroll_bar.maximum() - 10 and
-                self.has_more_results and
-                not (self.search_thread and self.search_thread.isRunning())):
-            # 加载更多结果
-            self.start_search(offset=self.current_offset)
-
-    def on_result_clicked(self, url):
+    def on_result_clicked(self, result):
         """结果点击处理"""
-        # 获取原始URL并解码
-        raw_url = url.toString()
-        # 移除"file:///"前缀并解码URL
-        if raw_url.startswith("file:///"):
-            file_path = unquote(raw_url[8:])  # 移除"file:///"前缀并解码
-        else:
-            file_path = unquote(raw_url)
+        file_path = result.path
         try:
-            # 在文件管理器中打开并选中文件
-            if os.name == 'nt':  # Windows
-                file_path = file_path.replace("/", "\\")
-                os.system(f'explorer /select,\""{file_path}"\"')
-            elif os.name == 'posix':  # macOS
-                os.system(f'open -R "{file_path}"')
+            # 在文件管理器中打开并选中文件（不经过shell，文件名中的特殊字符不会被执行）
+            if sys.platform == 'win32':
+                subprocess.run(['explorer', '/select,', file_path.replace("/", "\\")])
+            elif sys.platform == 'darwin':
+                subprocess.run(['open', '-R', file_path])
             else:  # Linux
-                os.system(f'xdg-open "{os.path.dirname(file_path)}"')
+                subprocess.run(['xdg-open', os.path.dirname(file_path)])
         except Exception as e:
             self.logger.card_error("文件搜索", f"打开文件失败: {str(e)}")
 
@@ -670,8 +613,8 @@ class FileSearchCard(MainCard):
 
         if self.is_light():
             # 浅色主题样式
-            self.text_browser_results.setStyleSheet("""
-                QTextBrowser {
+            self.result_view.setStyleSheet("""
+                QListView {
                     border: 1px solid white;
                     border-radius: 15px;
                     background-color: transparent;
@@ -682,11 +625,10 @@ class FileSearchCard(MainCard):
             self.label_ready_status.setStyleSheet("background: transparent;")
             self.label_status.setStyleSheet("background: transparent;")
             self.label_indexing.setStyleSheet("background: transparent;")
-            self.label_loading_more.setStyleSheet("background: transparent;")
         else:
             # 深色主题样式
-            self.text_browser_results.setStyleSheet("""
-                QTextBrowser {
+            self.result_view.setStyleSheet("""
+                QListView {
                     border: 1px solid black;
                     border-radius: 15px;
                     background-color: transparent;
@@ -698,7 +640,7 @@ class FileSearchCard(MainCard):
             self.label_ready_status.setStyleSheet("color: #aaa;")
             self.label_status.setStyleSheet("color: #aaa;")
             self.label_indexing.setStyleSheet("color: #ffaa33;")
-            self.label_loading_more.setStyleSheet("color: #aaa;")
+        self.result_view.set_dark(self.main_object.is_dark)
         # 调整其他样式
         style_util.set_button_style(self.push_button_clean, self.main_object.is_dark)
         style_util.set_button_style(self.push_button_search, self.main_object.is_dark)
@@ -0,0 +1,260 @@
+import os
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, Signal
+from PySide6.QtGui import QPixmap, QColor, QPainter, QFont, QFontMetrics
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView, QStyle
+
+
+# 每页的结果数（向搜索服务请求的单位）
+RESULT_PAGE_SIZE = 100
+# 每次滚动到底部时增加的行数
+FETCH_BLOCK_SIZE = 100
+# 最多缓存的页数（超出后丢弃最久未使用的页，滚动回来时重新请求）
+MAX_CACHED_PAGE_COUNT = 30
+# 行高
+RESULT_ROW_HEIGHT = 66
+# 图标大小
+RESULT_ICON_SIZE = 26
+# 行的外边距
+RESULT_ROW_MARGIN = 6
+
+
+def format_file_size(size_bytes):
+    """
+    将文件大小从字节转换为合适的单位进行展示
+
+    Args:
+        size_bytes (int): 文件大小（字节）
+
+    Returns:
+        str: 格式化后的文件大小字符串
+    """
+    if size_bytes == 0:
+        return "0 B"
+
+    size_units = ["B", "KB", "MB", "GB", "TB"]
+    unit_index = 0
+    size_value = float(size_bytes)
+
+    while size_value >= 1024 and unit_index < len(size_units) - 1:
+        size_value /= 1024
+        unit_index += 1
+
+    # 如果是整数，显示为整数格式
+    if size_value.is_integer():
+        return f"{int(size_value)} {size_units[unit_index]}"
+    else:
+        return f"{size_value:.1f} {size_units[unit_index]}"
+
+
+class FileSearchResultModel(QAbstractListModel):
+    """
+    文件搜索结果模型
+
+    行数在滚动到底部时按块增加（canFetchMore/fetchMore），结果按页缓存，只保留最近使用的若干页，
+    不在缓存中的页在绘制时向搜索服务请求，到达后刷新对应的行，内存占用与结果总数无关。
+    """
+    ResultRole = Qt.ItemDataRole.UserRole + 1
+    # 请求一页结果(偏移, 数量)
+    page_requested = Signal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.total_count = 0
+        self.row_count = 0
+        self.page_map = OrderedDict()  # 页号 -> 结果列表
+        self.pending_page_set = set()  # 已请求尚未返回的页
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.row_count < self.total_count
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BLOCK_SIZE, self.total_count - self.row_count)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + count - 1)
+        self.row_count += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == self.ResultRole:
+            return self.get_result(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            result = self.get_result(index.row())
+            return result.path if result is not None else None
+        return None
+
+    def get_result(self, row):
+        """获取一行的结果，不在缓存中时请求所在页并返回None"""
+        page = row // RESULT_PAGE_SIZE
+        result_list = self.page_map.get(page)
+        if result_list is None:
+            self.request_page(page)
+            return None
+        self.page_map.move_to_end(page)
+        position = row % RESULT_PAGE_SIZE
+        return result_list[position] if position < len(result_list) else None
+
+    def request_page(self, page):
+        if page in self.pending_page_set:
+            return
+        self.pending_page_set.add(page)
+        self.page_requested.emit(page * RESULT_PAGE_SIZE, RESULT_PAGE_SIZE)
+
+    def set_results(self, result_list, total_count):
+        """新的查询：第一页结果"""
+        self.beginResetModel()
+        self.page_map.clear()
+        self.pending_page_set.clear()
+        self.total_count = total_count
+        self.row_count = min(total_count, FETCH_BLOCK_SIZE)
+        if result_list:
+            self.page_map[0] = result_list
+        self.endResetModel()
+
+    def set_page(self, offset, result_list):
+        """请求的页已返回"""
+        page = offset // RESULT_PAGE_SIZE
+        self.pending_page_set.discard(page)
+        self.page_map[page] = result_list
+        self.page_map.move_to_end(page)
+        while len(self.page_map) > MAX_CACHED_PAGE_COUNT:
+            self.page_map.popitem(last=False)
+        first_row = page * RESULT_PAGE_SIZE
+        last_row = min(first_row + RESULT_PAGE_SIZE, self.row_count) - 1
+        if first_row <= last_row:
+            self.dataChanged.emit(self.index(first_row), self.index(last_row), [self.ResultRole])
+
+    def cancel_page_request(self, offset):
+        """页请求失败，之后绘制时重新请求"""
+        self.pending_page_set.discard(offset // RESULT_PAGE_SIZE)
+
+    def clear(self):
+        self.set_results([], 0)
+
+
+class FileSearchResultDelegate(QStyledItemDelegate):
+    """搜索结果绘制代理（每行：图标、文件名、路径、类型/大小/修改时间）"""
+
+    def __init__(self, suffix_icon_map, is_dark=False, parent=None):
+        super().__init__(parent)
+        self.suffix_icon_map = suffix_icon_map
+        self.is_dark = is_dark
+        self.icon_cache = {}  # 图标路径 -> QPixmap
+
+    def set_dark(self, is_dark):
+        self.is_dark = is_dark
+
+    def get_icon(self, result):
+        if result.is_folder:
+            icon_path = self.suffix_icon_map["folder"]
+        else:
+            suffix = os.path.splitext(result.filename)[1].replace(".", "").lower()
+            icon_path = self.suffix_icon_map.get(suffix, self.suffix_icon_map["file"])
+        pixmap = self.icon_cache.get(icon_path)
+        if pixmap is None:
+            pixmap = QPixmap(":static/img/IconPark/grey/" + icon_path + ".png")
+            if not pixmap.isNull():
+                pixmap = pixmap.scaled(RESULT_ICON_SIZE, RESULT_ICON_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                                       Qt.TransformationMode.SmoothTransformation)
+            self.icon_cache[icon_path] = pixmap
+        return pixmap
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), RESULT_ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        result = index.data(FileSearchResultModel.ResultRole)
+        rect = option.rect.adjusted(RESULT_ROW_MARGIN, 2, -RESULT_ROW_MARGIN, -2)
+        text_color = QColor("white") if self.is_dark else QColor("#333333")
+        sub_color = QColor("#aaaaaa") if self.is_dark else QColor("#666666")
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 255, 255, 30) if self.is_dark else QColor(0, 0, 0, 15))
+            painter.drawRoundedRect(rect, 8, 8)
+        if result is None:
+            # 所在页还在加载
+            painter.setPen(sub_color)
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "加载中...")
+            painter.restore()
+            return
+        # 图标
+        icon = self.get_icon(result)
+        icon_rect = QRect(rect.left() + 4, rect.top() + (rect.height() - RESULT_ICON_SIZE) // 2,
+                          RESULT_ICON_SIZE, RESULT_ICON_SIZE)
+        if not icon.isNull():
+            painter.drawPixmap(icon_rect, icon)
+        text_left = icon_rect.right() + 10
+        text_width = rect.right() - text_left
+        line_height = rect.height() // 3
+        # 文件名
+        name_font = QFont(option.font)
+        name_font.setBold(True)
+        painter.setFont(name_font)
+        painter.setPen(QColor("#409EFF"))
+        name = QFontMetrics(name_font).elidedText(result.filename, Qt.TextElideMode.ElideMiddle, text_width)
+        painter.drawText(QRect(text_left, rect.top(), text_width, line_height),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, name)
+        # 路径和详情
+        small_font = QFont(option.font)
+        small_font.setPointSizeF(max(option.font.pointSizeF() - 1, 7))
+        small_metrics = QFontMetrics(small_font)
+        painter.setFont(small_font)
+        painter.setPen(sub_color)
+        path = small_metrics.elidedText(result.path, Qt.TextElideMode.ElideMiddle, text_width)
+        painter.drawText(QRect(text_left, rect.top() + line_height, text_width, line_height),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, path)
+        file_type = "文件夹" if result.is_folder else "文件"
+        file_size = "0B" if result.is_folder else format_file_size(result.size)
+        modified_time = result.date_modified.strftime("%Y-%m-%d %H:%M:%S")
+        detail = small_metrics.elidedText(f"类型: {file_type} | 大小: {file_size} | 修改时间: {modified_time}",
+                                          Qt.TextElideMode.ElideRight, text_width)
+        painter.setPen(text_color)
+        painter.drawText(QRect(text_left, rect.top() + line_height * 2, text_width, line_height),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, detail)
+        painter.restore()
+
+
+class FileSearchResultView(QListView):
+    """
+    搜索结果视图
+
+    所有行等高，只绘制可见的行，滚动到底部时由模型按块增加行数。
+    """
+    # 点击结果(结果)
+    result_clicked = Signal(object)
+
+    def __init__(self, model, suffix_icon_map, is_dark=False, parent=None):
+        """
+        :param model: FileSearchResultModel
+        :param suffix_icon_map: 后缀 -> 图标路径
+        :param is_dark: 是否为深色主题
+        """
+        super().__init__(parent)
+        self.setModel(model)
+        self.result_delegate = FileSearchResultDelegate(suffix_icon_map, is_dark, self)
+        self.setItemDelegate(self.result_delegate)
+        self.setUniformItemSizes(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setMouseTracking(True)
+        self.clicked.connect(self.on_clicked)
+
+    def set_dark(self, is_dark):
+        self.result_delegate.set_dark(is_dark)
+        self.viewport().update()
+
+    def on_clicked(self, index):
+        result = index.data(FileSearchResultModel.ResultRole)
+        if result is not None:
+            self.result_clicked.emit(result)
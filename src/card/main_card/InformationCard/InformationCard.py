@@ -4,12 +4,13 @@ from src.ui import style_util
 from src.util import my_shiboken_util
 
 from PySide6.QtCore import QUrl
-from PySide6.QtGui import QPixmap, Qt
+from PySide6.QtGui import Qt
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
 from PySide6.QtWidgets import QVBoxLayout, QLabel, QApplication, QTextBrowser, QSizePolicy
 
 from src.card.card_component.AggregationCard.AggregationCard import AggregationCard
 from src.client import common
+from src.thread_list.image_decode_thread import get_image_decode_service, scaled_target_size
 
 
 class InformationCard(AggregationCard):
@@ -37,7 +38,6 @@ class InformationCard(AggregationCard):
     need_refresh_ui = False
     # 模块列表
     aggregation_module_list = []
-    base_url = common.BASE_URL + "/textContent/normal/random"
     # 新增：记录已加载的分类
     loaded_tabs = set()
     # 未完成的请求
@@ -350,9 +350,17 @@ class InformationCard(AggregationCard):
     def on_request_finished(self, title, call_back=None):
         if self.image_data_reply.error() == QNetworkReply.NoError:
             data = self.image_data_reply.readAll()
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            self.show_image_in_show_panel_end(title, pixmap, call_back=call_back)
+            # 在工作线程中解码并缩放到展示区域大小，GUI线程只做最终转换
+            device_pixel_ratio = self.card.devicePixelRatio()
+            max_width = self.card.width() - 40
+            max_height = self.card.height() - 70
+            get_image_decode_service().decode(
+                data,
+                lambda pixmap: self.on_image_decoded(title, pixmap, call_back=call_back),
+                target_size=scaled_target_size(max_width, max_height, device_pixel_ratio),
+                key=id(self),
+                device_pixel_ratio=device_pixel_ratio
+            )
         else:
             print(f"Request failed: {self.image_data_reply.errorString()}")
             self.show_text_in_show_panel("请求失败", "请检查网络连接", set_type=False)
@@ -361,6 +369,15 @@ class InformationCard(AggregationCard):
             self.image_data_reply.deleteLater()
         self.image_data_reply = None
 
+    def on_image_decoded(self, title, pixmap, call_back=None):
+        # 解码期间已切换到其他内容
+        if self.current_show_panel_type != "Image":
+            return
+        if pixmap is None:
+            self.show_text_in_show_panel("加载失败", "图片解码失败", set_type=False)
+            return
+        self.show_image_in_show_panel_end(title, pixmap, call_back=call_back)
+
     def show_image_in_show_panel_end(self, title, image, call_back=None):
         # 设置标题
         self.show_panel_label_title.setText(title)
@@ -376,35 +393,8 @@ class InformationCard(AggregationCard):
         layout.setContentsMargins(0, 0, 0, 0)
         # 增加展示文字
         label_content = QLabel()
-        # 图片自适应
-        max_width = self.card.width() - 40
-        max_height = self.card.height() - 70
-        image_width = image.width()
-        image_height = image.height()
-        # 判断图片是否需要缩放
-        if image_width > max_width or image_height > max_height:
-            if image_width > image_height:
-                new_width = max_width
-                new_height = int(round(image_height * max_width / image_width))
-            else:
-                new_width = int(round(image_width * max_height / image_height))
-                new_height = max_height
-        else:
-            new_width = image_width
-            new_height = image_height
-        # 缩放后是否还大于显示区域
-        if new_width > max_width:
-            new_width = max_width
-            new_height = int(round(image_height * max_width / image_width))
-        # 创建高质量缩放图片
-        scaled_pixmap = image.scaled(
-            new_width,
-            new_height,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        # 设置图片
-        label_content.setPixmap(scaled_pixmap)
+        # 图片已在解码时按展示区域缩放，这里直接设置
+        label_content.setPixmap(image)
         layout.addWidget(label_content)
         # 切换到展示面板
         self.stacked_widget.setCurrentIndex(1)
@@ -500,7 +490,7 @@ class InformationCard(AggregationCard):
         # 清理展示面板
         self.clear_show_panel()
         # 创建网络请求
-        url = QUrl(self.base_url + url_suffix)
+        url = QUrl(common.BASE_URL + "/textContent/normal/random" + url_suffix)
         request = QNetworkRequest(url)
         request.setRawHeader(b"Authorization", self.main_object.access_token.encode())
         # 设置请求属性（可选）
@@ -1,16 +1,19 @@
 import os
 
-from PySide6.QtGui import QColor, QPixmap, QPainter
+from PySide6.QtGui import QColor
 from PySide6.QtMultimedia import QMediaPlayer
 from PySide6.QtWidgets import QDialog, QSlider, QVBoxLayout, QStackedWidget, QFileDialog, QGraphicsDropShadowEffect
-from PySide6.QtCore import Qt, QRect, QPoint, QTimer
+from PySide6.QtCore import Qt, QRect, QPoint
 from src.card.MainCardManager.MainCard import MainCard
 from src.constant import data_save_constant
 from src.module import dialog_module
-from src.ui import style_util, image_util
+from src.ui import style_util
 
-from . import music_style, music_analysis
-from .ui_components import init_base_ui, init_playlist_ui, init_songlist_ui, init_other_ui, delete_current_playlist
+from . import music_style
+from .artwork_pipeline import ARTWORK_CACHE_DIR_NAME, get_music_artwork_service
+from .music_library import MusicLibraryScanThread, get_music_library
+from .ui_components import (init_base_ui, init_playlist_ui, init_songlist_ui, init_other_ui, delete_current_playlist,
+                            filter_song_list)
 from .player_controls import (init_player, setup_player_signals, toggle_playback_mode, play_song, prev_song, next_song,
                               play_current_song, toggle_play_pause, update_mode_icon)
 from .settings_manager import save_settings, load_settings
@@ -56,6 +59,8 @@ class MusicCard(MainCard):
         self.is_dragging = False
         self.default_pixmap = None
         self.button_list = []
+        self.scan_thread = None
+        self.import_playlist = None
 
     def clear(self):
         try:
@@ -79,6 +84,11 @@ class MusicCard(MainCard):
         except Exception as e:
             print(e)
         # 其他
+        get_music_artwork_service().cancel_key(id(self))
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.scan_finished.disconnect()
+            self.scan_thread.requestInterruption()
+            self.scan_thread.wait()
         try:
             self.audio_output.deleteLater()
             self.player.deleteLater()
@@ -155,6 +165,7 @@ class MusicCard(MainCard):
         if self.song_list_title_label:  # 确保UI组件已初始化
             self.song_list_title_label.setText(self.current_playlist)
         self.songs_list.clear()
+        self.song_search_edit.clear()
         if self.current_playlist in self.playlist_data:
             self.songs_list.addItems(
                 [os.path.basename(path) for path in self.playlist_data[self.current_playlist]]  # 只显示文件名
@@ -189,27 +200,90 @@ class MusicCard(MainCard):
         if self.playlist_data is None or self.playlist_data == {}:
             dialog_module.box_information(self.main_object, "告警", f"当前无歌单，请先创建歌单！")
             return
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            dialog_module.box_information(self.main_object, "提示", "正在导入歌曲，请稍候")
+            return
         folder_path = QFileDialog.getExistingDirectory(self.card, "选择音乐文件夹", self.last_folder)
         if not folder_path:
             return
         self.last_folder = folder_path
-        supported_formats = (".mp3", ".wav", ".ogg", ".flac")
-        for file in os.listdir(folder_path):
-            if not file.lower().endswith(supported_formats):
-                continue
-            full_path = os.path.join(folder_path, file)
-            self.songs_list.addItem(file)
-            self.playlist_data[self.current_playlist].append(full_path)
+        # 在后台递归扫描并建立曲库索引，已索引且未修改的文件不再读取标签
+        self.import_playlist = self.current_playlist
+        self.scan_thread = MusicLibraryScanThread(self.get_music_library().db_path, folder_path)
+        self.scan_thread.progress.connect(self.on_import_progress)
+        self.scan_thread.scan_finished.connect(self.on_import_finished)
+        self.scan_thread.finished.connect(self.scan_thread.deleteLater)
+        self.import_button.setEnabled(False)
+        self.import_button.setText("扫描中...")
+        self.scan_thread.start()
+
+    def on_import_progress(self, done, total):
+        self.import_button.setText(f"导入中 {done}/{total}")
+
+    def on_import_finished(self, folder_path, path_list):
+        self.scan_thread = None
+        self.import_button.setEnabled(True)
+        self.import_button.setText("导入歌曲")
+        playlist = self.playlist_data.get(self.import_playlist)
+        if playlist is None:
+            return
+        existing_path_set = set(os.path.normpath(path) for path in playlist)
+        new_path_list = [path for path in path_list if path not in existing_path_set]
+        playlist.extend(new_path_list)
+        if self.import_playlist == self.current_playlist:
+            self.songs_list.addItems([os.path.basename(path) for path in new_path_list])
+            filter_song_list(self)
         self.save_settings()
 
+    def get_music_library(self):
+        return get_music_library(os.path.dirname(self.main_object.app_data_db_path))
+
     def update_song_info(self, song_path):
-        # 获取歌曲信息并显示
-        song_title, artist, cover_pixmap = music_analysis.get_music_info(song_path, self.cover_label)
-        self.song_title.setText(song_title)
-        self.artist.setText(artist)
-        self.cover_label.setPixmap(cover_pixmap if cover_pixmap else self.default_pixmap)
-        # 更新背景
-        self.update_background(self.cover_label.pixmap())
+        # 标签读取、封面与模糊背景在工作线程中处理，已缓存的歌曲直接显示
+        service = self.get_artwork_service()
+        device_pixel_ratio = self.cover_label.devicePixelRatio()
+        backdrop_size = (self.card.width(), self.card.height())
+        # 已在曲库中索引的歌曲直接使用索引中的标签
+        track = self.get_music_library().get_fresh_track(song_path)
+        if track is not None:
+            self.song_title.setText(track["title"])
+            self.artist.setText(track["artist"])
+        artwork = service.peek(song_path, device_pixel_ratio, backdrop_size, track)
+        if artwork is not None:
+            service.cancel_key(id(self))
+            self.on_artwork_ready(artwork)
+        else:
+            service.request(song_path, device_pixel_ratio, backdrop_size, self.on_artwork_ready, key=id(self),
+                            track=track)
+        self.prefetch_next_song()
+
+    def get_artwork_service(self):
+        image_path = getattr(self.main_object, "app_data_image_path", None)
+        disk_dir = os.path.join(image_path, ARTWORK_CACHE_DIR_NAME) if image_path else None
+        return get_music_artwork_service(disk_dir)
+
+    def on_artwork_ready(self, artwork):
+        self.song_title.setText(artwork.title)
+        self.artist.setText(artwork.artist)
+        self.cover_label.setPixmap(artwork.cover_pixmap if artwork.cover_pixmap else self.default_pixmap)
+        if artwork.backdrop_pixmap is not None:
+            self.background_label.setPixmap(artwork.backdrop_pixmap)
+            self.background_label.setScaledContents(True)
+            self.background_label.setGeometry(0, 0, self.card.width(), self.card.height())
+
+    def prefetch_next_song(self):
+        """预加载下一首歌的封面与背景（随机播放无法预知下一首，不预加载）"""
+        song_list = self.playlist_data.get(self.current_playlist) if self.current_playlist is not None else None
+        if not song_list or self.current_song_index < 0 or self.current_mode_index != 0:
+            return
+        next_index = (self.current_song_index + 1) % len(song_list)
+        if next_index == self.current_song_index:
+            return
+        next_song_path = song_list[next_index]
+        self.get_artwork_service().prefetch(
+            next_song_path, self.cover_label.devicePixelRatio(), (self.card.width(), self.card.height()),
+            self.get_music_library().get_fresh_track(next_song_path)
+        )
 
     def _create_stacked_widget(self):
         widget = QStackedWidget(self.card)
@@ -390,104 +464,3 @@ class MusicCard(MainCard):
     def hide_form(self):
         if hasattr(self, 'volume_dialog') and self.volume_dialog.isVisible():
             self.volume_dialog.close()
-
-    def update_background(self, original_pixmap):
-        # 使用QTimer延迟处理，避免界面卡顿
-        QTimer.singleShot(10, lambda: self._update_background_delayed(original_pixmap))
-
-    def _update_background_delayed(self, original_pixmap):
-        # 对图片进行裁切，根据窗口大小进行裁切，去掉图片的两边，只保留中间竖长
-        cut_pixmap = self.crop_to_portrait(pixmap=original_pixmap, target_ratio=self.card.width() / self.card.height())
-        # 缩放图片到较小尺寸（加快模糊处理）
-        small_pixmap = cut_pixmap.scaled(
-            self.card.width() // 8, self.card.height() // 8,
-            Qt.KeepAspectRatioByExpanding,
-            Qt.SmoothTransformation
-        )
-        # 应用快速模糊效果
-        blurred_pixmap = self.apply_fast_blur(small_pixmap)
-        # 放大到窗口大小
-        final_pixmap = blurred_pixmap.scaled(
-            self.card.width(), self.card.height(),
-            Qt.KeepAspectRatioByExpanding,
-            Qt.SmoothTransformation
-        )
-        # 设置透明度
-        final_pixmap = self.set_image_opacity(final_pixmap, 80)
-        # 设置圆角
-        final_pixmap = image_util.create_rounded_pixmap(final_pixmap, 0.0193)
-        # 设置背景
-        self.background_label.setPixmap(final_pixmap)
-        self.background_label.setScaledContents(True)
-        self.background_label.setGeometry(0, 0, self.card.width(), self.card.height())
-
-    def crop_to_portrait(self, pixmap, target_ratio=9 / 16):
-        """
-        从近似正方形的QPixmap裁切出竖长型的中间部分
-
-        Args:
-            pixmap: 源QPixmap图像（近似正方形）
-            target_ratio: 目标长宽比（宽/高），默认9:16（竖屏）
-
-        Returns:
-            QPixmap: 裁切后的竖长型图像
-        """
-        if pixmap.isNull():
-            return QPixmap()
-        # 获取原图尺寸
-        original_width = pixmap.width()
-        original_height = pixmap.height()
-        # 计算目标尺寸
-        if original_height * target_ratio <= original_width:
-            # 以高度为基准计算宽度
-            target_width = int(original_height * target_ratio)
-            target_height = original_height
-        else:
-            # 以宽度为基准计算高度（通常不会发生，因为目标比例是竖长型）
-            target_height = int(original_width / target_ratio)
-            target_width = original_width
-        # 计算裁切区域（居中裁切）
-        x = (original_width - target_width) // 2
-        y = (original_height - target_height) // 2
-        # 创建裁切区域
-        crop_rect = QRect(x, y, target_width, target_height)
-        # 执行裁切
-        cropped_pixmap = pixmap.copy(crop_rect)
-        return cropped_pixmap
-
-    def set_image_opacity(self, original_pixmap, alpha_value):
-        """
-        创建一个带有指定透明度的新 Pixmap
-        :param original_pixmap: 原始的 QPixmap 对象
-        :param alpha_value: 透明度值 (0-255)
-        :return: 处理后的 QPixmap
-        """
-        # 创建一个临时图像用于绘画
-        temp_image = original_pixmap.toImage()
-
-        painter = QPainter(temp_image)
-        # 设置合成模式，以便将透明度应用于现有图像
-        painter.setCompositionMode(QPainter.CompositionMode_DestinationIn)
-        # 用指定的透明度填充整个图像区域
-        painter.fillRect(temp_image.rect(), QColor(0, 0, 0, alpha_value))
-        painter.end()
-
-        # 将处理后的图像转换回 QPixmap
-        transparent_pixmap = QPixmap.fromImage(temp_image)
-        return transparent_pixmap
-
-    def apply_fast_blur(self, pixmap):
-        """使用缩放方法实现快速模糊效果"""
-        # 进一步缩小图片
-        small = pixmap.scaled(
-            pixmap.width() // 4, pixmap.height() // 4,
-            Qt.KeepAspectRatio,
-            Qt.FastTransformation
-        )
-        # 放大回原尺寸
-        blurred = small.scaled(
-            pixmap.width(), pixmap.height(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        return blurred
@@ -0,0 +1,415 @@
+# -- coding: utf-8 --
+import os
+import hashlib
+import traceback
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, QRect, QSize, Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+
+from src.thread_list.image_decode_thread import decode_image
+from src.ui import image_util
+
+from . import music_analysis
+
+
+# 封面逻辑尺寸
+COVER_SIZE = 270
+# 封面圆角比例
+COVER_RADIUS = 0.06
+# 背景圆角比例
+BACKDROP_RADIUS = 0.0193
+# 背景透明度 (0-255)
+BACKDROP_ALPHA = 80
+# 默认封面（歌曲没有内嵌封面时使用）
+DEFAULT_COVER_PATH = ":static/img/music/cover.png"
+DEFAULT_ARTWORK_HASH = "default"
+# 内存中保留的封面/背景组数
+MAX_MEMORY_ARTWORK_COUNT = 24
+# 内存中保留的歌曲标签数
+MAX_MEMORY_SONG_COUNT = 512
+# 磁盘缓存上限（字节）
+MAX_DISK_BYTES = 128 * 1024 * 1024
+# 磁盘缓存子目录
+ARTWORK_CACHE_DIR_NAME = "music_artwork"
+
+
+def get_size_key(cover_pixel_size, backdrop_size):
+    """同一封面在不同尺寸下的处理结果分开缓存"""
+    return f"{cover_pixel_size}-{backdrop_size[0]}x{backdrop_size[1]}"
+
+
+def crop_to_ratio(image, target_ratio):
+    """从图片中间裁切出指定宽高比（宽/高）的部分"""
+    width = image.width()
+    height = image.height()
+    if height * target_ratio <= width:
+        target_width = int(height * target_ratio)
+        target_height = height
+    else:
+        target_width = width
+        target_height = int(width / target_ratio)
+    x = (width - target_width) // 2
+    y = (height - target_height) // 2
+    return image.copy(QRect(x, y, max(target_width, 1), max(target_height, 1)))
+
+
+def build_cover_image(image):
+    """封面圆角处理"""
+    return image_util.create_rounded_image(image, COVER_RADIUS)
+
+
+def build_backdrop_image(image, width, height):
+    """
+    由封面生成模糊背景：居中裁切 -> 缩小 -> 快速模糊 -> 放大到卡片尺寸 -> 透明度 -> 圆角
+    :param image: 未做圆角处理的封面
+    :param width: 卡片宽度
+    :param height: 卡片高度
+    """
+    cut_image = crop_to_ratio(image, width / height)
+    # 缩放到较小尺寸（加快模糊处理）
+    small_image = cut_image.scaled(
+        max(width // 8, 1), max(height // 8, 1),
+        Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    # 进一步缩小再放大，实现快速模糊
+    blurred_image = small_image.scaled(
+        max(small_image.width() // 4, 1), max(small_image.height() // 4, 1),
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.FastTransformation
+    ).scaled(
+        small_image.width(), small_image.height(),
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    # 放大到窗口大小
+    final_image = blurred_image.scaled(
+        width, height,
+        Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+        Qt.TransformationMode.SmoothTransformation
+    ).convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    # 设置透明度
+    painter = QPainter(final_image)
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_DestinationIn)
+    painter.fillRect(final_image.rect(), QColor(0, 0, 0, BACKDROP_ALPHA))
+    painter.end()
+    # 设置圆角
+    return image_util.create_rounded_image(final_image, BACKDROP_RADIUS)
+
+
+def get_disk_paths(disk_dir, artwork_hash, size_key):
+    """磁盘缓存路径（music_artwork/哈希前两位/哈希_尺寸_cover.png）"""
+    base_path = os.path.join(disk_dir, artwork_hash[:2], f"{artwork_hash}_{size_key}")
+    return base_path + "_cover.png", base_path + "_backdrop.png"
+
+
+def load_disk_image(path):
+    if not os.path.exists(path):
+        return None
+    image = QImage(path)
+    if image.isNull():
+        return None
+    # 更新修改时间，淘汰时按最近使用保留
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return image
+
+
+def save_disk_image(image, path):
+    """先写临时文件再替换，避免读到写了一半的图片"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 同一专辑的多首歌可能同时写入同一封面
+        temp_path = f"{path}.{id(image)}.tmp"
+        if image.save(temp_path, "PNG"):
+            os.replace(temp_path, path)
+    except OSError as e:
+        print(f"保存音乐封面缓存失败:{e}")
+
+
+def trim_disk_cache(disk_dir, max_bytes=MAX_DISK_BYTES):
+    """磁盘缓存超过上限时删除最久未使用的文件"""
+    if not disk_dir or not os.path.isdir(disk_dir):
+        return
+    entry_list = []
+    total_bytes = 0
+    for sub_dir in os.scandir(disk_dir):
+        if not sub_dir.is_dir():
+            continue
+        for entry in os.scandir(sub_dir.path):
+            if entry.is_file():
+                stat = entry.stat()
+                entry_list.append((stat.st_mtime, entry.path, stat.st_size))
+                total_bytes += stat.st_size
+    entry_list.sort()
+    for _, path, size in entry_list:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total_bytes -= size
+        except OSError:
+            pass
+
+
+class MusicArtwork:
+    """歌曲的标签与处理好的封面、背景"""
+
+    def __init__(self, title, artist, artwork_hash, cover_pixmap, backdrop_pixmap):
+        self.title = title
+        self.artist = artist
+        self.artwork_hash = artwork_hash
+        self.cover_pixmap = cover_pixmap
+        self.backdrop_pixmap = backdrop_pixmap
+
+
+class MusicArtworkSignals(QObject):
+    # 处理完成信号(任务id, 结果字典)
+    finished = Signal(int, object)
+
+
+class MusicArtworkTask(QRunnable):
+    """读取标签并生成封面与背景（在线程池中运行）"""
+
+    def __init__(self, signals, task_id, song_path, cover_pixel_size, backdrop_size, disk_dir, track=None):
+        super().__init__()
+        self.signals = signals
+        self.task_id = task_id
+        self.song_path = song_path
+        self.cover_pixel_size = cover_pixel_size
+        self.backdrop_size = backdrop_size
+        self.disk_dir = disk_dir
+        # 曲库索引中的歌曲信息，磁盘缓存命中时无需再解析标签
+        self.track = track
+
+    def run(self):
+        result = {"song_path": self.song_path, "title": None, "artist": None, "artwork_hash": None,
+                  "cover": None, "backdrop": None}
+        try:
+            self.build(result)
+        except Exception:
+            print(f"音乐封面处理失败:{traceback.format_exc()}")
+        self.signals.finished.emit(self.task_id, result)
+
+    def build(self, result):
+        if self.track is not None and self.disk_dir:
+            track = self.track
+            if self.load_from_disk(result, track["title"], track["artist"], track["artwork_hash"]):
+                return
+        title, artist, cover_data = music_analysis.get_music_tags(self.song_path)
+        result["title"] = title
+        result["artist"] = artist
+        artwork_hash = hashlib.sha1(cover_data).hexdigest() if cover_data else DEFAULT_ARTWORK_HASH
+        result["artwork_hash"] = artwork_hash
+        if self.disk_dir and self.load_from_disk(result, title, artist, artwork_hash):
+            return
+        # 解码时直接缩放到封面尺寸，背景也由这张图生成
+        target_size = QSize(self.cover_pixel_size, self.cover_pixel_size)
+        image = decode_image(cover_data if cover_data else DEFAULT_COVER_PATH, target_size, allow_upscale=True)
+        if image.isNull() and cover_data:
+            image = decode_image(DEFAULT_COVER_PATH, target_size, allow_upscale=True)
+        if image.isNull():
+            return
+        cover_image = build_cover_image(image)
+        backdrop_image = build_backdrop_image(image, self.backdrop_size[0], self.backdrop_size[1])
+        result["cover"] = cover_image
+        result["backdrop"] = backdrop_image
+        if self.disk_dir:
+            size_key = get_size_key(self.cover_pixel_size, self.backdrop_size)
+            cover_path, backdrop_path = get_disk_paths(self.disk_dir, artwork_hash, size_key)
+            save_disk_image(cover_image, cover_path)
+            save_disk_image(backdrop_image, backdrop_path)
+
+    def load_from_disk(self, result, title, artist, artwork_hash):
+        artwork_hash = artwork_hash or DEFAULT_ARTWORK_HASH
+        size_key = get_size_key(self.cover_pixel_size, self.backdrop_size)
+        cover_path, backdrop_path = get_disk_paths(self.disk_dir, artwork_hash, size_key)
+        cover_image = load_disk_image(cover_path)
+        if cover_image is None:
+            return False
+        backdrop_image = load_disk_image(backdrop_path)
+        if backdrop_image is None:
+            return False
+        result.update(title=title, artist=artist, artwork_hash=artwork_hash, cover=cover_image,
+                      backdrop=backdrop_image)
+        return True
+
+
+class DiskTrimTask(QRunnable):
+    def __init__(self, disk_dir):
+        super().__init__()
+        self.disk_dir = disk_dir
+
+    def run(self):
+        try:
+            trim_disk_cache(self.disk_dir)
+        except Exception:
+            print(f"清理音乐封面缓存失败:{traceback.format_exc()}")
+
+
+class MusicArtworkService(QObject):
+    """
+    音乐封面处理服务
+
+    标签读取、封面解码、圆角与模糊背景都在线程池中完成。
+    结果按封面内容哈希缓存在内存（QPixmap）和磁盘（PNG），同一封面的不同歌曲共用缓存；
+    同一首歌正在处理时不会重复提交，预加载的任务完成后直接进入缓存。
+    """
+
+    def __init__(self, parent=None, disk_dir=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(2)
+        self.signals = MusicArtworkSignals()
+        self.signals.finished.connect(self._on_task_finished)
+        self.disk_dir = disk_dir
+        self.artwork_cache = OrderedDict()  # (封面哈希, 尺寸) -> (封面, 背景)
+        self.song_cache = OrderedDict()  # 歌曲路径 -> (修改时间, 标题, 歌手, 封面哈希)
+        self.task_map = {}  # 任务id -> ((歌曲路径, 尺寸), 设备像素比)
+        self.running_map = {}  # (歌曲路径, 尺寸) -> 任务id
+        self.waiting_map = {}  # 任务id -> [(key, 回调)]
+        self.key_map = {}  # key -> 任务id
+        self.last_task_id = 0
+        if disk_dir:
+            self.thread_pool.start(DiskTrimTask(disk_dir))
+
+    @staticmethod
+    def get_cover_pixel_size(device_pixel_ratio):
+        return int(COVER_SIZE * device_pixel_ratio)
+
+    def peek(self, song_path, device_pixel_ratio, backdrop_size, track=None):
+        """
+        从内存缓存获取歌曲的封面与背景（GUI线程）
+        :param track: 曲库索引中的歌曲信息，提供时直接按其封面哈希查找
+        :return: MusicArtwork，未缓存时返回None
+        """
+        if track is not None:
+            title, artist, artwork_hash = track["title"], track["artist"], track["artwork_hash"] or DEFAULT_ARTWORK_HASH
+        else:
+            song = self.song_cache.get(song_path)
+            if song is None:
+                return None
+            mtime, title, artist, artwork_hash = song
+            if mtime != self._get_mtime(song_path):
+                del self.song_cache[song_path]
+                return None
+            self.song_cache.move_to_end(song_path)
+        size_key = get_size_key(self.get_cover_pixel_size(device_pixel_ratio), backdrop_size)
+        artwork = self.artwork_cache.get((artwork_hash, size_key))
+        if artwork is None:
+            return None
+        self.artwork_cache.move_to_end((artwork_hash, size_key))
+        return MusicArtwork(title, artist, artwork_hash, artwork[0], artwork[1])
+
+    def request(self, song_path, device_pixel_ratio, backdrop_size, callback, key=None, track=None):
+        """
+        获取歌曲的封面与背景，已缓存时直接回调
+        :param song_path: 歌曲路径
+        :param device_pixel_ratio: 封面的设备像素比
+        :param backdrop_size: 背景尺寸 (宽, 高)
+        :param callback: 完成回调，参数为MusicArtwork，在GUI线程调用
+        :param key: 请求分组，同一key的新请求会取消旧请求的回调
+        :param track: 曲库索引中的歌曲信息（可为空）
+        """
+        if key is not None:
+            self.cancel_key(key)
+        artwork = self.peek(song_path, device_pixel_ratio, backdrop_size, track)
+        if artwork is not None:
+            callback(artwork)
+            return
+        task_id = self._submit(song_path, device_pixel_ratio, backdrop_size, track)
+        self.waiting_map.setdefault(task_id, []).append((key, callback))
+        if key is not None:
+            self.key_map[key] = task_id
+
+    def prefetch(self, song_path, device_pixel_ratio, backdrop_size, track=None):
+        """预加载歌曲的封面与背景，结果只进入缓存"""
+        if self.peek(song_path, device_pixel_ratio, backdrop_size, track) is None:
+            self._submit(song_path, device_pixel_ratio, backdrop_size, track)
+
+    def cancel_key(self, key):
+        """丢弃指定key的回调（任务仍会完成并写入缓存）"""
+        task_id = self.key_map.pop(key, None)
+        if task_id is not None and task_id in self.waiting_map:
+            self.waiting_map[task_id] = [item for item in self.waiting_map[task_id] if item[0] != key]
+
+    def clear_memory_cache(self):
+        self.artwork_cache.clear()
+        self.song_cache.clear()
+
+    def _submit(self, song_path, device_pixel_ratio, backdrop_size, track=None):
+        cover_pixel_size = self.get_cover_pixel_size(device_pixel_ratio)
+        running_key = (song_path, get_size_key(cover_pixel_size, backdrop_size))
+        task_id = self.running_map.get(running_key)
+        if task_id is not None:
+            return task_id
+        self.last_task_id += 1
+        task_id = self.last_task_id
+        self.running_map[running_key] = task_id
+        self.task_map[task_id] = (running_key, device_pixel_ratio)
+        self.thread_pool.start(MusicArtworkTask(self.signals, task_id, song_path, cover_pixel_size,
+                                                backdrop_size, self.disk_dir, track))
+        return task_id
+
+    def _on_task_finished(self, task_id, result):
+        running_key, device_pixel_ratio = self.task_map.pop(task_id)
+        self.running_map.pop(running_key, None)
+        song_path, size_key = running_key
+        artwork = None
+        if result["cover"] is not None:
+            cover_pixmap = QPixmap.fromImage(result["cover"])
+            cover_pixmap.setDevicePixelRatio(device_pixel_ratio)
+            backdrop_pixmap = QPixmap.fromImage(result["backdrop"])
+            self._put_artwork((result["artwork_hash"], size_key), cover_pixmap, backdrop_pixmap)
+            self._put_song(song_path, result["title"], result["artist"], result["artwork_hash"])
+            artwork = MusicArtwork(result["title"], result["artist"], result["artwork_hash"],
+                                   cover_pixmap, backdrop_pixmap)
+        elif result["title"] is not None:
+            artwork = MusicArtwork(result["title"], result["artist"], result["artwork_hash"], None, None)
+        for key, callback in self.waiting_map.pop(task_id, []):
+            if key is not None and self.key_map.get(key) == task_id:
+                del self.key_map[key]
+            if artwork is None:
+                continue
+            try:
+                callback(artwork)
+            except RuntimeError:
+                # 回调对应的控件已被删除
+                pass
+            except Exception:
+                print(f"音乐封面回调失败:{traceback.format_exc()}")
+
+    def _put_artwork(self, cache_key, cover_pixmap, backdrop_pixmap):
+        self.artwork_cache[cache_key] = (cover_pixmap, backdrop_pixmap)
+        self.artwork_cache.move_to_end(cache_key)
+        while len(self.artwork_cache) > MAX_MEMORY_ARTWORK_COUNT:
+            self.artwork_cache.popitem(last=False)
+
+    def _put_song(self, song_path, title, artist, artwork_hash):
+        self.song_cache[song_path] = (self._get_mtime(song_path), title, artist, artwork_hash)
+        self.song_cache.move_to_end(song_path)
+        while len(self.song_cache) > MAX_MEMORY_SONG_COUNT:
+            self.song_cache.popitem(last=False)
+
+    @staticmethod
+    def _get_mtime(song_path):
+        try:
+            return os.path.getmtime(song_path)
+        except OSError:
+            return None
+
+
+music_artwork_service = None
+
+
+def get_music_artwork_service(disk_dir=None):
+    """获取全局音乐封面服务（需在GUI线程首次调用），disk_dir为空时只使用内存缓存"""
+    global music_artwork_service
+    if music_artwork_service is None:
+        music_artwork_service = MusicArtworkService(disk_dir=disk_dir)
+    elif disk_dir and not music_artwork_service.disk_dir:
+        music_artwork_service.disk_dir = disk_dir
+    return music_artwork_service
@@ -0,0 +1,256 @@
+# -- coding: utf-8 --
+import os
+import hashlib
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QThread, Signal
+
+from . import music_analysis
+
+
+# 曲库数据库文件名（与应用数据库放在同一目录）
+LIBRARY_DB_NAME = "music_library.db"
+# 扫描时每批写入的歌曲数
+SCAN_BATCH_SIZE = 200
+# 并行读取标签的线程数
+SCAN_WORKER_COUNT = 4
+# 搜索结果上限
+SEARCH_LIMIT = 500
+
+
+def get_artwork_hash(cover_data):
+    """封面内容哈希，没有封面时为空"""
+    return hashlib.sha1(cover_data).hexdigest() if cover_data else None
+
+
+def normalize_path(path):
+    return os.path.normpath(path)
+
+
+def scan_music_files(folder_path, is_interrupted=None):
+    """
+    递归扫描文件夹中的音乐文件
+    :return: {路径: (修改时间, 大小)}
+    """
+    file_map = {}
+    pending_dir_list = [folder_path]
+    while pending_dir_list:
+        if is_interrupted is not None and is_interrupted():
+            break
+        current_dir = pending_dir_list.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dir_list.append(entry.path)
+                        elif entry.name.lower().endswith(music_analysis.SUPPORTED_FORMATS):
+                            stat = entry.stat()
+                            file_map[normalize_path(entry.path)] = (stat.st_mtime, stat.st_size)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"扫描音乐文件夹失败:{current_dir},{e}")
+    return file_map
+
+
+def read_track(path, mtime, size):
+    """读取单首歌曲的元数据，返回数据库行（在扫描线程池中调用）"""
+    metadata = music_analysis.get_music_metadata(path)
+    return (path, os.path.dirname(path), os.path.basename(path), mtime, size, metadata["title"],
+            metadata["artist"], metadata["album"], metadata["duration"], get_artwork_hash(metadata["cover_data"]),
+            time.time())
+
+
+class MusicLibrary:
+    """
+    本地曲库索引（SQLite）
+
+    记录歌曲的路径、修改时间、大小、标签、时长和封面哈希，由 MusicLibraryScanThread 在后台增量维护。
+    每个实例持有一个连接，只在创建它的线程中使用：GUI线程使用全局实例，扫描线程创建自己的实例。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=10)
+        self._init_db()
+
+    def _init_db(self):
+        # WAL模式保存在数据库文件中，扫描线程写入时GUI线程仍可读取
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    path TEXT PRIMARY KEY,
+                    folder TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    title TEXT,
+                    artist TEXT,
+                    album TEXT,
+                    duration REAL,
+                    artwork_hash TEXT,
+                    indexed_at REAL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tracks_folder ON tracks(folder)")
+
+    def get_track(self, path):
+        """
+        获取歌曲索引信息
+        :return: {"path", "mtime", "size", "title", "artist", "album", "duration", "artwork_hash"}，未索引时返回None
+        """
+        row = self.conn.execute(
+            "SELECT path, mtime, size, title, artist, album, duration, artwork_hash FROM tracks WHERE path = ?",
+            (normalize_path(path),)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("path", "mtime", "size", "title", "artist", "album", "duration", "artwork_hash"), row))
+
+    def get_fresh_track(self, path):
+        """获取歌曲索引信息，文件已修改时返回None"""
+        track = self.get_track(path)
+        if track is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_mtime != track["mtime"] or stat.st_size != track["size"]:
+            return None
+        return track
+
+    def get_folder_state(self, folder_path):
+        """获取文件夹（含子文件夹）下已索引歌曲的 {路径: (修改时间, 大小)}"""
+        folder_path = normalize_path(folder_path)
+        rows = self.conn.execute(
+            "SELECT path, mtime, size FROM tracks WHERE folder = ? OR folder LIKE ? ESCAPE '\\'",
+            (folder_path, self._escape_like(os.path.join(folder_path, "")) + "%")
+        ).fetchall()
+        return {path: (mtime, size) for path, mtime, size in rows}
+
+    def query_folder(self, folder_path):
+        """获取文件夹（含子文件夹）下的全部歌曲路径，按路径排序"""
+        return sorted(self.get_folder_state(folder_path).keys())
+
+    def search(self, keyword, path_list=None, limit=SEARCH_LIMIT):
+        """
+        按标题、歌手、专辑或文件名搜索
+        :param keyword: 关键字
+        :param path_list: 只在这些歌曲中搜索（如当前歌单），为空时搜索整个曲库
+        :return: 匹配的歌曲路径列表
+        """
+        pattern = "%" + self._escape_like(keyword) + "%"
+        sql = ("SELECT path FROM tracks WHERE (title LIKE ? ESCAPE '\\' OR artist LIKE ? ESCAPE '\\' "
+               "OR album LIKE ? ESCAPE '\\' OR file_name LIKE ? ESCAPE '\\')")
+        with self.conn as conn:
+            if path_list is None:
+                rows = conn.execute(sql + " ORDER BY path LIMIT ?", (pattern, pattern, pattern, pattern, limit))
+                return [row[0] for row in rows]
+            # 歌单可能很长，使用临时表代替超长的 IN 参数列表
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS search_scope (path TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM search_scope")
+            conn.executemany("INSERT OR IGNORE INTO search_scope (path) VALUES (?)",
+                             [(normalize_path(path),) for path in path_list])
+            rows = conn.execute(sql + " AND path IN (SELECT path FROM search_scope) LIMIT ?",
+                                (pattern, pattern, pattern, pattern, limit))
+            return [row[0] for row in rows]
+
+    def upsert_tracks(self, row_list):
+        if not row_list:
+            return
+        with self.conn as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO tracks
+                (path, folder, file_name, mtime, size, title, artist, album, duration, artwork_hash, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, row_list)
+
+    def remove_tracks(self, path_list):
+        if not path_list:
+            return
+        with self.conn as conn:
+            conn.executemany("DELETE FROM tracks WHERE path = ?", [(path,) for path in path_list])
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _escape_like(text):
+        return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class MusicLibraryScanThread(QThread):
+    """
+    曲库扫描线程
+
+    递归扫描文件夹，只重新读取修改时间或大小变化的文件（标签读取并行执行），
+    分批写入索引并清理已删除的文件，完成后从索引中查询文件夹下的全部歌曲路径。
+    扫描线程使用自己的数据库连接。
+    """
+    # 进度信号(已处理数, 需要处理的总数)
+    progress = Signal(int, int)
+    # 完成信号(文件夹路径, 歌曲路径列表)
+    scan_finished = Signal(str, list)
+
+    def __init__(self, db_path, folder_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.folder_path = normalize_path(folder_path)
+
+    def run(self):
+        path_list = []
+        library = None
+        try:
+            library = MusicLibrary(self.db_path)
+            path_list = self.scan(library)
+        except Exception:
+            print(f"扫描曲库失败:{traceback.format_exc()}")
+        finally:
+            if library is not None:
+                library.close()
+        self.scan_finished.emit(self.folder_path, path_list)
+
+    def scan(self, library):
+        file_map = scan_music_files(self.folder_path, self.isInterruptionRequested)
+        if self.isInterruptionRequested():
+            return []
+        indexed_map = library.get_folder_state(self.folder_path)
+        # 已删除的文件
+        library.remove_tracks([path for path in indexed_map if path not in file_map])
+        # 新增或已修改的文件
+        changed_list = [(path, mtime, size) for path, (mtime, size) in file_map.items()
+                        if indexed_map.get(path) != (mtime, size)]
+        total = len(changed_list)
+        self.progress.emit(0, total)
+        done = 0
+        with ThreadPoolExecutor(max_workers=SCAN_WORKER_COUNT) as executor:
+            for start in range(0, total, SCAN_BATCH_SIZE):
+                if self.isInterruptionRequested():
+                    break
+                batch = changed_list[start:start + SCAN_BATCH_SIZE]
+                row_list = list(executor.map(lambda item: read_track(*item), batch))
+                library.upsert_tracks(row_list)
+                done += len(batch)
+                self.progress.emit(done, total)
+        if self.isInterruptionRequested():
+            return []
+        # 歌单以索引为准
+        return library.query_folder(self.folder_path)
+
+
+music_library = None
+
+
+def get_music_library(db_dir):
+    """获取全局曲库索引"""
+    global music_library
+    if music_library is None:
+        music_library = MusicLibrary(os.path.join(db_dir, LIBRARY_DB_NAME))
+    return music_library
@@ -1,8 +1,10 @@
 # File 2: ui_components.py
+import os
+
 from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-                               QListWidget, QSlider, QWidget, QMenu)
+                               QListWidget, QSlider, QWidget, QMenu, QLineEdit)
 from PySide6.QtGui import QPixmap
-from PySide6.QtCore import Qt, QSize
+from PySide6.QtCore import Qt, QSize, QTimer
 import src.card.main_card.MusicCard.music_style as music_style
 from src.module import dialog_module
 from src.ui import image_util, style_util
@@ -290,6 +292,15 @@ def init_songlist_ui(music_card):
     songlist_button_layout.addWidget(music_card.song_list_title_label, alignment=Qt.AlignmentFlag.AlignCenter)
     songlist_button_layout.addWidget(music_card.delete_song_button)
     songlist_button_layout.addWidget(music_card.import_button)
+    # 歌曲搜索（按曲库索引中的标题、歌手、专辑匹配）
+    music_card.song_search_edit = QLineEdit()
+    music_card.song_search_edit.setPlaceholderText("搜索歌曲、歌手、专辑")
+    music_card.song_search_edit.setClearButtonEnabled(True)
+    music_card.song_search_timer = QTimer(music_card.song_search_edit)
+    music_card.song_search_timer.setSingleShot(True)
+    music_card.song_search_timer.setInterval(200)
+    music_card.song_search_timer.timeout.connect(lambda: filter_song_list(music_card))
+    music_card.song_search_edit.textChanged.connect(music_card.song_search_timer.start)
     # 歌曲列表
     music_card.songs_list = QListWidget()
     music_card.songs_list.itemSelectionChanged.connect(lambda: update_song_delete_button(music_card))
@@ -298,6 +309,7 @@ def init_songlist_ui(music_card):
     music_card.songs_list.setContextMenuPolicy(Qt.CustomContextMenu)
     music_card.songs_list.customContextMenuRequested.connect(lambda pos: show_song_context_menu(music_card, pos))
     music_card.song_list_layout.addLayout(songlist_button_layout)
+    music_card.song_list_layout.addWidget(music_card.song_search_edit)
     music_card.song_list_layout.addWidget(music_card.songs_list)
     music_card.song_list_widget.setLayout(music_card.song_list_layout)
     music_card.stacked_widget.addWidget(music_card.song_list_widget)
@@ -305,6 +317,22 @@ def init_songlist_ui(music_card):
     music_card.songs_list.setStyleSheet(music_style.music_list_style)
     music_card.songs_list.setSpacing(1)  # 设置项间距
 
+def filter_song_list(music_card):
+    """按搜索关键字隐藏不匹配的歌曲（保留行号，播放和删除仍按原序号处理）"""
+    keyword = music_card.song_search_edit.text().strip()
+    path_list = music_card.playlist_data.get(music_card.current_playlist, [])
+    if not keyword:
+        for row in range(music_card.songs_list.count()):
+            music_card.songs_list.setRowHidden(row, False)
+        return
+    match_path_set = set(music_card.get_music_library().search(keyword, path_list, limit=len(path_list)))
+    lower_keyword = keyword.lower()
+    for row, path in enumerate(path_list[:music_card.songs_list.count()]):
+        # 未建立索引的歌曲按文件名匹配
+        matched = os.path.normpath(path) in match_path_set or lower_keyword in os.path.basename(path).lower()
+        music_card.songs_list.setRowHidden(row, not matched)
+
+
 def update_song_delete_button(music_card):
     has_selection = len(music_card.songs_list.selectedItems()) > 0
     music_card.delete_song_button.setVisible(has_selection)
@@ -2,7 +2,7 @@
 from src.util import my_shiboken_util
 from PySide6.QtWidgets import QGraphicsRectItem, QGraphicsItem, QStyle, QGraphicsProxyWidget, QLabel
 from PySide6.QtCore import Signal, QObject, Qt, QUrl
-from PySide6.QtGui import QColor, QPen, QPainter, QPixmap
+from PySide6.QtGui import QColor, QPen, QPainter
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
 from src.client import card_store_client
 
@@ -80,7 +80,11 @@ class CardDesignItem(QGraphicsRectItem, QObject):
     def load_image(self, response):
         """加载图片"""
         image_url = response["darkUrl" if self.is_dark else "lightUrl"]
-        pixmap = self.use_parent.image_cache_manager.get_pixmap_by_url(image_url)
+        self.use_parent.image_cache_manager.get_pixmap_by_url_async(
+            image_url, lambda pixmap: self.on_local_image_loaded(pixmap, response), key=id(self))
+
+    def on_local_image_loaded(self, pixmap, response):
+        """本地缓存加载完成回调"""
         if pixmap is not None:
             self.label.setPixmap(pixmap)
         else:
@@ -97,12 +101,9 @@ class CardDesignItem(QGraphicsRectItem, QObject):
         """图片加载完成回调"""
         try:
             if self.reply.error() == QNetworkReply.NoError:
-                data = self.reply.readAll()
-                pixmap = QPixmap()
-                if pixmap.loadFromData(data) and self is not None and hasattr(self, 'label'):
-                    self.label.setPixmap(pixmap)
-                    # 缓存图片
-                    self.use_parent.image_cache_manager.save_pixmap_by_url(image_url, pixmap)
+                # 在工作线程中解码，同时缓存图片
+                self.use_parent.image_cache_manager.decode_data_by_url_async(
+                    image_url, self.reply.readAll(), self.on_image_decoded, key=id(self))
             else:
                 print(f"图片加载失败: {self.reply.errorString()}")
         except Exception as e:
@@ -112,6 +113,11 @@ class CardDesignItem(QGraphicsRectItem, QObject):
             self.reply.deleteLater()
         self.reply = None
 
+    def on_image_decoded(self, pixmap):
+        """图片解码完成回调"""
+        if pixmap is not None and self is not None and hasattr(self, 'label'):
+            self.label.setPixmap(pixmap)
+
     # 以下原有方法保持不变
     def get_card_data(self):
         return self.card_data
@@ -1,17 +1,16 @@
 # coding:utf-8
 import json
 import os
-import traceback
 
 from src.util import my_shiboken_util
-from weakref import ref
 
-from PySide6 import QtCore, QtWidgets, QtGui, QtNetwork
+from PySide6 import QtCore, QtWidgets, QtNetwork
 from PySide6.QtCore import Signal, Qt, QSize, QRect
 from PySide6.QtGui import QCursor
 from PySide6.QtWidgets import QLabel
 
 from src.card.main_card.SettingCard.setting.CardPermutation.CardDetailWidget import CardDetailWidget
+from src.card.main_card.SettingCard.setting.CardPermutation.CardStoreImageLoader import CardStoreImageLoader
 from src.my_component.LoadAnimation.LoadAnimation import LoadAnimation
 from src.ui import style_util
 from src.client import card_store_client
@@ -22,7 +21,6 @@ class CardStore(QtWidgets.QWidget):
     cardAdded = Signal(dict)  # 信号用于传递卡片数据
     before_plugin_map = []
     card_store_client = None
-    reply_list = []
     download_reply = None
 
     def __init__(self, parent=None, use_parent=None, is_dark=False):
@@ -48,12 +46,9 @@ class CardStore(QtWidgets.QWidget):
         self.card_install_buttons = {}
         # 发起加载卡片列表请求
         self.card_store_client.fetch_card_store_list()
-        # 图片缓存
-        self.image_cache = {}  # 图片缓存字典
-        self.pending_images = []  # 待加载图片队列
-        self.image_loading_timer = QtCore.QTimer(self)
-        self.image_loading_timer.setInterval(100)  # 每100ms处理一个图片
-        self.image_loading_timer.timeout.connect(self.load_next_image)
+        # 预览图加载器（并行加载，可见卡片优先，结果存入有界缓存）
+        self.image_loader = CardStoreImageLoader(self, self.use_parent, is_visible_func=self.is_image_visible,
+                                                 set_pixmap_func=self.set_card_image)
         # 详情窗口
         self.view_card_detail_widget = None
         # 存储标签页内容
@@ -178,6 +173,8 @@ class CardStore(QtWidgets.QWidget):
         """标签页切换事件"""
         if index >= 0:
             self.current_tab_index = index
+            # 切换标签页后可见卡片变化
+            self.image_loader.schedule_reprioritize()
             tab_name = self.tab_widget.tabText(index)
             # 如果该标签页内容尚未加载，则加载内容
             # 如果存在搜索条件，则应用搜索条件
@@ -260,6 +257,11 @@ class CardStore(QtWidgets.QWidget):
         scroll_area.setWidget(content_widget)
         # 存储内容引用
         self.tab_contents[tab_name] = content_widget
+        # 滚动时重新计算图片加载优先级
+        if not scroll_area.property("image_loader_connected"):
+            scroll_area.verticalScrollBar().valueChanged.connect(self.image_loader.schedule_reprioritize)
+            scroll_area.setProperty("image_loader_connected", True)
+        self.image_loader.schedule_reprioritize()
 
         # 设置字体
         style_util.set_font_and_right_click_style(self.use_parent, content_widget)
@@ -597,109 +599,26 @@ class CardStore(QtWidgets.QWidget):
                 network_img_path = img["darkUrl" if self.is_dark else "lightUrl"]
                 break
         if network_img_path:
-            # 检查缓存
-            if network_img_path in self.image_cache:
-                pixmap = self.image_cache[network_img_path]
-                # 使用弱引用检查对象是否仍然有效
-                try:
-                    widget.img_label.setPixmap(pixmap)
-                except RuntimeError:
-                    # 对象已被删除，跳过设置
-                    pass
-            else:
-                # 使用弱引用包装widget，避免引用循环
-                weak_widget = ref(widget)
-                # 加入队列并启动定时器
-                self.pending_images.append((network_img_path, weak_widget))
-                # 确保定时器始终运行
-                if not self.image_loading_timer.isActive():
-                    self.image_loading_timer.start()
-
-    def load_next_image(self):
-        if self.pending_images:
-            url, weak_widget = self.pending_images.pop(0)
-            widget = weak_widget()  # 获取实际对象
-
-            # 检查widget是否仍然存在
-            if widget is None:
-                # 对象已被删除，跳过处理
-                self.load_next_image()
-                return
-
-            if url in self.image_cache:
-                print("缓存命中")
-                pixmap = self.image_cache[url]
-                # 检查QLabel是否仍然有效
-                try:
-                    if widget.img_label and widget.img_label.isVisible():
-                        widget.img_label.setPixmap(pixmap)
-                except RuntimeError:
-                    # 对象已被删除，跳过设置
-                    pass
-                self.load_next_image()
-            else:
-                print(f"缓存未命中，尝试从本地加载图片: {url}")
-                pixmap = self.use_parent.image_cache_manager.get_pixmap_by_url(url)
-                if pixmap is not None:
-                    print("本地图片加载成功")
-                    self.image_cache[url] = pixmap
-                    # 检查QLabel是否仍然有效
-                    try:
-                        if widget.img_label and widget.img_label.isVisible():
-                            widget.img_label.setPixmap(pixmap)
-                    except RuntimeError:
-                        # 对象已被删除，跳过设置
-                        pass
-                    self.load_next_image()
-                else:
-                    print(f"本地图片不存在，准备加载网络图片: {url}")
-                    # 发起网络请求
-                    request = QtNetwork.QNetworkRequest(QtCore.QUrl(url))
-                    request.setRawHeader(b"Authorization", self.use_parent.access_token.encode())
-                    reply = self.network_manager.get(request)
-                    # 使用弱引用包装widget，避免引用循环
-                    reply.finished.connect(lambda: self.handle_image_reply(reply, url, weak_widget))
-                    self.reply_list.append(reply)
-
-    def handle_image_reply(self, reply, url, weak_widget):
+            target_size, device_pixel_ratio = self.get_image_target_size(widget)
+            self.image_loader.load(widget, network_img_path, target_size, device_pixel_ratio)
+
+    def get_image_target_size(self, widget):
+        """按图片标签的物理像素尺寸解码，避免在GUI线程缩放"""
+        device_pixel_ratio = widget.img_label.devicePixelRatio()
+        label_size = widget.img_label.size()
+        return QSize(int(label_size.width() * device_pixel_ratio),
+                     int(label_size.height() * device_pixel_ratio)), device_pixel_ratio
+
+    def is_image_visible(self, widget):
+        """卡片图片当前是否在可视区域内"""
+        return widget.img_label.isVisible() and not widget.img_label.visibleRegion().isEmpty()
+
+    def set_card_image(self, widget, pixmap):
         try:
-            widget = weak_widget()  # 获取实际对象
-            # 检查widget是否仍然存在
-            if widget is None:
-                # 对象已被删除，跳过处理
-                # 在执行删除操作前，检查C++对象是否存活
-                if reply is not None and my_shiboken_util.is_qobject_valid(reply):
-                    reply.deleteLater()
-                # 处理下一个图片
-                self.load_next_image()
-                return
-
-            if reply.error() == QtNetwork.QNetworkReply.NoError:
-                data = reply.readAll()
-                pixmap = QtGui.QPixmap()
-                pixmap.loadFromData(data)
-                if not pixmap.isNull():
-                    # 缓存图片
-                    self.image_cache[url] = pixmap
-                    # 检查QLabel是否仍然有效
-                    try:
-                        if widget.img_label and widget.img_label.isVisible():
-                            widget.img_label.setPixmap(pixmap)
-                    except RuntimeError:
-                        # 对象已被删除，跳过设置
-                        pass
-                    # 保存到本地缓存
-                    self.use_parent.image_cache_manager.save_pixmap_by_url(url, pixmap)
-        except Exception as e:
-            print(f"加载卡片商店图片失败:{traceback.format_exc()}")
-        # 清理该回复对象
-        if reply is not None and my_shiboken_util.is_qobject_valid(reply):
-            reply.deleteLater()
-        # 从待处理列表中移除
-        if reply in self.reply_list:
-            self.reply_list.remove(reply)
-        # 处理下一个图片
-        self.load_next_image()
+            widget.img_label.setPixmap(pixmap)
+        except RuntimeError:
+            # 对象已被删除，跳过设置
+            pass
 
     def update_dots(self, widget):
         current = widget.current_size_index
@@ -0,0 +1,226 @@
+# coding:utf-8
+import heapq
+import traceback
+from weakref import ref
+
+from PySide6.QtCore import QObject, QTimer, QUrl
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+
+from src.thread_list.image_decode_thread import get_image_decode_service
+from src.util import my_shiboken_util
+
+
+# 可见卡片优先加载
+PRIORITY_VISIBLE = 0
+# 不可见（滚出屏幕或在其他标签页）的卡片降级
+PRIORITY_HIDDEN = 1
+
+
+class CardStoreImageLoader(QObject):
+    """
+    卡片商店预览图加载器
+
+    在固定并发窗口内并行加载（本地缓存 -> 网络），按优先级队列调度：可见卡片优先，滚出屏幕的卡片降级。
+    同一个卡片控件只保留最新的请求，控件销毁或切换图片时取消旧请求。
+    解码结果存入 ImageCacheManager 的有界内存缓存。
+    """
+
+    def __init__(self, parent=None, use_parent=None, is_visible_func=None, set_pixmap_func=None, max_concurrency=6):
+        """
+        :param use_parent: 主程序对象（提供 image_cache_manager 和 access_token）
+        :param is_visible_func: 判断卡片控件当前是否可见的函数 widget -> bool
+        :param set_pixmap_func: 设置图片的函数 (widget, pixmap) -> None
+        :param max_concurrency: 最大并发数
+        """
+        super().__init__(parent)
+        self.use_parent = use_parent
+        self.is_visible_func = is_visible_func
+        self.set_pixmap_func = set_pixmap_func
+        self.max_concurrency = max_concurrency
+        self.network_manager = QNetworkAccessManager(self)
+        self.request_map = {}  # 控件id -> 请求
+        self.pending_heap = []  # 待加载队列 (优先级, 序号, 控件id)
+        self.loading_key_set = set()  # 加载中的控件id
+        self.watched_key_set = set()  # 已监听销毁信号的控件id
+        self.sequence = 0
+        # 滚动时合并多次重排
+        self.reprioritize_timer = QTimer(self)
+        self.reprioritize_timer.setSingleShot(True)
+        self.reprioritize_timer.setInterval(50)
+        self.reprioritize_timer.timeout.connect(self.reprioritize)
+
+    def load(self, widget, url, target_size=None, device_pixel_ratio=1.0):
+        """
+        为卡片控件加载图片
+        :param widget: 卡片控件
+        :param url: 图片地址
+        :param target_size: 解码目标尺寸（物理像素）
+        :param device_pixel_ratio: 设备像素比
+        """
+        key = id(widget)
+        request = self.request_map.get(key)
+        if request is not None:
+            if request["url"] == url:
+                return
+            # 同一控件切换了图片，取消旧请求
+            self.cancel(key)
+        # 内存缓存命中直接设置
+        pixmap = self.use_parent.image_cache_manager.peek_pixmap_by_url(url, target_size)
+        if pixmap is not None:
+            self.set_pixmap_func(widget, pixmap)
+            return
+        if key not in self.watched_key_set:
+            self.watched_key_set.add(key)
+            widget.destroyed.connect(lambda *args, k=key: self.on_widget_destroyed(k))
+        self.sequence += 1
+        request = {
+            "key": key,
+            "url": url,
+            "weak_widget": ref(widget),
+            "target_size": target_size,
+            "device_pixel_ratio": device_pixel_ratio,
+            "sequence": self.sequence,
+            "reply": None,
+            "decode_request_id": None,
+            "loading": False,
+        }
+        self.request_map[key] = request
+        heapq.heappush(self.pending_heap, (self.get_priority(widget), request["sequence"], key))
+        QTimer.singleShot(0, self.dispatch)
+
+    def get_priority(self, widget):
+        try:
+            if self.is_visible_func is not None and self.is_visible_func(widget):
+                return PRIORITY_VISIBLE
+        except RuntimeError:
+            pass
+        return PRIORITY_HIDDEN
+
+    def schedule_reprioritize(self):
+        """滚动、切换标签页后调用，延迟重排待加载队列"""
+        self.reprioritize_timer.start()
+
+    def reprioritize(self):
+        """根据当前可见性重建待加载队列，并清理已销毁的控件"""
+        heap = []
+        for key, request in list(self.request_map.items()):
+            widget = request["weak_widget"]()
+            if widget is None or not my_shiboken_util.is_qobject_valid(widget):
+                self.cancel(key)
+                continue
+            if not request["loading"]:
+                heap.append((self.get_priority(widget), request["sequence"], key))
+        heapq.heapify(heap)
+        self.pending_heap = heap
+        self.dispatch()
+
+    def dispatch(self):
+        """在并发窗口内启动待加载请求"""
+        while len(self.loading_key_set) < self.max_concurrency and self.pending_heap:
+            _, sequence, key = heapq.heappop(self.pending_heap)
+            request = self.request_map.get(key)
+            # 已取消或已被新请求替换
+            if request is None or request["sequence"] != sequence or request["loading"]:
+                continue
+            widget = request["weak_widget"]()
+            if widget is None:
+                self.cancel(key)
+                continue
+            self.start(request)
+
+    def start(self, request):
+        request["loading"] = True
+        self.loading_key_set.add(request["key"])
+        request["decode_request_id"] = self.use_parent.image_cache_manager.get_pixmap_by_url_async(
+            request["url"],
+            lambda pixmap: self.on_local_loaded(request, pixmap),
+            target_size=request["target_size"],
+            device_pixel_ratio=request["device_pixel_ratio"]
+        )
+
+    def is_current(self, request):
+        return self.request_map.get(request["key"]) is request
+
+    def on_local_loaded(self, request, pixmap):
+        if not self.is_current(request):
+            return
+        request["decode_request_id"] = None
+        if pixmap is not None:
+            self.finish(request, pixmap)
+            return
+        # 本地没有缓存，发起网络请求
+        network_request = QNetworkRequest(QUrl(request["url"]))
+        network_request.setRawHeader(b"Authorization", self.use_parent.access_token.encode())
+        reply = self.network_manager.get(network_request)
+        request["reply"] = reply
+        reply.finished.connect(lambda: self.on_reply_finished(request, reply))
+
+    def on_reply_finished(self, request, reply):
+        try:
+            if not self.is_current(request):
+                return
+            request["reply"] = None
+            if reply.error() != QNetworkReply.NoError:
+                print(f"加载卡片商店图片失败:{reply.errorString()}")
+                self.finish(request, None)
+                return
+            # 在工作线程中解码并缩放，同时写入本地缓存
+            request["decode_request_id"] = self.use_parent.image_cache_manager.decode_data_by_url_async(
+                request["url"], reply.readAll(),
+                lambda pixmap: self.on_decoded(request, pixmap),
+                target_size=request["target_size"],
+                device_pixel_ratio=request["device_pixel_ratio"]
+            )
+        except Exception:
+            print(f"加载卡片商店图片失败:{traceback.format_exc()}")
+            if self.is_current(request):
+                self.finish(request, None)
+        finally:
+            # 在执行删除操作前，检查C++对象是否存活
+            if reply is not None and my_shiboken_util.is_qobject_valid(reply):
+                reply.deleteLater()
+
+    def on_decoded(self, request, pixmap):
+        if not self.is_current(request):
+            return
+        request["decode_request_id"] = None
+        self.finish(request, pixmap)
+
+    def finish(self, request, pixmap):
+        key = request["key"]
+        self.request_map.pop(key, None)
+        self.loading_key_set.discard(key)
+        widget = request["weak_widget"]()
+        if widget is not None and pixmap is not None:
+            try:
+                self.set_pixmap_func(widget, pixmap)
+            except RuntimeError:
+                # 对象已被删除，跳过设置
+                pass
+        self.dispatch()
+
+    def cancel(self, key):
+        """取消控件的加载请求（中止网络请求并丢弃解码结果）"""
+        request = self.request_map.pop(key, None)
+        if request is None:
+            return
+        self.loading_key_set.discard(key)
+        if request["decode_request_id"] is not None:
+            get_image_decode_service().cancel(request["decode_request_id"])
+        reply = request["reply"]
+        request["reply"] = None
+        if reply is not None and my_shiboken_util.is_qobject_valid(reply) and reply.isRunning():
+            reply.abort()
+        QTimer.singleShot(0, self.dispatch)
+
+    def cancel_all(self):
+        for key in list(self.request_map.keys()):
+            self.cancel(key)
+        self.pending_heap = []
+
+    def on_widget_destroyed(self, key):
+        # 商店窗口整体销毁时加载器可能先于卡片控件被释放
+        if not my_shiboken_util.is_qobject_valid(self):
+            return
+        self.watched_key_set.discard(key)
+        self.cancel(key)
@@ -11,6 +11,7 @@ from src.card.MainCardManager.MainCard import MainCard
 from src.constant import data_save_constant
 from src.module.Box import text_box_util
 from src.client import common
+from src.thread_list.image_compress_thread import get_image_compress_service
 from src.ui import style_util
 
 
@@ -467,10 +468,13 @@ class TranslateCard(MainCard):
         self.captured_pixmap = pixmap
         # 更新状态
         self.status_label.setText("截图完成,正在压缩图片...")
-        try:
-            # 这里使用压缩后的版本
-            base64_data = self.toolkit.image_util.compress_pixmap_for_baidu(pixmap)
-        except ValueError as e:
+        # 在工作线程中压缩，完成后再发送ocr请求
+        get_image_compress_service().compress(
+            pixmap, lambda base64_data, error: self.on_screenshot_compressed(base64_data, error, do_job), key=id(self)
+        )
+
+    def on_screenshot_compressed(self, base64_data, error, do_job):
+        if error:
             self.status_label.setText("图片太大，压缩失败")
             self.source_text.setPlainText("")
             return
@@ -1,3 +1,4 @@
+import os
 
 # ******************** Http请求路径 ********************
 BASE_URL = "https://www.agiletiles.com/api"        # 基础路径 - 域名
@@ -9,6 +10,29 @@ WS_BASE_URL = "wss://www.agiletiles.com/api"       # 基础路径 - 域名
 # WS_BASE_URL = "ws://121.4.64.87:6666"               # 基础路径 - 固定IP
 # WS_BASE_URL = "ws://localhost:6666"                   # 基础路径 - 本地调试
 
+# ******************** 路径覆盖(本地桩服务/压测) ********************
+# 通过环境变量覆盖，例如 AGILE_TILES_BASE_URL=http://127.0.0.1:6666
+BASE_URL = os.environ.get("AGILE_TILES_BASE_URL", BASE_URL).rstrip("/")
+WS_BASE_URL = os.environ.get("AGILE_TILES_WS_BASE_URL", WS_BASE_URL).rstrip("/")
+
+
+def set_base_url(base_url, ws_base_url=None):
+    """
+    运行时覆盖请求基础路径（所有客户端均在发起请求时读取 common.BASE_URL，因此立即生效）
+    :param base_url: Http基础路径，如 http://127.0.0.1:6666
+    :param ws_base_url: WebSocket基础路径，为空时根据Http路径推导
+    """
+    global BASE_URL, WS_BASE_URL
+    BASE_URL = base_url.rstrip("/")
+    if ws_base_url is None:
+        if BASE_URL.startswith("https://"):
+            ws_base_url = "wss://" + BASE_URL[len("https://"):]
+        elif BASE_URL.startswith("http://"):
+            ws_base_url = "ws://" + BASE_URL[len("http://"):]
+        else:
+            ws_base_url = WS_BASE_URL
+    WS_BASE_URL = ws_base_url.rstrip("/")
+
 
 # 错误返回
 ERROR_RETURN = {"code": 1, "msg": "请求失败", "data": None}
@@ -1,4 +1,4 @@
-from PySide6.QtGui import QPixmap, Qt, QWheelEvent, QMouseEvent
+from PySide6.QtGui import Qt, QWheelEvent, QMouseEvent
 from PySide6.QtCore import Slot, QUrl, QTimer, QPoint
 from PySide6.QtNetwork import QNetworkReply, QNetworkAccessManager, QNetworkRequest
 from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QApplication, QFileDialog, QHBoxLayout, QScrollArea, \
@@ -6,7 +6,10 @@ from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QApplication, QF
 
 from src.my_component.AgileTilesAcrylicWindow.AgileTilesAcrylicWindow import AgileTilesAcrylicWindow
 from src.my_component.LoadAnimation.LoadAnimation import LoadAnimation
+from src.my_component.TiledImageView.TiledImageView import TiledImageView
+from src.thread_list.image_decode_thread import get_image_decode_service
 from src.ui import style_util
+from src.util import my_shiboken_util
 
 
 class ImagePopup(AgileTilesAcrylicWindow):
@@ -16,7 +19,6 @@ class ImagePopup(AgileTilesAcrylicWindow):
         try:
             self.setWindowTitle("图片查看" if title is None else title)
             # 初始化缩放和拖动相关变量
-            self.original_pixmap = None  # 保存原始图片
             self.scale_factor = 1.0  # 当前缩放比例
             self.min_scale = 0.1  # 最小缩放比例
             self.max_scale = 5.0  # 最大缩放比例
@@ -105,7 +107,7 @@ class ImagePopup(AgileTilesAcrylicWindow):
         self.image_container.layout().setContentsMargins(0, 0, 0, 0)
         self.image_container.layout().setSpacing(0)
 
-        # 图片标签
+        # 提示标签（加载失败时显示）
         self.image_label = QLabel(self.image_container)
         self.image_label.setStyleSheet(style_util.transparent_style)
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -113,6 +115,11 @@ class ImagePopup(AgileTilesAcrylicWindow):
         self.image_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.image_container.layout().addWidget(self.image_label)
 
+        # 图片视图（分块多分辨率绘制，缩放时不再整图缩放）
+        self.image_view = TiledImageView(self.image_container)
+        self.image_view.hide()
+        self.image_container.layout().addWidget(self.image_view)
+
         # 内容布局
         self.image_layout = QVBoxLayout()
         self.image_layout.addWidget(self.scroll_area)
@@ -164,11 +171,12 @@ class ImagePopup(AgileTilesAcrylicWindow):
         self.reset_zoom_button.hide()
 
         # 启用滚轮事件和鼠标事件
-        self.image_label.setFocusPolicy(Qt.StrongFocus)
-        self.image_label.wheelEvent = self.image_wheel_event
-        self.image_label.mousePressEvent = self.image_mouse_press_event
-        self.image_label.mouseMoveEvent = self.image_mouse_move_event
-        self.image_label.mouseReleaseEvent = self.image_mouse_release_event
+        self.image_view.setFocusPolicy(Qt.StrongFocus)
+        self.image_view.setMouseTracking(True)
+        self.image_view.wheelEvent = self.image_wheel_event
+        self.image_view.mousePressEvent = self.image_mouse_press_event
+        self.image_view.mouseMoveEvent = self.image_mouse_move_event
+        self.image_view.mouseReleaseEvent = self.image_mouse_release_event
 
         self.update()
 
@@ -177,12 +185,12 @@ class ImagePopup(AgileTilesAcrylicWindow):
         if event.button() == Qt.LeftButton:
             self.last_mouse_pos = event.globalPosition().toPoint()
             self.is_dragging = True
-            self.image_label.setCursor(Qt.ClosedHandCursor)
+            self.image_view.setCursor(Qt.ClosedHandCursor)
             event.accept()
 
     def image_mouse_move_event(self, event: QMouseEvent):
         """鼠标移动事件 - 拖动图片"""
-        if self.is_dragging and self.original_pixmap:
+        if self.is_dragging and self.image_view.has_image():
             current_pos = event.globalPosition().toPoint()
             delta = current_pos - self.last_mouse_pos
             self.last_mouse_pos = current_pos
@@ -196,18 +204,18 @@ class ImagePopup(AgileTilesAcrylicWindow):
         else:
             # 更新鼠标位置用于缩放中心点
             self.mouse_position = event.position().toPoint()
-            self.image_label.setCursor(Qt.OpenHandCursor if self.is_dragging else Qt.ArrowCursor)
+            self.image_view.setCursor(Qt.OpenHandCursor if self.is_dragging else Qt.ArrowCursor)
 
     def image_mouse_release_event(self, event: QMouseEvent):
         """鼠标释放事件 - 停止拖动"""
         if event.button() == Qt.LeftButton:
             self.is_dragging = False
-            self.image_label.setCursor(Qt.ArrowCursor)
+            self.image_view.setCursor(Qt.ArrowCursor)
             event.accept()
 
     def image_wheel_event(self, event: QWheelEvent):
         """处理图片区域的滚轮事件进行缩放 - 基于鼠标位置"""
-        if self.original_pixmap is None:
+        if not self.image_view.has_image():
             return
 
         # 获取滚轮滚动方向
@@ -218,18 +226,7 @@ class ImagePopup(AgileTilesAcrylicWindow):
         h_scroll = self.scroll_area.horizontalScrollBar()
         v_scroll = self.scroll_area.verticalScrollBar()
         scroll_pos = QPoint(h_scroll.value(), v_scroll.value())
-
-        # 计算缩放前鼠标在图片上的位置
-        label_size = self.image_label.size()
-        pixmap_size = self.image_label.pixmap().size() / self.image_label.devicePixelRatio()
-        pixmap_x = (label_size.width() - pixmap_size.width()) / 2
-        pixmap_y = (label_size.height() - pixmap_size.height()) / 2
-
-        # 鼠标在图片上的位置（相对于图片左上角）
-        img_pos_before = QPoint(
-            int(self.mouse_position.x() - pixmap_x),
-            int(self.mouse_position.y() - pixmap_y)
-        )
+        scale_before = self.scale_factor
 
         # 执行缩放
         if delta > 0:
@@ -237,32 +234,16 @@ class ImagePopup(AgileTilesAcrylicWindow):
         elif delta < 0:
             self.zoom_out()
 
-        # 缩放后重新计算鼠标位置
-        pixmap_size = self.image_label.pixmap().size() / self.image_label.devicePixelRatio()
-        pixmap_x = (label_size.width() - pixmap_size.width()) / 2
-        pixmap_y = (label_size.height() - pixmap_size.height()) / 2
-
-        # 计算缩放后鼠标应该在的位置
-        img_pos_after = QPoint(
-            int(img_pos_before.x() * self.scale_factor),
-            int(img_pos_before.y() * self.scale_factor)
-        )
-
-        # 计算新的滚动位置以保持鼠标位置不变
-        new_scroll_pos = QPoint(
-            int(scroll_pos.x() + (self.mouse_position.x() - (pixmap_x + img_pos_after.x()))),
-            int(scroll_pos.y() + (self.mouse_position.y() - (pixmap_y + img_pos_after.y())))
-        )
-
-        # 应用新的滚动位置
-        h_scroll.setValue(new_scroll_pos.x())
-        v_scroll.setValue(new_scroll_pos.y())
+        # 缩放后鼠标下的图片位置移动到 原位置 * 缩放倍数，调整滚动条使其保持在鼠标下
+        ratio = self.scale_factor / scale_before
+        h_scroll.setValue(int(scroll_pos.x() + self.mouse_position.x() * (ratio - 1)))
+        v_scroll.setValue(int(scroll_pos.y() + self.mouse_position.y() * (ratio - 1)))
 
         event.accept()
 
     def zoom_in(self):
         """放大图片"""
-        if self.original_pixmap is None:
+        if not self.image_view.has_image():
             return
 
         new_scale = self.scale_factor + self.zoom_step
@@ -272,7 +253,7 @@ class ImagePopup(AgileTilesAcrylicWindow):
 
     def zoom_out(self):
         """缩小图片"""
-        if self.original_pixmap is None:
+        if not self.image_view.has_image():
             return
 
         new_scale = self.scale_factor - self.zoom_step
@@ -282,7 +263,7 @@ class ImagePopup(AgileTilesAcrylicWindow):
 
     def reset_zoom(self):
         """重置缩放比例"""
-        if self.original_pixmap is None:
+        if not self.image_view.has_image():
             return
 
         self.scale_factor = 1.0
@@ -315,34 +296,14 @@ class ImagePopup(AgileTilesAcrylicWindow):
             v_scroll.setValue(v_max // 2)
 
     def update_image_display(self):
-        """根据当前缩放比例更新图片显示"""
-        if self.original_pixmap is None:
+        """根据当前缩放比例更新图片显示（只改变视图尺寸，可见瓦片按需绘制）"""
+        if not self.image_view.has_image():
             return
 
-        # 获取设备像素比（解决高DPI屏幕模糊问题）
-        device_pixel_ratio = self.image_label.devicePixelRatio()
-
-        # 计算精确尺寸（考虑DPI缩放）
-        new_width = int(self.original_pixmap.width() * self.scale_factor * device_pixel_ratio)
-        new_height = int(self.original_pixmap.height() * self.scale_factor * device_pixel_ratio)
-
-        # 创建高质量缩放图片
-        scaled_pixmap = self.original_pixmap.scaled(
-            new_width,
-            new_height,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-
-        # 设置设备像素比（关键修复）
-        scaled_pixmap.setDevicePixelRatio(device_pixel_ratio)
-
-        # 更新图片显示
-        self.image_label.setPixmap(scaled_pixmap)
-        self.image_label.setFixedSize(scaled_pixmap.size() / device_pixel_ratio)  # 注意尺寸调整
+        self.image_view.set_scale_factor(self.scale_factor)
 
         # 确保容器大小适应图片
-        self.image_container.setMinimumSize(scaled_pixmap.size() / device_pixel_ratio)
+        self.image_container.setMinimumSize(self.image_view.size())
         self.image_container.adjustSize()
 
     def center_on_screen(self):
@@ -353,9 +314,8 @@ class ImagePopup(AgileTilesAcrylicWindow):
         reply = self.sender()
         if reply.error() == QNetworkReply.NoError:
             data = reply.readAll()
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            self.on_image_loaded(pixmap)
+            # 在工作线程中解码，避免大图阻塞界面
+            get_image_decode_service().decode(data, self.on_image_decoded, key=id(self), as_image=True)
         else:
             print(f"Request failed: {reply.errorString()}")
             self.on_image_loaded(None)
@@ -363,19 +323,29 @@ class ImagePopup(AgileTilesAcrylicWindow):
         reply.deleteLater()
         self.current_reply = None
 
-    @Slot(QPixmap)
-    def on_image_loaded(self, pixmap):
+    def on_image_decoded(self, image):
+        # 解码完成前窗口已关闭
+        if not my_shiboken_util.is_qobject_valid(self.image_label):
+            return
+        # 直接把解码得到的QImage交给图片视图，不在GUI线程转换为QPixmap再转换回来
+        self.on_image_loaded(image)
+
+    @Slot(object)
+    def on_image_loaded(self, image):
         # 移除加载动画（如果存在）
         if hasattr(self, 'loading_animation') and self.loading_animation:
             self.loading_animation.deleteLater()
             del self.loading_animation
 
-        if pixmap is None or pixmap.isNull():
+        if image is None or image.isNull():
             self.image_label.setText("加载图片失败")
             return
 
-        # 保存原始图片
-        self.original_pixmap = pixmap
+        # 原图交给图片视图（QImage或直接传入的QPixmap）
+        self.image_view.set_image(image)
+        image_size = self.image_view.image_size()
+        self.image_label.hide()
+        self.image_view.show()
 
         # 初始显示（按比例缩放以适应窗口）
         screen = QApplication.primaryScreen().availableGeometry()
@@ -384,16 +354,18 @@ class ImagePopup(AgileTilesAcrylicWindow):
 
         # 计算初始缩放比例
         self.scale_factor = min(
-            max_width / pixmap.width(),
-            max_height / pixmap.height(),
+            max_width / image_size.width(),
+            max_height / image_size.height(),
             1.0  # 初始不超过原始大小
         )
 
         # 设置初始窗口大小
         space_width = 10
         space_height = 100  # 标题栏和按钮区域高度
-        initial_width = min(int(pixmap.width() * self.scale_factor) + space_width * 2 + 50, int(screen.width() * 0.9))
-        initial_height = min(int(pixmap.height() * self.scale_factor) + space_height + 50, int(screen.height() * 0.9))
+        initial_width = min(int(image_size.width() * self.scale_factor) + space_width * 2 + 50,
+                            int(screen.width() * 0.9))
+        initial_height = min(int(image_size.height() * self.scale_factor) + space_height + 50,
+                             int(screen.height() * 0.9))
         self.resize(initial_width, initial_height)
 
         # 更新图片显示
@@ -418,14 +390,14 @@ class ImagePopup(AgileTilesAcrylicWindow):
             "保存图片",
             "",
             "PNG 图片 (*.png);;JPEG 图片 (*.jpg *.jpeg)")
-        if file_path:
-            pixmap = self.image_label.pixmap()
-            if pixmap:
-                pixmap.save(file_path)
+        if file_path and self.image_view.has_image():
+            self.image_view.image().save(file_path)
 
     def closeEvent(self, event):
         if hasattr(self, 'current_reply') and self.current_reply and self.current_reply.isRunning():
             self.current_reply.abort()
+        get_image_decode_service().cancel_key(id(self))
+        self.image_view.release()
         super().closeEvent(event)
 
 
@@ -1,6 +1,14 @@
 from PySide6.QtWidgets import QWidget, QLabel, QHBoxLayout, QVBoxLayout
 from PySide6.QtGui import QPainter, QColor, QGuiApplication, QPixmap
-from PySide6.QtCore import Qt, QPoint, QRect
+from PySide6.QtCore import Qt, QPoint, QRect, QRectF
+
+
+# 放大镜取样的像素范围（奇数，中心为当前像素）
+LOUPE_PIXELS = 15
+# 放大镜中每个像素的显示大小
+LOUPE_CELL_SIZE = 6
+# 平均取样模式的半径（3x3）
+AVERAGE_RADIUS = 1
 
 
 def get_virtual_geo():
@@ -84,6 +92,21 @@ class ScreenColorPicker(QWidget):
 
         self.setGeometry(screen_geometry)
 
+        # 每次截图只转换一次，取色和放大镜都从这张图中按像素读取
+        self.screen_image = self.fullscreen_pixmap.toImage()
+        # 背景只缩放一次
+        if self.screen_count > 1:
+            self.base_pixmap = QPixmap(self.fullscreen_pixmap)
+        else:
+            self.base_pixmap = self.fullscreen_pixmap.scaled(
+                self.size() * self.dpr,
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        self.base_pixmap.setDevicePixelRatio(1)
+        # 平均取样模式（按A键切换）
+        self.average_mode = False
+
         # 创建提示标签 - 使用布局来组织颜色块和文本
         self.tip_label = QWidget(self)
         self.tip_label.setStyleSheet(
@@ -92,13 +115,18 @@ class ScreenColorPicker(QWidget):
             "padding: 5px; "
             "border-radius: 3px;"
         )
-        self.tip_label.setFixedSize(280, 100)
+        self.tip_label.setFixedSize(280 + LOUPE_PIXELS * LOUPE_CELL_SIZE + 10, LOUPE_PIXELS * LOUPE_CELL_SIZE + 10)
         self.tip_label.hide()
 
+        # 创建放大镜
+        self.loupe_label = QLabel(self.tip_label)
+        self.loupe_label.setFixedSize(LOUPE_PIXELS * LOUPE_CELL_SIZE, LOUPE_PIXELS * LOUPE_CELL_SIZE)
+
         # 创建颜色显示区域
         self.color_display = QLabel(self.tip_label)
         self.color_display.setFixedSize(60, 60)
         self.color_display.setStyleSheet("border: 1px solid black;")
+        self.color_pixmap = QPixmap(self.color_display.size())
 
         # 创建文本标签
         self.text_label = QLabel(self.tip_label)
@@ -106,48 +134,89 @@ class ScreenColorPicker(QWidget):
 
         # 设置布局
         layout = QHBoxLayout(self.tip_label)
+        layout.addWidget(self.loupe_label)
         layout.addWidget(self.color_display)
         layout.addWidget(self.text_label)
         layout.setSpacing(10)
         layout.setContentsMargins(5, 5, 5, 5)
 
     def paintEvent(self, event):
-        """绘制事件"""
+        """绘制事件（只绘制脏区域，背景在截图时已缩放好）"""
         painter = QPainter(self)
+        dirty_rect = event.rect()
+        source_rect = QRectF(dirty_rect.x() * self.dpr, dirty_rect.y() * self.dpr,
+                             dirty_rect.width() * self.dpr, dirty_rect.height() * self.dpr)
+        painter.drawPixmap(QRectF(dirty_rect), self.base_pixmap, source_rect)
 
-        # 绘制屏幕截图
+    def to_image_point(self, pos):
+        """窗口坐标转换为截图中的像素坐标（限制在图像范围内）"""
         if self.screen_count > 1:
-            painter.drawPixmap(0, 0, self.fullscreen_pixmap)
+            point = QPoint(pos)
         else:
-            win_size = self.size()
-            scaled_pixmap = self.fullscreen_pixmap.scaled(
-                win_size * self.dpr,
-                Qt.AspectRatioMode.IgnoreAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            painter.drawPixmap(0, 0, win_size.width(), win_size.height(), scaled_pixmap)
+            point = pos * self.dpr
+        point.setX(max(0, min(point.x(), self.screen_image.width() - 1)))
+        point.setY(max(0, min(point.y(), self.screen_image.height() - 1)))
+        return point
 
-    def mouseMoveEvent(self, event):
-        """鼠标移动事件"""
-        pos = event.position().toPoint()
+    def sample_color(self, pos):
+        """获取鼠标位置的颜色，平均模式下取周围像素的平均值"""
+        point = self.to_image_point(pos)
+        if not self.average_mode:
+            return self.screen_image.pixelColor(point)
+        red = green = blue = alpha = count = 0
+        for y in range(point.y() - AVERAGE_RADIUS, point.y() + AVERAGE_RADIUS + 1):
+            if y < 0 or y >= self.screen_image.height():
+                continue
+            for x in range(point.x() - AVERAGE_RADIUS, point.x() + AVERAGE_RADIUS + 1):
+                if x < 0 or x >= self.screen_image.width():
+                    continue
+                color = self.screen_image.pixelColor(x, y)
+                red += color.red()
+                green += color.green()
+                blue += color.blue()
+                alpha += color.alpha()
+                count += 1
+        return QColor(round(red / count), round(green / count), round(blue / count), round(alpha / count))
 
-        # 获取鼠标位置的颜色
-        if self.screen_count > 1:
-            color = self.fullscreen_pixmap.toImage().pixelColor(pos)
-        else:
-            dpr_pos = pos * self.dpr
-            color = self.fullscreen_pixmap.toImage().pixelColor(dpr_pos)
+    def update_loupe(self, pos):
+        """只从鼠标附近的像素生成放大镜图像"""
+        point = self.to_image_point(pos)
+        half = LOUPE_PIXELS // 2
+        # 超出屏幕的部分为透明
+        area = self.screen_image.copy(QRect(point.x() - half, point.y() - half, LOUPE_PIXELS, LOUPE_PIXELS))
+        loupe_pixmap = QPixmap.fromImage(area.scaled(
+            self.loupe_label.size(),
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.FastTransformation
+        ))
+        painter = QPainter(loupe_pixmap)
+        # 标出当前取样范围
+        radius = AVERAGE_RADIUS if self.average_mode else 0
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawRect((half - radius) * LOUPE_CELL_SIZE, (half - radius) * LOUPE_CELL_SIZE,
+                         (radius * 2 + 1) * LOUPE_CELL_SIZE - 1, (radius * 2 + 1) * LOUPE_CELL_SIZE - 1)
+        painter.setPen(QColor(0, 0, 0))
+        painter.drawRect((half - radius) * LOUPE_CELL_SIZE - 1, (half - radius) * LOUPE_CELL_SIZE - 1,
+                         (radius * 2 + 1) * LOUPE_CELL_SIZE + 1, (radius * 2 + 1) * LOUPE_CELL_SIZE + 1)
+        painter.end()
+        self.loupe_label.setPixmap(loupe_pixmap)
+
+    def update_tip(self, pos):
+        """更新提示（颜色、文本、放大镜）"""
+        color = self.sample_color(pos)
 
         # 更新颜色显示区域
-        self.color_display.setStyleSheet(
-            f"background-color: {color.name(QColor.NameFormat.HexArgb)}; border: 1px solid black;")
+        self.color_pixmap.fill(color)
+        self.color_display.setPixmap(self.color_pixmap)
+        self.update_loupe(pos)
 
         # 更新文本信息
         rgb_text = f"RGB: {color.red()}, {color.green()}, {color.blue()}, {color.alpha()}"
         hex_text = f"HEX: {color.name(QColor.NameFormat.HexArgb)}"
         pos_text = f"坐标: {pos.x()}, {pos.y()}"
+        mode_text = f"取样: {'3x3平均' if self.average_mode else '单像素'}（A键切换）"
 
-        self.text_label.setText(f"{rgb_text}\n{hex_text}\n{pos_text}")
+        self.text_label.setText(f"{rgb_text}\n{hex_text}\n{pos_text}\n{mode_text}")
 
         # 定位提示标签在鼠标右下方
         label_pos = pos + QPoint(20, 20)
@@ -160,18 +229,16 @@ class ScreenColorPicker(QWidget):
         self.tip_label.move(label_pos)
         self.tip_label.show()
 
-        self.update()
+    def mouseMoveEvent(self, event):
+        """鼠标移动事件（背景不变，无需重绘整个窗口）"""
+        self.update_tip(event.position().toPoint())
 
     def mousePressEvent(self, event):
         """鼠标点击事件"""
         if event.button() == Qt.MouseButton.LeftButton:
             pos = event.position().toPoint()
             # 获取点击位置的颜色
-            if self.screen_count > 1:
-                color = self.fullscreen_pixmap.toImage().pixelColor(pos)
-            else:
-                dpr_pos = pos * self.dpr
-                color = self.fullscreen_pixmap.toImage().pixelColor(dpr_pos)
+            color = self.sample_color(pos)
             # 隐藏取色器窗口
             self.hide()
             # 显示颜色转换器
@@ -195,4 +262,9 @@ class ScreenColorPicker(QWidget):
     def keyPressEvent(self, event):
         """键盘事件处理"""
         if event.key() == Qt.Key.Key_Escape:
-            self.close_trigger()
\ No newline at end of file
+            self.close_trigger()
+        elif event.key() == Qt.Key.Key_A:
+            # 切换单像素/平均取样
+            self.average_mode = not self.average_mode
+            if self.tip_label.isVisible():
+                self.update_tip(self.mapFromGlobal(self.cursor().pos()))
\ No newline at end of file
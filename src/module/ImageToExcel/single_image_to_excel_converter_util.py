@@ -16,11 +16,11 @@ from src.ui import style_util, image_util
 # 真实云端API调用
 def call_cloud_api(access_token, network_manager, image_path, engine="baidu"):
     """调用真实云端API，返回base64编码的Excel内容"""
-    # 使用QPixmap读取
-    pixmap = QtGui.QPixmap(image_path)
+    # 在工作线程中调用，使用QImage读取（QPixmap只能在GUI线程使用）
+    image = QtGui.QImage(image_path)
     try:
         # 这里使用压缩后的版本
-        base64_data = image_util.compress_pixmap_for_baidu(pixmap)
+        base64_data = image_util.compress_image_for_baidu(image)
     except ValueError as e:
         raise Exception(f"文件读取错误")
 
@@ -4,7 +4,7 @@ from PySide6.QtCore import QUrl, Signal, QTimer, QUrlQuery, QObject
 from PySide6.QtNetwork import QNetworkRequest
 from PySide6.QtWebSockets import QWebSocket
 
-from src.client.common import WS_BASE_URL
+from src.client import common
 
 
 class PaymentWebSocketClient(QObject):
@@ -28,7 +28,7 @@ class PaymentWebSocketClient(QObject):
         self._close_websocket()
 
         # 构建带订单号的URL
-        url = QUrl(f"{WS_BASE_URL}/websocket/normal/payment")
+        url = QUrl(f"{common.WS_BASE_URL}/websocket/normal/payment")
         query = QUrlQuery()
         # query.addQueryItem("Authorization", self.use_parent.access_token)
         query.addQueryItem("outTradeNo", self.current_order_no)
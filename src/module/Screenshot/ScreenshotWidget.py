@@ -2,8 +2,9 @@ import math
 
 from PySide6.QtWidgets import QLabel, QWidget, QPushButton, QHBoxLayout, QFileDialog, QApplication
 from PySide6.QtGui import QPainter, QColor, QPen, QGuiApplication, QPixmap, QFont
-from PySide6.QtCore import Qt, QRect, QPoint, Signal, QSize
+from PySide6.QtCore import Qt, QRect, QRectF, QPoint, Signal, QSize
 
+from src.module.Screenshot.shape_history import ShapeHistory, AddShapeCommand
 from src.ui import style_util
 
 
@@ -137,6 +138,13 @@ class ScreenshotWidget(QWidget):
             self.dpr = 1
         self.setGeometry(screen_geometry)
 
+        # 每次截图只准备一次的背景层（重绘时按脏区域从中拷贝）
+        self.base_pixmap = None  # 缩放后的屏幕图像
+        self.dimmed_pixmap = None  # 叠加半透明遮罩后的屏幕图像
+        self.prepare_layers()
+        # 图形缓存层 (范围, 图像)，只在图形编辑后重新绘制
+        self.shapes_layer = None
+
         # 截图相关变量
         self.start_point = QPoint()
         self.end_point = QPoint()
@@ -160,8 +168,7 @@ class ScreenshotWidget(QWidget):
         self.draw_start = QPoint()  # 绘制起始点
         self.draw_end = QPoint()  # 绘制结束点
         self.shapes = []  # 存储所有绘制的图形
-        self.undo_stack = []  # 撤销栈
-        self.redo_stack = []  # 重做栈
+        self.history = ShapeHistory()  # 撤销/重做历史（只记录编辑命令）
         self.current_pen = QPen(QColor(255, 0, 0), 3)  # 当前画笔设置
         self.current_tool = None  # 当前选中的工具
         self.last_tool = None  # 上一次选中的工具
@@ -573,85 +580,35 @@ class ScreenshotWidget(QWidget):
         else:
             self.setCursor(Qt.CursorShape.ArrowCursor)
 
-    def add_to_history(self):
-        """将当前图形状态添加到历史记录"""
-        # 深拷贝当前图形列表
-        shapes_copy = []
-        for shape in self.shapes:
-            if shape.type == "rectangle":
-                shapes_copy.append(Rectangle(shape.rect, shape.pen))
-            elif shape.type == "ellipse":
-                shapes_copy.append(Ellipse(shape.rect, shape.pen))
-            elif shape.type == "line":
-                shapes_copy.append(Line(shape.start_point, shape.end_point, shape.pen))
-            elif shape.type == "arrow":
-                shapes_copy.append(Arrow(shape.start_point, shape.end_point, shape.pen))
-
-        # 添加到撤销栈
-        self.undo_stack.append(shapes_copy)
-        # 清空重做栈
-        self.redo_stack = []
+    def add_shape(self, shape):
+        """新增图形并记录历史"""
+        self.history.push(AddShapeCommand(shape), self.shapes)
+        self.invalidate_shapes_layer()
+        self.update_history_buttons()
 
-        # 更新按钮状态
-        self.undo_btn.setEnabled(len(self.undo_stack) > 0)
-        self.redo_btn.setEnabled(len(self.redo_stack) > 0)
+    def update_history_buttons(self):
+        """更新撤销/重做按钮状态"""
+        self.undo_btn.setEnabled(self.history.can_undo())
+        self.redo_btn.setEnabled(self.history.can_redo())
 
     def undo(self):
+        """撤销操作"""
         # 隐藏绘图工具栏
         self.draw_toolbar.hide()
-        """撤销操作"""
-        if not self.undo_stack:
+        if not self.history.undo(self.shapes):
             return
-
-        # 将当前状态保存到重做栈
-        shapes_copy = []
-        for shape in self.shapes:
-            if shape.type == "rectangle":
-                shapes_copy.append(Rectangle(shape.rect, shape.pen))
-            elif shape.type == "ellipse":
-                shapes_copy.append(Ellipse(shape.rect, shape.pen))
-            elif shape.type == "line":
-                shapes_copy.append(Line(shape.start_point, shape.end_point, shape.pen))
-            elif shape.type == "arrow":
-                shapes_copy.append(Arrow(shape.start_point, shape.end_point, shape.pen))
-        self.redo_stack.append(shapes_copy)
-
-        # 恢复上一个状态
-        self.shapes = self.undo_stack.pop()
-
-        # 更新按钮状态
-        self.undo_btn.setEnabled(len(self.undo_stack) > 0)
-        self.redo_btn.setEnabled(len(self.redo_stack) > 0)
-
+        self.invalidate_shapes_layer()
+        self.update_history_buttons()
         self.update()
 
     def redo(self):
+        """重做操作"""
         # 隐藏绘图工具栏
         self.draw_toolbar.hide()
-        """重做操作"""
-        if not self.redo_stack:
+        if not self.history.redo(self.shapes):
             return
-
-        # 将当前状态保存到撤销栈
-        shapes_copy = []
-        for shape in self.shapes:
-            if shape.type == "rectangle":
-                shapes_copy.append(Rectangle(shape.rect, shape.pen))
-            elif shape.type == "ellipse":
-                shapes_copy.append(Ellipse(shape.rect, shape.pen))
-            elif shape.type == "line":
-                shapes_copy.append(Line(shape.start_point, shape.end_point, shape.pen))
-            elif shape.type == "arrow":
-                shapes_copy.append(Arrow(shape.start_point, shape.end_point, shape.pen))
-        self.undo_stack.append(shapes_copy)
-
-        # 恢复下一个状态
-        self.shapes = self.redo_stack.pop()
-
-        # 更新按钮状态
-        self.undo_btn.setEnabled(len(self.undo_stack) > 0)
-        self.redo_btn.setEnabled(len(self.redo_stack) > 0)
-
+        self.invalidate_shapes_layer()
+        self.update_history_buttons()
         self.update()
 
     def set_pen_width(self, width):
@@ -733,23 +690,110 @@ class ScreenshotWidget(QWidget):
             self.draw_toolbar.move(toolbar_rect.x(), toolbar_rect.bottom() + 5)
             self.draw_toolbar.show()
 
+    def prepare_layers(self):
+        """准备背景层：缩放后的屏幕图像和叠加遮罩后的图像（每次截图一次）"""
+        if self.screen_count > 1:
+            self.base_pixmap = QPixmap(self.fullscreen_pixmap)
+        else:
+            # 考虑DPI缩放
+            self.base_pixmap = self.fullscreen_pixmap.scaled(
+                self.size() * self.dpr,
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        # 背景层按物理像素寻址，绘制时通过源矩形换算
+        self.base_pixmap.setDevicePixelRatio(1)
+        self.dimmed_pixmap = QPixmap(self.base_pixmap.size())
+        painter = QPainter(self.dimmed_pixmap)
+        painter.drawPixmap(0, 0, self.base_pixmap)
+        painter.fillRect(self.dimmed_pixmap.rect(), QColor(0, 0, 0, 120))
+        painter.end()
+
+    def to_layer_rect(self, rect):
+        """窗口坐标的矩形转换为背景层中的像素矩形"""
+        return QRectF(rect.x() * self.dpr, rect.y() * self.dpr, rect.width() * self.dpr, rect.height() * self.dpr)
+
+    def paint_background(self, painter, dirty_rect, clear_rect=None):
+        """绘制脏区域内的背景：遮罩层，以及选区内的原图"""
+        painter.drawPixmap(QRectF(dirty_rect), self.dimmed_pixmap, self.to_layer_rect(dirty_rect))
+        if clear_rect is not None:
+            area = clear_rect.intersected(dirty_rect)
+            if not area.isEmpty():
+                painter.drawPixmap(QRectF(area), self.base_pixmap, self.to_layer_rect(area))
+
+    def get_shape_bounding_rect(self, shape_type, start_point, end_point, pen):
+        """图形的重绘范围（包含画笔宽度和箭头）"""
+        margin = pen.width() + 2
+        if shape_type == "arrow":
+            margin += 15
+        return QRect(start_point, end_point).normalized().adjusted(-margin, -margin, margin, margin)
+
+    def get_shape_rect(self, shape):
+        if shape.type in ("rectangle", "ellipse"):
+            return self.get_shape_bounding_rect(shape.type, shape.rect.topLeft(), shape.rect.bottomRight(), shape.pen)
+        return self.get_shape_bounding_rect(shape.type, shape.start_point, shape.end_point, shape.pen)
+
+    def invalidate_shapes_layer(self):
+        """图形编辑（新增、撤销、重做）后调用"""
+        self.shapes_layer = None
+
+    def get_shapes_layer(self):
+        """获取图形缓存层，返回 (范围, 图像)，没有图形时返回None"""
+        if self.shapes_layer is None and self.shapes:
+            bounds = QRect()
+            for shape in self.shapes:
+                bounds = bounds.united(self.get_shape_rect(shape))
+            device_pixel_ratio = self.devicePixelRatioF()
+            layer = QPixmap(bounds.size() * device_pixel_ratio)
+            layer.setDevicePixelRatio(device_pixel_ratio)
+            layer.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(layer)
+            painter.translate(-bounds.topLeft())
+            self.draw_shapes(painter, self.shapes)
+            painter.end()
+            self.shapes_layer = (bounds, layer)
+        return self.shapes_layer
+
+    def draw_shapes(self, painter, shapes):
+        """绘制图形列表"""
+        for shape in shapes:
+            painter.setPen(shape.pen)
+            if shape.type == "rectangle":
+                painter.drawRect(shape.rect)
+            elif shape.type == "ellipse":
+                painter.drawEllipse(shape.rect)
+            elif shape.type == "line":
+                painter.drawLine(shape.start_point, shape.end_point)
+            elif shape.type == "arrow":
+                self.draw_arrow(painter, shape.start_point, shape.end_point, shape.pen)
+
+    def update_rect_change(self, old_rect, new_rect, margin=0):
+        """只重绘变化前后的两个区域"""
+        if old_rect is not None:
+            self.update(old_rect.adjusted(-margin, -margin, margin, margin))
+        if new_rect is not None:
+            self.update(new_rect.adjusted(-margin, -margin, margin, margin))
+
     def paintEvent(self, event):
         painter = QPainter(self)
+        dirty_rect = event.rect()
 
         if not self.is_captured:
             # 截图模式
-            if self.screen_count > 1:
-                self.paint_more_screen(painter)
-            else:
-                self.paint_one_screen(painter)
+            selection_rect = None
+            if self.dragging:
+                selection_rect = QRect(self.start_point, self.end_point).normalized()
+            self.paint_background(painter, dirty_rect, selection_rect)
+            if selection_rect is not None:
+                # 绘制选区边框
+                painter.setPen(QPen(QColor(100, 150, 243), 2))
+                painter.drawRect(selection_rect)
         else:
             # 编辑模式 - 只显示截图区域，其他区域半透明
-            painter.drawPixmap(0, 0, self.fullscreen_pixmap)
-            painter.fillRect(self.rect(), QColor(0, 0, 0, 120))
+            self.paint_background(painter, dirty_rect, self.screenshot_rect)
 
             # 绘制截图区域
             if self.screenshot_rect:
-                painter.drawPixmap(self.screenshot_rect.topLeft(), self.captured_pixmap)
                 painter.setPen(QPen(QColor(100, 150, 243), 2))
                 painter.drawRect(self.screenshot_rect)
 
@@ -757,17 +801,10 @@ class ScreenshotWidget(QWidget):
                 if not self.drawing and not self.resizing and not self.moving:  # 不在绘图或调整时才绘制把手
                     self.draw_resize_handles(painter)
 
-            # 绘制所有已保存的图形
-            for shape in self.shapes:
-                painter.setPen(shape.pen)
-                if shape.type == "rectangle":
-                    painter.drawRect(shape.rect)
-                elif shape.type == "ellipse":
-                    painter.drawEllipse(shape.rect)
-                elif shape.type == "line":
-                    painter.drawLine(shape.start_point, shape.end_point)
-                elif shape.type == "arrow":
-                    self.draw_arrow(painter, shape.start_point, shape.end_point, shape.pen)
+            # 绘制所有已保存的图形（缓存层）
+            shapes_layer = self.get_shapes_layer()
+            if shapes_layer is not None and shapes_layer[0].intersects(dirty_rect):
+                painter.drawPixmap(shapes_layer[0].topLeft(), shapes_layer[1])
 
             # 绘制当前正在绘制的图形
             if self.drawing and self.draw_start and self.draw_end:
@@ -855,66 +892,11 @@ class ScreenshotWidget(QWidget):
         painter.drawLine(end_point, QPoint(int(x1), int(y1)))
         painter.drawLine(end_point, QPoint(int(x2), int(y2)))
 
-    def paint_more_screen(self, painter):
-        painter.drawPixmap(0, 0, self.fullscreen_pixmap)  # 背景
-
-        # 半透明遮罩
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 120))
-
-        if self.dragging:
-            # 计算选区矩形
-            rect = QRect(self.start_point, self.end_point).normalized()
-
-            # 从截图中裁剪区域
-            selected_pix = self.fullscreen_pixmap.copy(rect)
-
-            # 绘制选区
-            painter.drawPixmap(rect.topLeft(), selected_pix)
-
-            # 绘制选区边框
-            painter.setPen(QPen(QColor(100, 150, 243), 2))
-            painter.drawRect(rect)
-
-            # 更新尺寸标签
-            self.size_label.setText(f"{rect.width()} x {rect.height()}")
-            self.size_label.move(rect.bottomRight().x() - 50, rect.bottomRight().y() + 10)
-            self.size_label.show()
-        else:
-            self.size_label.hide()
-
-    def paint_one_screen(self, painter):
-        """绘制遮罩层和选区 - 修复模糊问题"""
-        # 获取窗口大小
-        win_size = self.size()
-        # 绘制屏幕截图背景（考虑DPI缩放")
-        scaled_pixmap = self.fullscreen_pixmap.scaled(
-            win_size * self.dpr,
-            Qt.AspectRatioMode.IgnoreAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        painter.drawPixmap(0, 0, win_size.width(), win_size.height(), scaled_pixmap)
-        # 绘制半透明遮罩层
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 120))
-        if self.dragging:
-            # 计算选区矩形
-            rect = QRect(self.start_point, self.end_point).normalized()
-            # 修复：从原始图像中拷贝区域（不缩放）
-            dpr_rect = QRect(
-                rect.topLeft() * self.dpr,
-                rect.size() * self.dpr
-            )
-            selected_pix = self.fullscreen_pixmap.copy(dpr_rect)
-            # 绘制选区
-            painter.drawPixmap(rect.topLeft(), selected_pix)
-            # 绘制选区边框
-            painter.setPen(QPen(QColor(100, 150, 243), 2))
-            painter.drawRect(rect)
-            # 更新尺寸标签
-            self.size_label.setText(f"{rect.width()} x {rect.height()}")
-            self.size_label.move(rect.bottomRight().x() - 50, rect.bottomRight().y() + 10)
-            self.size_label.show()
-        else:
-            self.size_label.hide()
+    def update_size_label(self, rect):
+        """更新尺寸标签"""
+        self.size_label.setText(f"{rect.width()} x {rect.height()}")
+        self.size_label.move(rect.bottomRight().x() - 50, rect.bottomRight().y() + 10)
+        self.size_label.show()
 
     def mousePressEvent(self, event):
         """鼠标按下事件处理"""
@@ -978,8 +960,12 @@ class ScreenshotWidget(QWidget):
 
         if self.drawing and self.is_captured:
             # 绘图模式下，更新结束点
+            old_rect = self.get_shape_bounding_rect(self.current_tool, self.draw_start, self.draw_end,
+                                                    self.current_pen)
             self.draw_end = event.pos()
-            self.update()
+            new_rect = self.get_shape_bounding_rect(self.current_tool, self.draw_start, self.draw_end,
+                                                    self.current_pen)
+            self.update_rect_change(old_rect, new_rect)
             return
 
         if self.resizing and self.screenshot_rect:
@@ -1012,6 +998,7 @@ class ScreenshotWidget(QWidget):
 
             # 确保矩形有效（宽度和高度为正）
             if new_rect.width() > 10 and new_rect.height() > 10:
+                old_rect = self.screenshot_rect
                 self.screenshot_rect = new_rect.normalized()
 
                 # 更新截图内容
@@ -1027,7 +1014,7 @@ class ScreenshotWidget(QWidget):
                 # 重新定位工具栏
                 self.position_toolbar(self.screenshot_rect)
 
-                self.update()
+                self.update_rect_change(old_rect, self.screenshot_rect, self.handle_size)
             return
 
         if self.moving and self.screenshot_rect:
@@ -1043,18 +1030,22 @@ class ScreenshotWidget(QWidget):
             screen_geometry = self.rect()
             if (new_rect.left() >= 0 and new_rect.right() <= screen_geometry.width() and
                     new_rect.top() >= 0 and new_rect.bottom() <= screen_geometry.height()):
+                old_rect = self.screenshot_rect
                 self.screenshot_rect = new_rect
 
                 # 重新定位工具栏
                 self.position_toolbar(self.screenshot_rect)
 
-                self.update()
+                self.update_rect_change(old_rect, self.screenshot_rect, self.handle_size)
             return
 
         if self.dragging:
-            # 使用原始坐标
+            # 使用原始坐标，只重绘新旧选区
+            old_rect = QRect(self.start_point, self.end_point).normalized()
             self.end_point = event.position().toPoint()
-            self.update()
+            new_rect = QRect(self.start_point, self.end_point).normalized()
+            self.update_size_label(new_rect)
+            self.update_rect_change(old_rect, new_rect, 2)
 
     def mouseReleaseEvent(self, event):
         """鼠标释放事件处理"""
@@ -1065,9 +1056,6 @@ class ScreenshotWidget(QWidget):
                 if self.screenshot_rect.contains(event.pos()):
                     self.draw_end = event.pos()
 
-                    # 保存图形前先添加历史记录
-                    self.add_to_history()
-
                     # 保存图形
                     if self.current_tool == "rectangle":
                         rect = QRect(self.draw_start, self.draw_end).normalized()
@@ -1075,7 +1063,7 @@ class ScreenshotWidget(QWidget):
                         rect = rect.intersected(self.screenshot_rect)
                         if rect.width() > 5 and rect.height() > 5:  # 避免太小的矩形
                             shape = Rectangle(rect, self.current_pen)
-                            self.shapes.append(shape)
+                            self.add_shape(shape)
 
                     elif self.current_tool == "ellipse":
                         rect = QRect(self.draw_start, self.draw_end).normalized()
@@ -1083,7 +1071,7 @@ class ScreenshotWidget(QWidget):
                         rect = rect.intersected(self.screenshot_rect)
                         if rect.width() > 5 and rect.height() > 5:  # 避免太小的椭圆
                             shape = Ellipse(rect, self.current_pen)
-                            self.shapes.append(shape)
+                            self.add_shape(shape)
 
                     elif self.current_tool == "line":
                         # 确保线段在截图区域内
@@ -1094,7 +1082,7 @@ class ScreenshotWidget(QWidget):
                                                (self.draw_end.y() - self.draw_start.y()) ** 2)
                             if length > 5:  # 避免太短的线段
                                 shape = Line(self.draw_start, self.draw_end, self.current_pen)
-                                self.shapes.append(shape)
+                                self.add_shape(shape)
 
                     elif self.current_tool == "arrow":
                         # 确保箭头在截图区域内
@@ -1105,7 +1093,7 @@ class ScreenshotWidget(QWidget):
                                                (self.draw_end.y() - self.draw_start.y()) ** 2)
                             if length > 5:  # 避免太短的箭头
                                 shape = Arrow(self.draw_start, self.draw_end, self.current_pen)
-                                self.shapes.append(shape)
+                                self.add_shape(shape)
 
                     # 重置绘图状态，但保持绘图模式激活
                     self.draw_start = QPoint()
@@ -1145,6 +1133,7 @@ class ScreenshotWidget(QWidget):
             # 使用原始坐标
             self.end_point = event.position().toPoint()
             self.dragging = False
+            self.size_label.hide()
 
             # 获取选区矩形
             rect = QRect(self.start_point, self.end_point).normalized()
@@ -1163,6 +1152,7 @@ class ScreenshotWidget(QWidget):
             # 使用原始坐标
             self.end_point = event.position().toPoint()
             self.dragging = False
+            self.size_label.hide()
 
             # 获取选区矩形
             rect = QRect(self.start_point, self.end_point).normalized()
@@ -1186,6 +1176,8 @@ class ScreenshotWidget(QWidget):
         elif event.button() == Qt.MouseButton.RightButton and self.dragging:
             self.end_point = event.position().toPoint()
             self.dragging = False
+            self.size_label.hide()
+            self.update()
 
             rect = QRect(self.start_point, self.end_point).normalized()
             if rect.width() > 10 and rect.height() > 10:
@@ -1204,10 +1196,8 @@ class ScreenshotWidget(QWidget):
         self.size_label.hide()
 
         # 清空历史记录
-        self.undo_stack = []
-        self.redo_stack = []
-        self.undo_btn.setEnabled(False)
-        self.redo_btn.setEnabled(False)
+        self.history.clear()
+        self.update_history_buttons()
 
         # 定位工具栏
         self.position_toolbar(rect)
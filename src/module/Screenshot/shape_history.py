@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+# 默认最多保留的撤销步数
+DEFAULT_MAX_DEPTH = 200
+# 默认撤销历史内存上限（主要是马赛克等位图命令）
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+# 非位图命令的估算内存
+COMMAND_BASE_BYTES = 256
+
+
+class ShapeCommand(ABC):
+    """图形编辑命令，只记录操作本身及其逆操作"""
+
+    @abstractmethod
+    def redo(self, shapes):
+        """执行命令"""
+
+    @abstractmethod
+    def undo(self, shapes):
+        """撤销命令"""
+
+    def memory_bytes(self):
+        """命令占用的估算内存"""
+        return COMMAND_BASE_BYTES
+
+
+class AddShapeCommand(ShapeCommand):
+    """新增图形"""
+
+    def __init__(self, shape, index=None):
+        self.shape = shape
+        self.index = index
+
+    def redo(self, shapes):
+        if self.index is None or self.index >= len(shapes):
+            self.index = len(shapes)
+            shapes.append(self.shape)
+        else:
+            shapes.insert(self.index, self.shape)
+
+    def undo(self, shapes):
+        # 新增的图形通常在末尾，直接弹出
+        if shapes and shapes[-1] is self.shape:
+            shapes.pop()
+        else:
+            shapes.remove(self.shape)
+
+    def memory_bytes(self):
+        return COMMAND_BASE_BYTES + getattr(self.shape, "memory_bytes", 0)
+
+
+class ShapeHistory:
+    """
+    图形编辑历史（命令模式）
+
+    每次编辑只保存一条命令，撤销/重做只执行单条命令的逆操作/正操作。
+    超过最大步数或内存上限时丢弃最早的命令。
+    """
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES):
+        self.max_depth = max_depth
+        self.max_memory_bytes = max_memory_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.memory_bytes = 0
+
+    def push(self, command, shapes=None):
+        """
+        记录命令
+        :param command: 命令
+        :param shapes: 图形列表，传入时先执行命令
+        """
+        if shapes is not None:
+            command.redo(shapes)
+        self.clear_redo()
+        self.undo_stack.append(command)
+        self.memory_bytes += command.memory_bytes()
+        self.trim()
+
+    def undo(self, shapes):
+        if not self.undo_stack:
+            return False
+        command = self.undo_stack.pop()
+        self.memory_bytes -= command.memory_bytes()
+        command.undo(shapes)
+        self.redo_stack.append(command)
+        return True
+
+    def redo(self, shapes):
+        if not self.redo_stack:
+            return False
+        command = self.redo_stack.pop()
+        command.redo(shapes)
+        self.undo_stack.append(command)
+        self.memory_bytes += command.memory_bytes()
+        self.trim()
+        return True
+
+    def can_undo(self):
+        return len(self.undo_stack) > 0
+
+    def can_redo(self):
+        return len(self.redo_stack) > 0
+
+    def clear_redo(self):
+        self.redo_stack = []
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.memory_bytes = 0
+
+    def set_max_depth(self, max_depth):
+        self.max_depth = max_depth
+        self.trim()
+
+    def set_max_memory_bytes(self, max_memory_bytes):
+        self.max_memory_bytes = max_memory_bytes
+        self.trim()
+
+    def trim(self):
+        """超出步数或内存上限时丢弃最早的命令（至少保留最近一条）"""
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_depth
+                                            or self.memory_bytes > self.max_memory_bytes):
+            command = self.undo_stack.popleft()
+            self.memory_bytes -= command.memory_bytes()
@@ -1,4 +1,5 @@
 from src.module.UserData.DataBase import user_data_common
+from src.ui import style_util
 
 
 def init_theme(main_window):
@@ -23,10 +24,14 @@ def load_data(main_window):
     setting_data = main_window.main_data["data"]["SettingCard"][main_window.hardware_id]
     # 主题色
     main_window.form_theme = setting_data["theme"]
+    before_is_dark = main_window.is_dark
     if main_window.form_theme == 'Light':
         main_window.is_dark = False
     else:
         main_window.is_dark = True
+    # 主题变化后旧主题的图标渲染缓存不再使用
+    if before_is_dark != main_window.is_dark:
+        style_util.clear_svg_cache()
     # 主题模式
     main_window.form_theme_mode = setting_data["themeMode"]
     # 透明度
@@ -44,5 +49,7 @@ def change_theme_data(main_window):
     else:
         main_window.form_them = "Dark"
         main_window.is_dark = True
+    # 主题变化后旧主题的图标渲染缓存不再使用
+    style_util.clear_svg_cache()
     setting_data = main_window.main_data["data"]["SettingCard"][main_window.hardware_id]
     setting_data["theme"] = main_window.form_them
@@ -1,11 +1,59 @@
 import math
+from bisect import bisect_left
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
 from PySide6.QtCharts import QChart, QChartView, QSplineSeries, QDateTimeAxis, QValueAxis, QLineSeries
-from PySide6.QtCore import Qt, QDateTime, QPointF
+from PySide6.QtCore import Qt, QDateTime, QPointF, QTimer
 from PySide6.QtGui import QMouseEvent, QPainter, QPen, QFont, QColor
 
 
+# 每个像素保留的点数（降采样目标点数 = 绘图区宽度 * 该值）
+POINTS_PER_PIXEL = 1
+# 降采样的最少点数
+MIN_DOWNSAMPLE_POINTS = 3
+
+
+def largest_triangle_three_buckets(x_values, y_values, threshold):
+    """
+    LTTB降采样：保留首尾点，其余按桶选择与前一个选中点、下一个桶平均点构成最大三角形的点
+    :param x_values: 已排序的x值列表
+    :param y_values: y值列表
+    :param threshold: 目标点数
+    :return: QPointF列表
+    """
+    length = len(x_values)
+    if threshold >= length or threshold < MIN_DOWNSAMPLE_POINTS:
+        return [QPointF(x_values[i], y_values[i]) for i in range(length)]
+
+    sampled = [QPointF(x_values[0], y_values[0])]
+    bucket_size = (length - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, length)
+        next_count = next_end - next_start
+        avg_x = sum(x_values[next_start:next_end]) / next_count
+        avg_y = sum(y_values[next_start:next_end]) / next_count
+
+        # 当前桶中选择三角形面积最大的点
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        point_ax = x_values[a]
+        point_ay = y_values[a]
+        max_area = -1
+        max_index = start
+        for j in range(start, end):
+            area = abs((point_ax - avg_x) * (y_values[j] - point_ay) - (point_ax - x_values[j]) * (avg_y - point_ay))
+            if area > max_area:
+                max_area = area
+                max_index = j
+        sampled.append(QPointF(x_values[max_index], y_values[max_index]))
+        a = max_index
+    sampled.append(QPointF(x_values[-1], y_values[-1]))
+    return sampled
+
+
 class CrosshairChartView(QChartView):
     def __init__(self, chart, parent=None):
         super().__init__(chart, parent)
@@ -14,6 +62,9 @@ class CrosshairChartView(QChartView):
 
         # 存储数据系列
         self.series = None
+        # 完整数据（按x排序），悬停时二分查找
+        self.x_values = []
+        self.y_values = []
 
         # 创建十字线系列
         self.v_line = QLineSeries()
@@ -36,6 +87,11 @@ class CrosshairChartView(QChartView):
         """设置数据系列"""
         self.series = series
 
+    def set_data(self, x_values, y_values):
+        """设置完整数据（x已排序）"""
+        self.x_values = x_values
+        self.y_values = y_values
+
     def ensure_crosshair_added(self):
         """确保十字线已添加到图表并附加到坐标轴"""
         if not self.crosshair_added and self.chart().axes():
@@ -79,21 +135,17 @@ class CrosshairChartView(QChartView):
         super().mouseMoveEvent(event)
 
     def find_closest_point(self, x_val):
-        """查找x值最接近的数据点"""
-        points = self.series.points()
-        if not points:
+        """二分查找x值最接近的数据点"""
+        if not self.x_values:
             return None, float('inf')
 
-        closest_point = None
-        min_x_diff = float('inf')
+        index = bisect_left(self.x_values, x_val)
+        if index >= len(self.x_values):
+            index = len(self.x_values) - 1
+        elif index > 0 and x_val - self.x_values[index - 1] <= self.x_values[index] - x_val:
+            index -= 1
 
-        for point in points:
-            x_diff = abs(point.x() - x_val)
-            if x_diff < min_x_diff:
-                min_x_diff = x_diff
-                closest_point = point
-
-        return closest_point, min_x_diff
+        return QPointF(self.x_values[index], self.y_values[index]), abs(self.x_values[index] - x_val)
 
     def update_crosshair(self, point):
         """更新十字线位置"""
@@ -108,14 +160,10 @@ class CrosshairChartView(QChartView):
         y_max = axis_y.max()
 
         # 更新垂直线 (x固定，y从最小到最大)
-        self.v_line.clear()
-        self.v_line.append(point.x(), y_min)
-        self.v_line.append(point.x(), y_max)
+        self.v_line.replace([QPointF(point.x(), y_min), QPointF(point.x(), y_max)])
 
         # 更新水平线 (y固定，x从最小到最大)
-        self.h_line.clear()
-        self.h_line.append(x_min, point.y())
-        self.h_line.append(x_max, point.y())
+        self.h_line.replace([QPointF(x_min, point.y()), QPointF(x_max, point.y())])
 
     def update_info_label(self, point, mouse_pos):
         """更新信息标签内容和位置"""
@@ -182,6 +230,18 @@ class DateTimeChartWidget(QWidget):
         # 创建图表视图
         self.chart_view = CrosshairChartView(self.chart)
 
+        # 完整数据（按x排序）
+        self.x_values = []
+        self.y_values = []
+        # 降采样结果缓存 {目标点数: QPointF列表}，数据变化时清空
+        self.downsample_cache = {}
+        self.downsample_threshold = 0
+        # 尺寸变化后延迟重新降采样
+        self.resample_timer = QTimer(self)
+        self.resample_timer.setSingleShot(True)
+        self.resample_timer.setInterval(50)
+        self.resample_timer.timeout.connect(self.update_series_points)
+
         # 设置布局
         self.layout.addWidget(self.chart_view)
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -194,21 +254,47 @@ class DateTimeChartWidget(QWidget):
             data: 包含日期和数值的列表，格式为 [(datetime1, value1), (datetime2, value2), ...]
                   其中datetime可以是QDateTime对象或时间戳(毫秒)
         """
-        # 清空现有数据
-        self.series.clear()
-
-        # 添加新数据
+        x_value_list = []
         for dt, value in data:
             if isinstance(dt, QDateTime):
                 x_value = dt.toMSecsSinceEpoch()
             else:
                 x_value = dt  # 假设已经是时间戳
-
-            self.series.append(x_value, value)
+            x_value_list.append((x_value, value))
+        # 按时间排序，便于二分查找和降采样
+        x_value_list.sort(key=lambda item: item[0])
+        self.x_values = [item[0] for item in x_value_list]
+        self.y_values = [item[1] for item in x_value_list]
+        self.downsample_cache = {}
+        self.downsample_threshold = 0
 
         # 更新图表
         self.update_chart()
 
+    def get_downsample_threshold(self):
+        """根据绘图区的像素宽度计算目标点数"""
+        width = self.chart.plotArea().width()
+        if width <= 0:
+            width = self.chart_view.width()
+        return max(MIN_DOWNSAMPLE_POINTS, int(width * POINTS_PER_PIXEL))
+
+    def update_series_points(self):
+        """按当前宽度把降采样后的数据一次性设置到系列中"""
+        threshold = self.get_downsample_threshold()
+        if threshold == self.downsample_threshold:
+            return
+        self.downsample_threshold = threshold
+        points = self.downsample_cache.get(threshold)
+        if points is None:
+            points = largest_triangle_three_buckets(self.x_values, self.y_values, threshold)
+            self.downsample_cache[threshold] = points
+        self.series.replace(points)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.x_values:
+            self.resample_timer.start()
+
     def update_chart(self):
         """更新图表显示"""
         # 移除现有系列
@@ -219,26 +305,27 @@ class DateTimeChartWidget(QWidget):
         for axis in self.chart.axes():
             self.chart.removeAxis(axis)
 
-        # 添加数据系列
+        # 添加降采样后的数据系列
+        self.update_series_points()
         self.chart.addSeries(self.series)
 
-        # 获取数据点
-        points = self.series.points()
-        if not points:
+        if not self.x_values:
+            # 清空悬停查找用的数据，避免继续显示旧数据的提示
+            self.chart_view.set_data(self.x_values, self.y_values)
+            self.chart_view.info_label.hide()
+            self.chart_view.crosshair_added = False
             return
 
-        # 计算日期范围
-        x_values = [point.x() for point in points]
-        min_x = min(x_values)
-        max_x = max(x_values)
+        # 计算日期范围（数据已排序）
+        min_x = self.x_values[0]
+        max_x = self.x_values[-1]
 
         min_date = QDateTime.fromMSecsSinceEpoch(int(min_x))
         max_date = QDateTime.fromMSecsSinceEpoch(int(max_x))
 
         # 计算数值范围
-        y_values = [point.y() for point in points]
-        y_min = min(y_values)
-        y_max = max(y_values)
+        y_min = min(self.y_values)
+        y_max = max(self.y_values)
 
         # 添加填充
         x_padding = (max_x - min_x) * 0.05  # 5%的填充
@@ -274,6 +361,7 @@ class DateTimeChartWidget(QWidget):
 
         # 设置十字线视图的数据系列
         self.chart_view.set_series(self.series)
+        self.chart_view.set_data(self.x_values, self.y_values)
         # 重置十字线添加状态，确保下次鼠标移动时会重新添加
         self.chart_view.crosshair_added = False
 
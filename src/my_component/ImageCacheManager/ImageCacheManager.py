@@ -1,12 +1,44 @@
 import os
+import hashlib
+from collections import OrderedDict
 from PySide6.QtGui import QPixmap
 from PySide6.QtCore import QDir
 
+from src.thread_list.image_decode_thread import get_image_decode_service
+
+
+# 内存缓存默认上限（字节）
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+# 磁盘缓存默认上限（字节）
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+# 网络图片磁盘缓存子目录
+URL_CACHE_DIR_NAME = "url_cache"
+
+
+def get_pixmap_bytes(pixmap):
+    """估算QPixmap占用的内存（宽 × 高 × 位深）"""
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
 
 class ImageCacheManager:
-    def __init__(self, image_path=None):
-        self.cache = {}  # 图片缓存字典 {image_name: QPixmap}
+    def __init__(self, image_path=None, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.cache = OrderedDict()  # 图片缓存字典(LRU) {image_name: QPixmap}
+        self.cache_bytes = {}  # 缓存图片占用字节数 {image_name: bytes}
+        self.memory_bytes = 0  # 内存缓存当前占用
+        self.max_memory_bytes = max_memory_bytes  # 内存缓存上限
+        self.max_disk_bytes = max_disk_bytes  # 磁盘缓存上限
+        self.disk_index = None  # 磁盘缓存索引(LRU) {文件路径: 字节数}，首次使用时扫描
+        self.disk_bytes = 0  # 磁盘缓存当前占用
         self.base_dir = image_path  # 图片基础目录
+        self.stats = {
+            "memory_hit": 0,
+            "memory_miss": 0,
+            "disk_hit": 0,
+            "disk_miss": 0,
+            "memory_evict": 0,
+            "disk_evict": 0,
+        }
 
     def get_pixmap(self, image_name):
         """
@@ -15,8 +47,9 @@ class ImageCacheManager:
         :return: QPixmap对象或None
         """
         # 检查缓存
-        if image_name in self.cache:
-            return self.cache[image_name]
+        pixmap = self._get_memory(image_name)
+        if pixmap is not None:
+            return pixmap
 
         # 构建完整路径
         full_path = os.path.join(self.base_dir, image_name)
@@ -33,7 +66,7 @@ class ImageCacheManager:
             return None
 
         # 存入缓存
-        self.cache[image_name] = pixmap
+        self._put_memory(image_name, pixmap)
         return pixmap
 
     def save_pixmap(self, image_name, pixmap, format="PNG"):
@@ -48,7 +81,7 @@ class ImageCacheManager:
             return False
 
         # 更新缓存
-        self.cache[image_name] = pixmap
+        self._put_memory(image_name, pixmap)
 
         # 构建完整路径
         full_path = os.path.join(self.base_dir, image_name)
@@ -73,8 +106,32 @@ class ImageCacheManager:
         """
         if url is None or not url.startswith("http"):
             return None
-        image_name = os.path.basename(url)
-        return self.get_pixmap(image_name)
+        # 内存缓存以完整url为键
+        pixmap = self._get_memory(url)
+        if pixmap is not None:
+            return pixmap
+        # 磁盘缓存以url哈希为键
+        full_path = self._get_url_cache_path(url)
+        self._load_disk_index()
+        if full_path not in self.disk_index or not os.path.exists(full_path):
+            self._remove_disk_entry(full_path)
+            self.stats["disk_miss"] += 1
+            return None
+        pixmap = QPixmap()
+        if not pixmap.load(full_path):
+            print(f"Failed to load image: {full_path}")
+            self._remove_disk_entry(full_path)
+            self.stats["disk_miss"] += 1
+            return None
+        self.stats["disk_hit"] += 1
+        # 更新最近使用
+        self.disk_index.move_to_end(full_path)
+        try:
+            os.utime(full_path)
+        except OSError:
+            pass
+        self._put_memory(url, pixmap)
+        return pixmap
 
     def save_pixmap_by_url(self, url, pixmap):
         """
@@ -82,17 +139,248 @@ class ImageCacheManager:
         :param url: 网络名称
         :param pixmap: 要保存的QPixmap对象
         """
-        if not url.startswith("http"):
+        if url is None or not url.startswith("http"):
+            return False
+        if pixmap.isNull():
+            print("Cannot save null pixmap")
+            return False
+        # 更新缓存
+        self._put_memory(url, pixmap)
+        # 保存到磁盘缓存
+        full_path = self._get_url_cache_path(url)
+        if not QDir().mkpath(os.path.dirname(full_path)):
+            print(f"Failed to create directory: {os.path.dirname(full_path)}")
+            return False
+        _, ext = os.path.splitext(full_path)
+        if not pixmap.save(full_path, ext[1:].upper()):
+            print(f"Failed to save image: {full_path}")
+            return False
+        self._load_disk_index()
+        self._remove_disk_entry(full_path)
+        file_size = os.path.getsize(full_path)
+        self.disk_index[full_path] = file_size
+        self.disk_bytes += file_size
+        self._evict_disk()
+        return True
+
+    def peek_pixmap_by_url(self, url, target_size=None):
+        """
+        仅从内存缓存获取url对应的图片（不访问磁盘）
+        :param url: 网络名称
+        :param target_size: 目标尺寸（物理像素），需与加载时一致
+        :return: QPixmap对象或None
+        """
+        if url is None or not url.startswith("http"):
+            return None
+        return self._get_memory(self._get_memory_key(url, target_size))
+
+    def get_pixmap_by_url_async(self, url, callback, target_size=None, device_pixel_ratio=1.0, key=None):
+        """
+        根据url异步获取图片（磁盘缓存在工作线程中解码并缩放到目标尺寸）
+        :param url: 网络名称
+        :param callback: 回调，参数为QPixmap，未命中时为None
+        :param target_size: 目标尺寸（物理像素），为空时按原尺寸
+        :param device_pixel_ratio: 结果图片的设备像素比
+        :param key: 解码请求分组，同一key的新请求会取消旧请求
+        :return: 解码请求id，内存命中或未命中时为None
+        """
+        if url is None or not url.startswith("http"):
+            callback(None)
+            return None
+        memory_key = self._get_memory_key(url, target_size)
+        pixmap = self._get_memory(memory_key)
+        if pixmap is not None:
+            callback(pixmap)
+            return None
+        full_path = self._get_url_cache_path(url)
+        self._load_disk_index()
+        if full_path not in self.disk_index or not os.path.exists(full_path):
+            self._remove_disk_entry(full_path)
+            self.stats["disk_miss"] += 1
+            callback(None)
+            return None
+        self.stats["disk_hit"] += 1
+        self.disk_index.move_to_end(full_path)
+        try:
+            os.utime(full_path)
+        except OSError:
+            pass
+
+        def on_decoded(decoded_pixmap):
+            if decoded_pixmap is not None:
+                self._put_memory(memory_key, decoded_pixmap)
+            else:
+                # 缓存文件已损坏，移除后按未命中处理
+                print(f"Failed to load image: {full_path}")
+                self._remove_disk_entry(full_path)
+                try:
+                    os.remove(full_path)
+                except OSError:
+                    pass
+            callback(decoded_pixmap)
+
+        return get_image_decode_service().decode(full_path, on_decoded, target_size=target_size, key=key,
+                                                 device_pixel_ratio=device_pixel_ratio)
+
+    def decode_data_by_url_async(self, url, data, callback, target_size=None, device_pixel_ratio=1.0, key=None):
+        """
+        保存网络图片的原始数据到磁盘缓存，并在工作线程中解码
+        :param url: 网络名称
+        :param data: 下载得到的图片数据(bytes/QByteArray)
+        :param callback: 回调，参数为QPixmap，解码失败时为None
+        :param target_size: 目标尺寸（物理像素），为空时按原尺寸
+        :param device_pixel_ratio: 结果图片的设备像素比
+        :param key: 解码请求分组，同一key的新请求会取消旧请求
+        :return: 解码请求id
+        """
+        if not isinstance(data, bytes):
+            data = data.data()
+        memory_key = self._get_memory_key(url, target_size)
+
+        def on_decoded(decoded_pixmap):
+            if decoded_pixmap is not None:
+                self._put_memory(memory_key, decoded_pixmap)
+                # 解码成功才写入磁盘，原始数据直接落盘，避免重新编码
+                self.save_data_by_url(url, data)
+            callback(decoded_pixmap)
+
+        return get_image_decode_service().decode(data, on_decoded, target_size=target_size, key=key,
+                                                 device_pixel_ratio=device_pixel_ratio)
+
+    def save_data_by_url(self, url, data):
+        """
+        根据url将图片原始数据写入磁盘缓存
+        :param url: 网络名称
+        :param data: 图片数据(bytes)
+        """
+        if url is None or not url.startswith("http") or not data:
             return False
-        image_name = os.path.basename(url)
-        _, ext = os.path.splitext(image_name)
-        format = ext[1:].upper() if ext else "PNG"
-        return self.save_pixmap(image_name, pixmap, format)
+        full_path = self._get_url_cache_path(url)
+        if not QDir().mkpath(os.path.dirname(full_path)):
+            print(f"Failed to create directory: {os.path.dirname(full_path)}")
+            return False
+        try:
+            with open(full_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Failed to save image: {full_path}, {e}")
+            return False
+        self._load_disk_index()
+        self._remove_disk_entry(full_path)
+        self.disk_index[full_path] = len(data)
+        self.disk_bytes += len(data)
+        self._evict_disk()
+        return True
 
     def clear_cache(self):
         """清空图片缓存"""
         self.cache.clear()
+        self.cache_bytes.clear()
+        self.memory_bytes = 0
 
     def set_base_dir(self, path):
         """设置图片基础目录"""
         self.base_dir = path
+        self.disk_index = None
+        self.disk_bytes = 0
+
+    def set_max_memory_bytes(self, max_memory_bytes):
+        """设置内存缓存上限"""
+        self.max_memory_bytes = max_memory_bytes
+        self._evict_memory()
+
+    def set_max_disk_bytes(self, max_disk_bytes):
+        """设置磁盘缓存上限"""
+        self.max_disk_bytes = max_disk_bytes
+        self._load_disk_index()
+        self._evict_disk()
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        stats = dict(self.stats)
+        stats["memory_count"] = len(self.cache)
+        stats["memory_bytes"] = self.memory_bytes
+        stats["disk_count"] = len(self.disk_index) if self.disk_index is not None else 0
+        stats["disk_bytes"] = self.disk_bytes
+        return stats
+
+    def _get_memory(self, key):
+        """从内存缓存获取并更新最近使用"""
+        pixmap = self.cache.get(key)
+        if pixmap is None:
+            self.stats["memory_miss"] += 1
+            return None
+        self.stats["memory_hit"] += 1
+        self.cache.move_to_end(key)
+        return pixmap
+
+    def _put_memory(self, key, pixmap):
+        """写入内存缓存，超过上限时淘汰最久未使用的图片"""
+        if key in self.cache:
+            self.memory_bytes -= self.cache_bytes.pop(key)
+            del self.cache[key]
+        size = get_pixmap_bytes(pixmap)
+        # 单张超过上限的图片不进入内存缓存
+        if size > self.max_memory_bytes:
+            return
+        self.cache[key] = pixmap
+        self.cache_bytes[key] = size
+        self.memory_bytes += size
+        self._evict_memory()
+
+    def _evict_memory(self):
+        while self.cache and self.memory_bytes > self.max_memory_bytes:
+            key, _ = self.cache.popitem(last=False)
+            self.memory_bytes -= self.cache_bytes.pop(key)
+            self.stats["memory_evict"] += 1
+
+    @staticmethod
+    def _get_memory_key(url, target_size):
+        """内存缓存键，按目标尺寸区分同一url的不同缩放结果"""
+        if target_size is None:
+            return url
+        return f"{url}@{target_size.width()}x{target_size.height()}"
+
+    def _get_url_cache_path(self, url):
+        """根据url哈希计算磁盘缓存路径（url_cache/哈希前两位/哈希.扩展名）"""
+        url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        _, ext = os.path.splitext(url.split("?")[0].split("#")[0])
+        ext = ext.lower() if ext.lower() in (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".gif") else ".png"
+        # gif无法通过QPixmap保存，统一存为png
+        if ext == ".gif":
+            ext = ".png"
+        return os.path.join(self.base_dir, URL_CACHE_DIR_NAME, url_hash[:2], url_hash + ext)
+
+    def _load_disk_index(self):
+        """首次使用时扫描磁盘缓存目录，按修改时间建立LRU索引"""
+        if self.disk_index is not None:
+            return
+        entry_list = []
+        cache_dir = os.path.join(self.base_dir, URL_CACHE_DIR_NAME)
+        if os.path.isdir(cache_dir):
+            for sub_dir in os.scandir(cache_dir):
+                if not sub_dir.is_dir():
+                    continue
+                for entry in os.scandir(sub_dir.path):
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entry_list.append((stat.st_mtime, entry.path, stat.st_size))
+        entry_list.sort()
+        self.disk_index = OrderedDict((path, size) for _, path, size in entry_list)
+        self.disk_bytes = sum(self.disk_index.values())
+        self._evict_disk()
+
+    def _remove_disk_entry(self, full_path):
+        size = self.disk_index.pop(full_path, None)
+        if size is not None:
+            self.disk_bytes -= size
+
+    def _evict_disk(self):
+        while self.disk_index and self.disk_bytes > self.max_disk_bytes:
+            full_path, size = self.disk_index.popitem(last=False)
+            self.disk_bytes -= size
+            self.stats["disk_evict"] += 1
+            try:
+                os.remove(full_path)
+            except OSError:
+                pass
@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 
+from PIL import Image, ImageFilter
 from PySide6 import QtWidgets, QtCore, QtGui
 
 
@@ -34,6 +35,8 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
         self._max_y_offset = 0
         self._border = 0
         self._smooth = smooth
+        # (key, outside_shadow, inside_shadow), rebuilt only when geometry or style changes
+        self._shadow_cache = None
         self.setShadowList(shadow_list)
         self.setBorder(border)
 
@@ -43,12 +46,35 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
         self._shadow_list = shadow_list
 
         self._set_max_offset()
+        self.invalidateShadowCache()
 
     def setBorder(self, border: int):
         if border > 0:
             self._border = border
         else:
             self._border = 0
+        self.invalidateShadowCache()
+
+    def invalidateShadowCache(self):
+        """Drop the cached shadows, e.g. when the source silhouette changes without a resize"""
+        self._shadow_cache = None
+        self.update()
+
+    def sourceChanged(self, flags):
+        # Content repaints (SourceInvalidated) keep the cached shadows
+        if flags & (QtWidgets.QGraphicsEffect.ChangeFlag.SourceBoundingRectChanged |
+                    QtWidgets.QGraphicsEffect.ChangeFlag.SourceAttached |
+                    QtWidgets.QGraphicsEffect.ChangeFlag.SourceDetached):
+            self._shadow_cache = None
+        QtWidgets.QGraphicsEffect.sourceChanged(self, flags)
+
+    def _shadow_cache_key(self, source):
+        style = tuple(("outside" in shadow, "inside" in shadow,
+                       tuple(shadow["offset"]), shadow["blur"],
+                       QtGui.QColor(shadow["color"]).rgba())
+                      for shadow in self._shadow_list)
+        return (source.width(), source.height(), source.devicePixelRatio(),
+                self._border, self._smooth, style)
 
     def necessary_indentation(self):
         return self._max_x_offset, self._max_y_offset
@@ -71,28 +97,23 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
     @staticmethod
     def _blur_pixmap(src, blur_radius):
+        """Gaussian blur through Pillow (separable extended box blur)"""
         w, h = src.width(), src.height()
-
-        effect = QtWidgets.QGraphicsBlurEffect(blurRadius=blur_radius)
-
-        scene = QtWidgets.QGraphicsScene()
-        item = QtWidgets.QGraphicsPixmapItem()
-        item.setPixmap(QtGui.QPixmap(src))
-        item.setGraphicsEffect(effect)
-        scene.addItem(item)
-
-        res = QtGui.QImage(QtCore.QSize(w, h),
-                           QtGui.QImage.Format.Format_ARGB32)
-        res.fill(QtCore.Qt.GlobalColor.transparent)
-
-        ptr = QtGui.QPainter(res)
-        ptr.setRenderHints(
-                QtGui.QPainter.RenderHint.Antialiasing |
-                QtGui.QPainter.RenderHint.SmoothPixmapTransform)
-        scene.render(ptr, QtCore.QRectF(), QtCore.QRectF(0, 0, w, h))
-        ptr.end()
-
-        return QtGui.QPixmap(res)
+        if blur_radius <= 0 or w == 0 or h == 0:
+            return QtGui.QPixmap(src)
+
+        image = src.toImage().convertToFormat(
+                QtGui.QImage.Format.Format_RGBA8888_Premultiplied)
+        # Blur premultiplied pixels so transparent edges do not darken
+        pil_image = Image.frombuffer("RGBa", (w, h), bytes(image.constBits()),
+                                     "raw", "RGBa", image.bytesPerLine(), 1)
+        # QGraphicsBlurEffect's radius is roughly two standard deviations
+        pil_image = pil_image.filter(ImageFilter.GaussianBlur(blur_radius / 2))
+
+        res = QtGui.QImage(pil_image.tobytes("raw", "RGBa"), w, h, w * 4,
+                           QtGui.QImage.Format.Format_RGBA8888_Premultiplied)
+        # Detach from the Python buffer before it is released
+        return QtGui.QPixmap.fromImage(res.copy())
 
     @staticmethod
     def _colored_pixmap(color: QtGui.QColor, pixmap: QtGui.QPixmap):
@@ -124,13 +145,7 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
         painter.end()
         return pixmap
 
-    def _outside_shadow(self):
-
-        source = self.sourcePixmap(
-                QtCore.Qt.CoordinateSystem.DeviceCoordinates)
-
-        if isinstance(source, tuple):
-            source = source[0]
+    def _outside_shadow(self, source):
 
         mask = source.createMaskFromColor(
                 QtGui.QColor(0, 0, 0, 0), QtCore.Qt.MaskMode.MaskInColor)
@@ -169,12 +184,6 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         outside_shadow_painter.end()
 
-        source = self.sourcePixmap(
-                QtCore.Qt.CoordinateSystem.DeviceCoordinates)
-
-        if isinstance(source, tuple):
-            source = source[0]
-
         mask = source.createMaskFromColor(
                 QtGui.QColor(0, 0, 0, 0), QtCore.Qt.MaskMode.MaskOutColor)
 
@@ -182,13 +191,7 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         return outside_shadow
 
-    def _inside_shadow(self):
-
-        source = self.sourcePixmap(
-                QtCore.Qt.CoordinateSystem.DeviceCoordinates)
-
-        if isinstance(source, tuple):
-            source = source[0]
+    def _inside_shadow(self, source):
 
         mask = source.createMaskFromColor(
                 QtGui.QColor(0, 0, 0, 0), QtCore.Qt.MaskMode.MaskInColor)
@@ -249,16 +252,7 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         return inside_shadow
 
-    def _smooth_outside_shadow(self):
-        source = self.sourcePixmap(
-                QtCore.Qt.CoordinateSystem.DeviceCoordinates)
-
-        if isinstance(source, tuple):
-            source = source[0]
-
-        if isinstance(source, tuple):
-            source = source[0]
-
+    def _smooth_outside_shadow(self, source):
         w, h = source.width(), source.height()
 
         _pixmap_shadow_list = []
@@ -310,13 +304,7 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         return outside_shadow
 
-    def _smooth_inside_shadow(self):
-
-        source = self.sourcePixmap(
-                QtCore.Qt.CoordinateSystem.DeviceCoordinates)
-
-        if isinstance(source, tuple):
-            source = source[0]
+    def _smooth_inside_shadow(self, source):
 
         w, h = source.width(), source.height()
 
@@ -370,6 +358,21 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         return inside_shadow
 
+    def _get_shadows(self, source):
+        key = self._shadow_cache_key(source)
+        if self._shadow_cache is not None and self._shadow_cache[0] == key:
+            return self._shadow_cache[1], self._shadow_cache[2]
+
+        if self._smooth:
+            outside_shadow = self._smooth_outside_shadow(source)
+            inside_shadow = self._smooth_inside_shadow(source)
+        else:
+            outside_shadow = self._outside_shadow(source)
+            inside_shadow = self._inside_shadow(source)
+
+        self._shadow_cache = (key, outside_shadow, inside_shadow)
+        return outside_shadow, inside_shadow
+
     def draw(self, painter):
 
         painter.setRenderHints(
@@ -390,12 +393,7 @@ class BoxShadow(QtWidgets.QGraphicsEffect):
 
         painter.setTransform(QtGui.QTransform())
 
-        if self._smooth:
-            outside_shadow = self._smooth_outside_shadow()
-            inside_shadow = self._smooth_inside_shadow()
-        else:
-            outside_shadow = self._outside_shadow()
-            inside_shadow = self._inside_shadow()
+        outside_shadow, inside_shadow = self._get_shadows(source)
 
         painter.setPen(QtCore.Qt.PenStyle.NoPen)
 
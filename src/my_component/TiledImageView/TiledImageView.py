@@ -0,0 +1,226 @@
+import math
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QRect, QRectF, QSize, QTimer, QThreadPool
+from PySide6.QtGui import QPainter, QPixmap, QImage
+from PySide6.QtWidgets import QWidget
+
+from src.thread_list.image_pyramid_thread import ImagePyramidTask, ImagePyramidSignals, PYRAMID_MIN_SIDE
+
+
+# 瓦片边长（层级图片中的像素）
+TILE_SIZE = 512
+# 瓦片缓存上限
+DEFAULT_MAX_TILE_CACHE_BYTES = 128 * 1024 * 1024
+# 所需层级还没生成时，用更精细的层级代替，但最多绘制的瓦片数
+MAX_FALLBACK_TILES = 16
+# 缩放停止后多久进行精细绘制（毫秒）
+REFINE_DELAY = 150
+# 金字塔生成前使用的快速预览图的最大边长
+PREVIEW_MAX_SIDE = 2048
+
+
+class TiledImageView(QWidget):
+    """
+    分块多分辨率图片视图
+
+    控件尺寸 = 原图尺寸 * 缩放比例，放在滚动区域中使用。
+    后台线程按需生成图片金字塔，绘制时只绘制可见区域内、最接近当前缩放比例的层级的瓦片。
+    缩放过程中使用快速绘制（可用较粗的层级），停止缩放后再平滑绘制。
+    """
+
+    def __init__(self, parent=None, max_tile_cache_bytes=DEFAULT_MAX_TILE_CACHE_BYTES):
+        super().__init__(parent)
+        self.level_list = []  # 层级图片，下标n为原图的 1/2^n，未生成的为None
+        self.scale_factor = 1.0
+        self.pyramid_task = None
+        self.pyramid_task_id = 0
+        self.pyramid_requested = False
+        # 信号对象同时被任务引用，保证控件销毁后工作线程仍可安全发射
+        self.pyramid_signals = ImagePyramidSignals()
+        self.pyramid_signals.level_ready.connect(self.on_level_ready)
+        self.pyramid_signals.finished.connect(self.on_pyramid_finished)
+        # 瓦片缓存(LRU) {(层级, 列, 行): QPixmap}
+        self.tile_cache = OrderedDict()
+        self.tile_cache_bytes = 0
+        self.max_tile_cache_bytes = max_tile_cache_bytes
+        # 原图的快速预览（所需层级还没生成且瓦片太多时绘制）
+        self.preview_pixmap = None
+        # 是否正在缩放（缩放中快速绘制）
+        self.interacting = False
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(REFINE_DELAY)
+        self.refine_timer.timeout.connect(self.refine)
+
+    def set_image(self, image):
+        """设置图片（QImage，传入QPixmap时需要在GUI线程转换一次，大图应直接传入解码得到的QImage）"""
+        if isinstance(image, QPixmap):
+            image = image.toImage()
+        self.cancel_pyramid()
+        self.clear_tile_cache()
+        self.preview_pixmap = None
+        self.level_list = [image] if image is not None and not image.isNull() else []
+        self.pyramid_requested = False
+        self.update_size()
+        self.update()
+
+    def has_image(self):
+        return len(self.level_list) > 0
+
+    def image(self):
+        """原图"""
+        return self.level_list[0] if self.level_list else QImage()
+
+    def image_size(self):
+        return self.level_list[0].size() if self.level_list else QSize()
+
+    def set_scale_factor(self, scale_factor, interacting=True):
+        """
+        设置缩放比例
+        :param interacting: 是否处于连续缩放中（先快速绘制，停止后再精细绘制）
+        """
+        self.scale_factor = scale_factor
+        if interacting:
+            self.interacting = True
+            self.refine_timer.start()
+        self.update_size()
+        self.update()
+
+    def update_size(self):
+        if not self.level_list:
+            return
+        size = self.image_size()
+        self.setFixedSize(max(1, round(size.width() * self.scale_factor)),
+                          max(1, round(size.height() * self.scale_factor)))
+
+    def refine(self):
+        self.interacting = False
+        self.update()
+
+    def get_level(self):
+        """选择绘制使用的层级，返回 (层级, 是否为替代层级)"""
+        device_scale = self.scale_factor * self.devicePixelRatioF()
+        needed_level = 0
+        if device_scale < 1:
+            needed_level = int(math.floor(math.log2(1 / device_scale)))
+        if self.interacting:
+            # 缩放过程中允许更粗一级，减少绘制量
+            needed_level += 1
+        if needed_level > 0:
+            self.ensure_pyramid()
+        needed_level = min(needed_level, self.get_max_level())
+        # 使用不粗于所需层级的、已生成的最接近层级
+        for level in range(needed_level, -1, -1):
+            if level < len(self.level_list) and self.level_list[level] is not None:
+                return level, level != needed_level
+        return 0, needed_level != 0
+
+    def get_max_level(self):
+        """按金字塔最小尺寸计算的最大层级"""
+        size = self.image_size()
+        side = max(size.width(), size.height())
+        level = 0
+        while side // 2 >= PYRAMID_MIN_SIDE:
+            side //= 2
+            level += 1
+        return level
+
+    def ensure_pyramid(self):
+        """首次需要缩小层级时在后台生成金字塔"""
+        if self.pyramid_requested or not self.level_list:
+            return
+        self.pyramid_requested = True
+        self.pyramid_task_id += 1
+        self.pyramid_task = ImagePyramidTask(self.pyramid_signals, self.pyramid_task_id, self.level_list[0])
+        QThreadPool.globalInstance().start(self.pyramid_task)
+
+    def cancel_pyramid(self):
+        if self.pyramid_task is not None:
+            self.pyramid_task.cancel()
+            self.pyramid_task = None
+        # 丢弃旧任务的结果
+        self.pyramid_task_id += 1
+
+    def on_level_ready(self, task_id, level, image):
+        if task_id != self.pyramid_task_id:
+            return
+        while len(self.level_list) <= level:
+            self.level_list.append(None)
+        self.level_list[level] = image
+        self.update()
+
+    def on_pyramid_finished(self, task_id):
+        if task_id == self.pyramid_task_id:
+            self.pyramid_task = None
+
+    def get_tile(self, level, column, row):
+        """获取瓦片（从层级图片中裁剪，LRU缓存）"""
+        key = (level, column, row)
+        pixmap = self.tile_cache.get(key)
+        if pixmap is not None:
+            self.tile_cache.move_to_end(key)
+            return pixmap
+        image = self.level_list[level]
+        tile_rect = QRect(column * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(image.rect())
+        pixmap = QPixmap.fromImage(image.copy(tile_rect))
+        self.tile_cache[key] = pixmap
+        self.tile_cache_bytes += pixmap.width() * pixmap.height() * 4
+        while self.tile_cache_bytes > self.max_tile_cache_bytes and len(self.tile_cache) > 1:
+            _, old_pixmap = self.tile_cache.popitem(last=False)
+            self.tile_cache_bytes -= old_pixmap.width() * old_pixmap.height() * 4
+        return pixmap
+
+    def get_preview(self):
+        """原图的快速预览（最近邻缩放，只计算一次）"""
+        if self.preview_pixmap is None:
+            image = self.level_list[0]
+            if max(image.width(), image.height()) > PREVIEW_MAX_SIDE:
+                image = image.scaled(PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE, Qt.AspectRatioMode.KeepAspectRatio,
+                                     Qt.TransformationMode.FastTransformation)
+            self.preview_pixmap = QPixmap.fromImage(image)
+        return self.preview_pixmap
+
+    def clear_tile_cache(self):
+        self.tile_cache.clear()
+        self.tile_cache_bytes = 0
+
+    def paintEvent(self, event):
+        if not self.level_list:
+            return
+        level, is_fallback = self.get_level()
+        image = self.level_list[level]
+        # 层级图片像素 -> 控件坐标 的比例
+        ratio = self.width() / image.width()
+        dirty_rect = event.rect()
+        # 可见区域对应的瓦片范围
+        first_column = max(0, int(dirty_rect.left() / ratio) // TILE_SIZE)
+        last_column = min((image.width() - 1) // TILE_SIZE, int(dirty_rect.right() / ratio) // TILE_SIZE)
+        first_row = max(0, int(dirty_rect.top() / ratio) // TILE_SIZE)
+        last_row = min((image.height() - 1) // TILE_SIZE, int(dirty_rect.bottom() / ratio) // TILE_SIZE)
+        tile_count = (last_column - first_column + 1) * (last_row - first_row + 1)
+        if is_fallback and tile_count > MAX_FALLBACK_TILES:
+            # 先绘制原图的快速预览，所需层级生成后会重新绘制
+            preview = self.get_preview()
+            painter = QPainter(self)
+            painter.drawPixmap(QRectF(self.rect()), preview, QRectF(preview.rect()))
+            painter.end()
+            return
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, not self.interacting)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                tile = self.get_tile(level, column, row)
+                target_rect = QRectF(column * TILE_SIZE * ratio, row * TILE_SIZE * ratio,
+                                     tile.width() * ratio, tile.height() * ratio)
+                painter.drawPixmap(target_rect, tile, QRectF(tile.rect()))
+        painter.end()
+
+    def release(self):
+        """释放图片和缓存（窗口关闭时调用）"""
+        self.cancel_pyramid()
+        self.refine_timer.stop()
+        self.clear_tile_cache()
+        self.preview_pixmap = None
+        self.level_list = []
@@ -5,29 +5,16 @@ from ctypes import wintypes
 import datetime
 import subprocess
 import psutil
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QThread, Signal, QMutex, QMutexLocker, QWaitCondition
+from src.thread_list.file_search_backend import FileSearchBackend, FileSearchResult, BACKEND_EVERYTHING, \
+    BACKEND_INDEX, BACKEND_AUTO, build_name_matcher, is_query_refinement
+from src.thread_list.file_index_searcher import FileIndexSearcher
 
 
-class EverythingResult:
-    """Everything搜索结果类"""
-
-    def __init__(self, size, date_modified, filename, path):
-        self.size = size
-        self.date_modified = date_modified
-        self.filename = filename
-        self.path = path
-
-    @property
-    def is_folder(self):
-        return self.size < 0
-
-    def __str__(self):
-        size_str = "(文件夹)" if self.is_folder else f"{self.size} B"
-        return f"{self.filename} ({size_str}) - {self.date_modified:%Y-%m-%d %H:%M:%S}"
-
-
-class EverythingSearcher:
+class EverythingSearcher(FileSearchBackend):
     """Everything搜索器"""
+    backend = BACKEND_EVERYTHING
+
     # API常量
     EVERYTHING_OK = 0
     EVERYTHING_ERROR_MEMORY = 1
@@ -84,14 +71,27 @@ class EverythingSearcher:
     EVERYTHING_SORT_DATE_RUN_ASCENDING = 25
     EVERYTHING_SORT_DATE_RUN_DESCENDING = 26
 
+    # 进程检查需要遍历所有进程，间隔一段时间才重新检查（秒）
+    LIVENESS_CHECK_INTERVAL = 30
+    # 路径缓冲区长度（字符数，支持长路径）
+    PATH_BUFFER_LENGTH = 32768
+    # Windows文件时间的起点
+    FILETIME_EPOCH = datetime.datetime(1601, 1, 1)
+
     def __init__(self, everything_path=None, db_path=None, config_path=None):
         self.everything_path = everything_path
         self.db_path = db_path
         self.config_path = config_path
         self.dll = None
+        self.last_liveness_check = 0
+        # 获取结果时复用的缓冲区
+        self.path_buffer = ctypes.create_unicode_buffer(self.PATH_BUFFER_LENGTH)
+        self.date_modified_buffer = ctypes.c_longlong()
+        self.size_buffer = ctypes.c_longlong()
         self._load_dll()
         self._setup_function_prototypes()
         self._ensure_everything_running()
+        self.last_liveness_check = time.time()
 
     def _find_everything_path(self):
         """查找Everything安装路径"""
@@ -304,8 +304,10 @@ class EverythingSearcher:
 
     def search(self, query, offset=0, max_results=100):
         """执行搜索"""
-        # 确保Everything正在运行
-        self._ensure_everything_running()
+        # 确保Everything正在运行（查询失败时会立即重新检查）
+        if time.time() - self.last_liveness_check > self.LIVENESS_CHECK_INTERVAL:
+            self._ensure_everything_running()
+            self.last_liveness_check = time.time()
 
         # 设置搜索查询
         error_code = self.dll.Everything_SetSearchW(query)
@@ -330,7 +332,11 @@ class EverythingSearcher:
         if not self.dll.Everything_QueryW(True):  # True表示等待查询完成
             error_code = self.dll.Everything_GetLastError()
             if error_code == self.EVERYTHING_ERROR_IPC:
-                raise RuntimeError("Everything service is not running. Please start Everything.")
+                # Everything可能已退出，重新检查并启动后重试一次
+                self._ensure_everything_running()
+                self.last_liveness_check = time.time()
+                if not self.dll.Everything_QueryW(True):
+                    raise RuntimeError("Everything service is not running. Please start Everything.")
             else:
                 raise RuntimeError(f"Everything query error: {error_code}")
 
@@ -343,33 +349,38 @@ class EverythingSearcher:
         else:
             total_results = result_count  # 如果没有获取总结果数的函数，使用当前结果数
 
-        # 收集结果
+        # 收集结果（复用缓冲区，不为每个结果分配）
         results = []
+        path_buffer = self.path_buffer
+        path_buffer_length = len(path_buffer)
+        date_modified = self.date_modified_buffer
+        date_modified_ref = ctypes.byref(date_modified)
+        size = self.size_buffer
+        size_ref = ctypes.byref(size)
+        get_full_path_name = self.dll.Everything_GetResultFullPathNameW
+        get_date_modified = self.dll.Everything_GetResultDateModified
+        get_size = self.dll.Everything_GetResultSize
+        get_file_name = self.dll.Everything_GetResultFileNameW
         for i in range(result_count):
-            # 获取完整路径
-            path_buffer = ctypes.create_unicode_buffer(260)
-            self.dll.Everything_GetResultFullPathNameW(i, path_buffer, ctypes.sizeof(path_buffer))
+            # 获取完整路径（缓冲区长度按字符数计算）
+            get_full_path_name(i, path_buffer, path_buffer_length)
             path = path_buffer.value
 
             # 获取修改日期
-            date_modified = ctypes.c_longlong()
-            if self.dll.Everything_GetResultDateModified(i, ctypes.byref(date_modified)):
+            if get_date_modified(i, date_modified_ref):
                 # 将Windows文件时间转换为datetime
-                dt = datetime.datetime(1601, 1, 1) + datetime.timedelta(microseconds=date_modified.value // 10)
+                dt = self.FILETIME_EPOCH + datetime.timedelta(microseconds=date_modified.value // 10)
             else:
                 dt = datetime.datetime.min
 
-            # 获取文件大小
-            size = ctypes.c_longlong()
-            if not self.dll.Everything_GetResultSize(i, ctypes.byref(size)):
-                size.value = -1  # 表示文件夹
+            # 获取文件大小，失败表示文件夹
+            file_size = size.value if get_size(i, size_ref) else -1
 
             # 获取文件名
-            filename_ptr = self.dll.Everything_GetResultFileNameW(i)
-            filename = ctypes.wstring_at(filename_ptr)
+            filename = ctypes.wstring_at(get_file_name(i))
 
-            results.append(EverythingResult(
-                size=size.value,
+            results.append(FileSearchResult(
+                size=file_size,
                 date_modified=dt,
                 filename=filename,
                 path=path
@@ -383,23 +394,55 @@ class EverythingSearcher:
         return results, total_results, has_more
 
 
+def create_searcher(backend=BACKEND_EVERYTHING, everything_path=None, db_path=None, config_path=None,
+                    index_path=None, root_list=None):
+    """
+    创建搜索后端
+    :param backend: BACKEND_EVERYTHING / BACKEND_INDEX / BACKEND_AUTO（Everything不可用时使用内置文件索引）
+    :param index_path: 内置文件索引的路径
+    :param root_list: 内置文件索引的目录列表
+    """
+    if backend == BACKEND_INDEX:
+        return FileIndexSearcher(index_path, root_list)
+    if backend == BACKEND_AUTO:
+        try:
+            return EverythingSearcher(everything_path=everything_path, db_path=db_path, config_path=config_path)
+        except (RuntimeError, OSError, AttributeError) as e:
+            # 非Windows系统没有 ctypes.WinDLL
+            print(f"Everything不可用，使用内置文件索引: {e}")
+            return FileIndexSearcher(index_path, root_list)
+    return EverythingSearcher(everything_path=everything_path, db_path=db_path, config_path=config_path)
+
+
 class EverythingStatusThread(QThread):
     """Everything状态检查线程"""
     status_updated = Signal(str, bool)  # 状态消息, 是否就绪
     error_occurred = Signal(str)
+    backend_selected = Signal(str)  # 实际使用的搜索后端
+    index_progress = Signal(str)  # 内置文件索引的进度消息
 
-    def __init__(self, parent=None, everything_path=None, db_path=None, config_path=None):
+    def __init__(self, parent=None, everything_path=None, db_path=None, config_path=None,
+                 backend=BACKEND_EVERYTHING, index_path=None, root_list=None):
         super().__init__(parent)
         self.everything_path = everything_path
         self.db_path = db_path
         self.config_path = config_path
+        self.backend = backend
+        self.index_path = index_path
+        self.root_list = root_list
         self._is_running = True
         self.searcher = None
 
     def run(self):
         try:
-            # 创建Everything搜索器
-            self.searcher = EverythingSearcher(everything_path=self.everything_path, db_path=self.db_path, config_path=self.config_path)
+            # 创建搜索器
+            self.searcher = create_searcher(self.backend, everything_path=self.everything_path, db_path=self.db_path,
+                                            config_path=self.config_path, index_path=self.index_path,
+                                            root_list=self.root_list)
+            self.backend_selected.emit(self.searcher.backend)
+            if self.searcher.backend == BACKEND_INDEX:
+                self.run_index()
+                return
 
             # 检查数据库是否已加载
             if not self.searcher.is_db_loaded():
@@ -421,66 +464,181 @@ class EverythingStatusThread(QThread):
         except Exception as e:
             self.error_occurred.emit(str(e))
 
+    def run_index(self):
+        """建立或增量刷新内置文件索引"""
+        try:
+            is_interrupted = lambda: not self._is_running
+            if self.searcher.is_db_loaded():
+                # 上次的索引可以直接搜索，在后台增量刷新
+                self.status_updated.emit("文件索引已就绪", True)
+                self.searcher.refresh(is_interrupted)
+                return
+            self.index_progress.emit("正在建立文件索引，请稍候...")
+            if self.searcher.refresh(is_interrupted, lambda dir_count, file_count: self.index_progress.emit(
+                    f"正在建立文件索引，已索引 {file_count} 个文件...")):
+                self.status_updated.emit("文件索引已就绪", True)
+        finally:
+            self.searcher.close()
+
     def stop(self):
         self._is_running = False
         self.wait()
 
 
-class EverythingSearchThread(QThread):
-    """Everything搜索线程"""
-    search_finished = Signal(list, int, bool)  # 结果列表, 总结果数, 是否还有更多结果
-    search_error = Signal(str)
+class SearchRequest:
+    """一次搜索请求"""
+
+    def __init__(self, generation, search_text, offset, limit, is_page=False):
+        self.generation = generation  # 请求批次，同一查询的分页请求沿用同一批次
+        self.search_text = search_text
+        self.offset = offset
+        self.limit = limit
+        self.is_page = is_page  # 是否为当前查询的分页请求（否则为新的查询）
+
+
+class FileSearchServiceThread(QThread):
+    """
+    文件搜索服务线程
+
+    常驻线程持有一个搜索后端会话（只加载一次Everything DLL或打开一次文件索引），按顺序处理请求。
+    新的查询会取消尚未执行的旧请求，已过期批次的结果不再发送。
+    查询的全部结果不超过 REFINE_RESULT_LIMIT 时会缓存起来，之后的加载更多直接从缓存中取，
+    新查询只是在旧查询后继续输入时在缓存中过滤，不再访问后端。
+    """
+    search_finished = Signal(int, list, int, bool)  # 请求批次, 结果列表, 总结果数, 是否还有更多结果
+    search_error = Signal(int, str)  # 请求批次, 错误信息
+    page_loaded = Signal(int, int, list)  # 请求批次, 偏移, 结果列表
+    page_error = Signal(int, int, str)  # 请求批次, 偏移, 错误信息
     indexing_status = Signal(bool)  # True表示正在索引，False表示索引完成
 
-    def __init__(self, parent=None, search_text=None, everything_path=None, db_path=None, config_path=None, offset=0, limit=50):
+    # 每次查询从后端获取的结果数（同时是可在本地细化的结果上限）
+    REFINE_RESULT_LIMIT = 1000
+
+    def __init__(self, parent=None, everything_path=None, db_path=None, config_path=None,
+                 backend=BACKEND_EVERYTHING, index_path=None, root_list=None):
         super().__init__(parent)
-        self.search_text = search_text
         self.everything_path = everything_path
         self.db_path = db_path
         self.config_path = config_path
-        self.offset = offset
-        self.limit = limit
+        self.backend = backend
+        self.index_path = index_path
+        self.root_list = root_list
         self._is_running = True
         self.searcher = None
+        self.mutex = QMutex()
+        self.condition = QWaitCondition()
+        self.request_list = []
+        self.generation = 0
+        # 最近一次查询的结果缓存: (查询, 结果列表, 总结果数)
+        self.result_cache = None
+
+    def search(self, search_text, limit=50):
+        """
+        提交新的查询（在GUI线程调用），会取消之前的请求
+        :return: 请求批次
+        """
+        with QMutexLocker(self.mutex):
+            self.generation += 1
+            self.request_list.clear()
+            self.request_list.append(SearchRequest(self.generation, search_text, 0, limit))
+            self.condition.wakeOne()
+            return self.generation
+
+    def load_page(self, generation, search_text, offset, limit):
+        """
+        请求某个批次查询的一页结果（在GUI线程调用），不影响当前批次，可以是第一页
+        :param generation: search 返回的请求批次，已过期时忽略
+        """
+        with QMutexLocker(self.mutex):
+            if self.is_cancelled(generation):
+                return
+            self.request_list.append(SearchRequest(generation, search_text, offset, limit, is_page=True))
+            self.condition.wakeOne()
+
+    def cancel(self):
+        """取消当前查询（在GUI线程调用）"""
+        with QMutexLocker(self.mutex):
+            self.generation += 1
+            self.request_list.clear()
+
+    def is_cancelled(self, generation):
+        return generation != self.generation
 
     def run(self):
         try:
-            # 创建Everything搜索器
-            self.searcher = EverythingSearcher(everything_path=self.everything_path,
-                                               db_path=self.db_path,
-                                               config_path=self.config_path)
-
-            # 检查数据库是否已加载
-            if not self.searcher.is_db_loaded():
-                self.indexing_status.emit(True)
-                # 等待数据库加载完成
-                for _ in range(30):  # 最多等待15秒
+            while True:
+                with QMutexLocker(self.mutex):
+                    while self._is_running and not self.request_list:
+                        self.condition.wait(self.mutex)
                     if not self._is_running:
                         return
-                    time.sleep(0.5)
-                    if self.searcher.is_db_loaded():
-                        break
-                self.indexing_status.emit(False)
-
-            if not self._is_running:
-                return
-
-            # 执行搜索
-            results, total_results, has_more = self.searcher.search(
-                self.search_text,
-                offset=self.offset,
-                max_results=self.limit
-            )
-
-            if not self._is_running:
-                return
-
-            # 发送结果
-            self.search_finished.emit(results, total_results, has_more)
-
-        except Exception as e:
-            self.search_error.emit(str(e))
+                    request = self.request_list.pop(0)
+                if self.is_cancelled(request.generation):
+                    continue
+                try:
+                    if self.searcher is None:
+                        self.open_searcher()
+                    results, total_results, has_more = self.execute(request)
+                except Exception as e:
+                    if self.is_cancelled(request.generation):
+                        continue
+                    if request.is_page:
+                        self.page_error.emit(request.generation, request.offset, str(e))
+                    else:
+                        self.search_error.emit(request.generation, str(e))
+                    continue
+                if self.is_cancelled(request.generation):
+                    continue
+                if request.is_page:
+                    self.page_loaded.emit(request.generation, request.offset, results)
+                else:
+                    self.search_finished.emit(request.generation, results, total_results, has_more)
+        finally:
+            if self.searcher is not None:
+                self.searcher.close()
+
+    def open_searcher(self):
+        """创建搜索后端会话，并等待数据库加载完成"""
+        self.searcher = create_searcher(self.backend, everything_path=self.everything_path, db_path=self.db_path,
+                                        config_path=self.config_path, index_path=self.index_path,
+                                        root_list=self.root_list)
+        if not self.searcher.is_db_loaded():
+            self.indexing_status.emit(True)
+            # 等待数据库加载完成
+            for _ in range(30):  # 最多等待15秒
+                if not self._is_running:
+                    return
+                time.sleep(0.5)
+                if self.searcher.is_db_loaded():
+                    break
+            self.indexing_status.emit(False)
+
+    def execute(self, request):
+        """执行请求，优先使用结果缓存"""
+        if not request.is_page:
+            cache = self.result_cache
+            if cache is not None and len(cache[1]) == cache[2] and is_query_refinement(cache[0], request.search_text):
+                # 旧查询的全部结果都已缓存，只需在其中过滤
+                match = build_name_matcher(request.search_text)
+                result_list = [result for result in cache[1] if match(result.filename)]
+                self.result_cache = (request.search_text, result_list, len(result_list))
+            else:
+                self.result_cache = None
+                result_list, total_results, _ = self.searcher.search(request.search_text, offset=0,
+                                                                     max_results=self.REFINE_RESULT_LIMIT)
+                self.result_cache = (request.search_text, result_list, total_results)
+        cache = self.result_cache
+        if cache is not None and cache[0] == request.search_text:
+            _, result_list, total_results = cache
+            # 请求的范围已缓存（或缓存已包含全部结果）
+            if request.offset + request.limit <= len(result_list) or len(result_list) == total_results:
+                results = result_list[request.offset:request.offset + request.limit]
+                return results, total_results, request.offset + len(results) < total_results
+        return self.searcher.search(request.search_text, offset=request.offset, max_results=request.limit)
 
     def stop(self):
-        self._is_running = False
+        with QMutexLocker(self.mutex):
+            self._is_running = False
+            self.request_list.clear()
+            self.condition.wakeOne()
         self.wait()
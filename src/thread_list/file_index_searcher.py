@@ -0,0 +1,253 @@
+import os
+import re
+import time
+import sqlite3
+import datetime
+
+from src.thread_list.file_search_backend import FileSearchBackend, FileSearchResult, BACKEND_INDEX
+
+
+# 索引格式版本
+FILE_INDEX_VERSION = 1
+# 每扫描多少个目录提交一次
+COMMIT_DIR_COUNT = 500
+# 进度回调的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+# GLOB通配符中需要转义的字符
+GLOB_SPECIAL_CHARS = "*?["
+# 结果数最多统计到此数（统计全部匹配的耗时随文件数增长）
+MAX_COUNT_RESULTS = 10000
+# 结果数不超过此数时用三元组索引取出全部匹配再排序，否则按文件名索引顺序扫描，取够一页即停止
+SORT_RESULT_LIMIT = 2000
+
+
+def escape_glob(text):
+    """转义GLOB中的特殊字符"""
+    return "".join(f"[{char}]" if char in GLOB_SPECIAL_CHARS else char for char in text)
+
+
+def build_glob_patterns(query):
+    """
+    将查询转换为GLOB模式列表（文件名已转为小写保存）
+    包含 * 或 ? 的关键词按通配符匹配整个文件名，其余按子串匹配
+    :return: [(GLOB模式, 是否可使用三元组索引)]
+    """
+    pattern_list = []
+    for term in query.lower().split():
+        if "*" in term or "?" in term:
+            pattern = "".join(char if char in "*?" else escape_glob(char) for char in term)
+        else:
+            pattern = "*" + escape_glob(term) + "*"
+        # 三元组索引至少需要连续3个字符（少于3个字符时FTS5查不到结果，需要逐条匹配）
+        literal_length = max(len(literal) for literal in re.split(r"[*?\[]", term))
+        pattern_list.append((pattern, literal_length >= 3))
+    return pattern_list
+
+
+class FileIndexSearcher(FileSearchBackend):
+    """
+    内置文件索引搜索器（不依赖Everything，可跨平台使用）
+
+    用 os.scandir 扫描索引目录，文件名保存在SQLite中，并用FTS5的trigram分词建立三元组索引，
+    子串和通配符查询只需检查包含关键词全部三元组的文件。
+    结果数只统计到 MAX_COUNT_RESULTS，匹配较多时按文件名索引顺序扫描，取够一页即停止。
+    刷新时只重新扫描修改时间变化的目录（目录内增删、重命名文件会更新目录的修改时间），
+    未变化目录中文件的大小和修改时间可能不是最新的。
+    """
+    backend = BACKEND_INDEX
+
+    def __init__(self, index_path, root_list=None):
+        self.index_path = index_path
+        self.root_list = [os.path.abspath(root) for root in (root_list or [os.path.expanduser("~")])]
+        self.conn = sqlite3.connect(index_path, timeout=30)
+        # 允许扫描的同时在其它线程中搜索
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.use_trigram = True
+        self.count_cache = None  # (查询, 结果数)，翻页时沿用
+        self._init_db()
+
+    def _init_db(self):
+        conn = self.conn
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, FILE_INDEX_VERSION):
+            # 索引格式变化，重新建立
+            conn.executescript("""
+                DROP TABLE IF EXISTS names;
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS dirs;
+                DROP TABLE IF EXISTS meta;
+            """)
+        conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS dirs(id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime INTEGER);
+            CREATE TABLE IF NOT EXISTS files(id INTEGER PRIMARY KEY, dir_id INTEGER, name TEXT, key TEXT,
+                                             size INTEGER, mtime REAL);
+            CREATE INDEX IF NOT EXISTS files_dir_id ON files(dir_id);
+            CREATE INDEX IF NOT EXISTS files_key ON files(key);
+            PRAGMA user_version = {FILE_INDEX_VERSION};
+        """)
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(
+                    key, content='files', content_rowid='id', tokenize='trigram case_sensitive 1');
+                CREATE TRIGGER IF NOT EXISTS files_insert AFTER INSERT ON files BEGIN
+                    INSERT INTO names(rowid, key) VALUES (new.id, new.key);
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_delete AFTER DELETE ON files BEGIN
+                    INSERT INTO names(names, rowid, key) VALUES ('delete', old.id, old.key);
+                END;
+            """)
+        except sqlite3.OperationalError as e:
+            # SQLite不支持FTS5或trigram分词（低于3.34），退化为逐条匹配
+            print(f"文件索引不支持三元组索引，使用逐条匹配: {e}")
+            self.use_trigram = False
+        conn.commit()
+
+    def is_db_loaded(self):
+        """是否已完成过一次完整扫描"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def get_file_count(self):
+        return self.conn.execute("SELECT count(*) FROM files").fetchone()[0]
+
+    def refresh(self, is_interrupted=None, progress_callback=None):
+        """
+        增量刷新索引
+        :param is_interrupted: 返回True时中止（已扫描的部分会保留）
+        :param progress_callback: 进度回调，参数为 (已扫描目录数, 已索引文件数)
+        :return: 是否完成
+        """
+        conn = self.conn
+        known_dir_map = {path: (dir_id, mtime) for dir_id, path, mtime in
+                         conn.execute("SELECT id, path, mtime FROM dirs")}
+        visited_set = set()
+        stack = list(reversed(self.root_list))
+        dir_count = 0
+        last_progress = time.time()
+        while stack:
+            if is_interrupted is not None and is_interrupted():
+                conn.commit()
+                return False
+            path = stack.pop()
+            if path in visited_set:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            visited_set.add(path)
+            record = known_dir_map.get(path)
+            if record is not None and record[1] == mtime:
+                # 目录未变化，沿用已索引的子目录
+                subdir_name_list = [name for (name,) in conn.execute(
+                    "SELECT name FROM files WHERE dir_id = ? AND size < 0", (record[0],))]
+            else:
+                subdir_name_list = self._scan_dir(path, mtime, record)
+            stack.extend(os.path.join(path, name) for name in reversed(subdir_name_list))
+            dir_count += 1
+            if dir_count % COMMIT_DIR_COUNT == 0:
+                conn.commit()
+            if progress_callback is not None and time.time() - last_progress > PROGRESS_INTERVAL:
+                last_progress = time.time()
+                progress_callback(dir_count, self.get_file_count())
+        # 删除已不存在（或不再索引）的目录
+        removed_list = [(dir_id,) for path, (dir_id, _) in known_dir_map.items() if path not in visited_set]
+        conn.executemany("DELETE FROM files WHERE dir_id = ?", removed_list)
+        conn.executemany("DELETE FROM dirs WHERE id = ?", removed_list)
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('complete', '1')")
+        conn.commit()
+        if progress_callback is not None:
+            progress_callback(dir_count, self.get_file_count())
+        return True
+
+    def _scan_dir(self, path, mtime, record):
+        """
+        重新扫描目录的直接子项
+        :return: 子目录名列表
+        """
+        conn = self.conn
+        if record is None:
+            dir_id = conn.execute("INSERT INTO dirs(path, mtime) VALUES (?, ?)", (path, mtime)).lastrowid
+        else:
+            dir_id = record[0]
+            conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (mtime, dir_id))
+            conn.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+        row_list = []
+        subdir_name_list = []
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        # 文件夹的大小记为-1，不进入符号链接指向的目录
+                        size = -1
+                        subdir_name_list.append(entry.name)
+                    else:
+                        size = stat.st_size
+                    row_list.append((dir_id, entry.name, entry.name.lower(), size, stat.st_mtime))
+        except OSError:
+            # 没有权限等
+            pass
+        conn.executemany("INSERT INTO files(dir_id, name, key, size, mtime) VALUES (?, ?, ?, ?, ?)", row_list)
+        return subdir_name_list
+
+    def search(self, query, offset=0, max_results=100):
+        """执行搜索（结果数最多统计到 MAX_COUNT_RESULTS）"""
+        pattern_list = build_glob_patterns(query)
+        if not pattern_list:
+            return [], 0, False
+        index_pattern_list = [pattern for pattern, indexed in pattern_list if indexed and self.use_trigram]
+        scan_pattern_list = [pattern for pattern, indexed in pattern_list if not (indexed and self.use_trigram)]
+        total_results = self.count_results(query, offset, index_pattern_list, scan_pattern_list)
+        if index_pattern_list and total_results <= SORT_RESULT_LIMIT:
+            # 匹配较少：先用三元组索引得到候选文件，再排序
+            condition_list = ["files.id IN (SELECT rowid FROM names WHERE "
+                              + " AND ".join(["key GLOB ?"] * len(index_pattern_list)) + ")"]
+            condition_list.extend(["files.key GLOB ?"] * len(scan_pattern_list))
+            params = index_pattern_list + scan_pattern_list
+        else:
+            # 匹配较多：按文件名索引倒序扫描，不需要对全部匹配排序
+            condition_list = ["files.key GLOB ?"] * len(pattern_list)
+            params = [pattern for pattern, _ in pattern_list]
+        row_list = self.conn.execute(f"""
+            SELECT files.name, files.size, files.mtime, dirs.path FROM files
+            JOIN dirs ON dirs.id = files.dir_id
+            WHERE {" AND ".join(condition_list)}
+            ORDER BY files.key DESC LIMIT ? OFFSET ?
+        """, params + [max_results, offset]).fetchall()
+        results = []
+        for name, size, mtime, dir_path in row_list:
+            try:
+                date_modified = datetime.datetime.fromtimestamp(mtime)
+            except (OverflowError, OSError, ValueError):
+                date_modified = datetime.datetime.min
+            results.append(FileSearchResult(size=size, date_modified=date_modified, filename=name,
+                                            path=os.path.join(dir_path, name)))
+        has_more = (offset + len(results)) < total_results
+        return results, total_results, has_more
+
+    def count_results(self, query, offset, index_pattern_list, scan_pattern_list):
+        """统计结果数，最多统计到 MAX_COUNT_RESULTS（只在请求第一页时统计，翻页时沿用）"""
+        if offset > 0 and self.count_cache is not None and self.count_cache[0] == query:
+            return self.count_cache[1]
+        condition_list = ["files.key GLOB ?"] * len(scan_pattern_list)
+        if index_pattern_list:
+            # 以三元组索引为外层循环逐条读取匹配，达到上限即停止
+            condition_list = ["names.key GLOB ?"] * len(index_pattern_list) + condition_list
+            source = "names JOIN files ON files.id = names.rowid"
+        else:
+            source = "files"
+        total_results = self.conn.execute(f"""
+            SELECT count(*) FROM (SELECT 1 FROM {source} WHERE {" AND ".join(condition_list)} LIMIT ?)
+        """, index_pattern_list + scan_pattern_list + [MAX_COUNT_RESULTS]).fetchone()[0]
+        self.count_cache = (query, total_results)
+        return total_results
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,75 @@
+import os
+from abc import ABC, abstractmethod
+
+
+# 搜索后端
+BACKEND_EVERYTHING = "everything"  # Everything（仅Windows）
+BACKEND_INDEX = "index"  # 内置文件索引
+BACKEND_AUTO = "auto"  # 优先使用Everything，不可用时使用内置文件索引
+
+
+# 包含这些字符的查询可能使用了Everything的搜索语法（或、非、路径、函数等），不在本地细化结果
+REFINE_SPECIAL_CHARS = frozenset('*?"|!<>:\\/')
+
+
+def get_default_backend():
+    """默认的搜索后端"""
+    return BACKEND_AUTO if os.name == "nt" else BACKEND_INDEX
+
+
+def build_name_matcher(query):
+    """构建文件名匹配函数（用于在已有结果中细化查询，只支持不含特殊字符的查询：文件名包含全部关键词）"""
+    term_list = query.lower().split()
+    return lambda filename: all(term in filename.lower() for term in term_list)
+
+
+def is_query_refinement(old_query, new_query):
+    """
+    新查询的结果是否一定是旧查询结果的子集（新查询只是在旧查询后继续输入）
+    不含特殊字符时，延长最后一个关键词或追加关键词都只会缩小结果
+    """
+    old_query = old_query.strip()
+    new_query = new_query.strip()
+    if not old_query or not new_query.startswith(old_query):
+        return False
+    return not (REFINE_SPECIAL_CHARS & set(new_query))
+
+
+class FileSearchResult:
+    """文件搜索结果类"""
+
+    def __init__(self, size, date_modified, filename, path):
+        self.size = size  # 文件夹为-1
+        self.date_modified = date_modified
+        self.filename = filename
+        self.path = path  # 完整路径（包含文件名）
+
+    @property
+    def is_folder(self):
+        return self.size < 0
+
+    def __str__(self):
+        size_str = "(文件夹)" if self.is_folder else f"{self.size} B"
+        return f"{self.filename} ({size_str}) - {self.date_modified:%Y-%m-%d %H:%M:%S}"
+
+
+class FileSearchBackend(ABC):
+    """
+    文件搜索后端接口
+
+    search 返回 (结果列表, 总结果数, 是否还有更多结果)，结果为 FileSearchResult，按文件名降序排列。
+    查询按空白分隔为多个关键词（同时满足），包含 * 或 ? 的关键词按通配符匹配整个文件名，其余按子串匹配，不区分大小写。
+    """
+    backend = ""
+
+    @abstractmethod
+    def is_db_loaded(self):
+        """索引是否可用"""
+
+    @abstractmethod
+    def search(self, query, offset=0, max_results=100):
+        """执行搜索"""
+
+    def close(self):
+        """释放资源"""
+        pass
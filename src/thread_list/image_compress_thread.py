@@ -0,0 +1,116 @@
+# -- coding: utf-8 --
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+from src.ui import image_util
+
+
+class ImageCompressSignals(QObject):
+    # 压缩完成信号(请求id, URL编码后的base64, 错误信息)
+    finished = Signal(int, str, str)
+
+
+class ImageCompressTask(QRunnable):
+    """单个压缩任务（在线程池中运行）"""
+
+    def __init__(self, signals, request_id, image, max_size_bytes):
+        super().__init__()
+        self.signals = signals
+        self.request_id = request_id
+        self.image = image
+        self.max_size_bytes = max_size_bytes
+
+    def run(self):
+        data = ""
+        error = ""
+        try:
+            data = image_util.compress_image_for_baidu(self.image, self.max_size_bytes)
+        except ValueError as e:
+            error = str(e)
+        except Exception:
+            print(f"图片压缩失败:{traceback.format_exc()}")
+            error = "图片压缩失败"
+        # 释放原图
+        self.image = None
+        self.signals.finished.emit(self.request_id, data, error)
+
+
+class ImageCompressService(QObject):
+    """
+    OCR上传图片压缩服务
+
+    压缩与base64编码在线程池中完成，完成后在GUI线程回调。
+    同一 key 的新请求会使旧请求的结果被丢弃。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.signals = ImageCompressSignals()
+        self.signals.finished.connect(self._on_task_finished)
+        self.request_map = {}  # 请求id -> (回调, key)
+        self.key_map = {}  # key -> 请求id
+        self.last_request_id = 0
+
+    def compress(self, image, callback, max_size_bytes=image_util.BAIDU_OCR_MAX_SIZE_BYTES, key=None):
+        """
+        提交压缩请求
+        :param image: QImage或QPixmap（QPixmap会在GUI线程先转换为QImage）
+        :param callback: 完成回调 (base64字符串, 错误信息)，成功时错误信息为空字符串
+        :param max_size_bytes: base64后的大小上限
+        :param key: 请求分组，同一key的新请求会取消旧请求
+        :return: 请求id
+        """
+        if isinstance(image, QPixmap):
+            image = image.toImage()
+        if key is not None:
+            self.cancel_key(key)
+        self.last_request_id += 1
+        request_id = self.last_request_id
+        self.request_map[request_id] = (callback, key)
+        if key is not None:
+            self.key_map[key] = request_id
+        self.thread_pool.start(ImageCompressTask(self.signals, request_id, QImage(image), max_size_bytes))
+        return request_id
+
+    def cancel(self, request_id):
+        """取消请求（结果将被丢弃）"""
+        request = self.request_map.pop(request_id, None)
+        if request is None:
+            return
+        key = request[1]
+        if key is not None and self.key_map.get(key) == request_id:
+            del self.key_map[key]
+
+    def cancel_key(self, key):
+        if key in self.key_map:
+            self.cancel(self.key_map[key])
+
+    def _on_task_finished(self, request_id, data, error):
+        request = self.request_map.pop(request_id, None)
+        if request is None:
+            return
+        callback, key = request
+        if key is not None and self.key_map.get(key) == request_id:
+            del self.key_map[key]
+        try:
+            callback(data, error)
+        except RuntimeError:
+            # 回调对应的控件已被删除
+            pass
+        except Exception:
+            print(f"图片压缩回调失败:{traceback.format_exc()}")
+
+
+image_compress_service = None
+
+
+def get_image_compress_service():
+    """获取全局图片压缩服务（需在GUI线程首次调用）"""
+    global image_compress_service
+    if image_compress_service is None:
+        image_compress_service = ImageCompressService()
+    return image_compress_service
@@ -0,0 +1,193 @@
+# -- coding: utf-8 --
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, QMutex, QMutexLocker, QByteArray, QBuffer, \
+    QIODevice, Qt, QSize
+from PySide6.QtGui import QImage, QImageReader, QPixmap
+
+
+def decode_image(source, target_size=None, aspect_mode=Qt.AspectRatioMode.KeepAspectRatio, allow_upscale=False):
+    """
+    使用QImageReader解码图片，解码时直接缩放到目标尺寸（可在任意线程调用）
+    :param source: 图片数据（bytes/QByteArray）或文件路径
+    :param target_size: 目标尺寸(QSize)，为空时按原尺寸解码
+    :param aspect_mode: 缩放时的宽高比模式
+    :param allow_upscale: 是否允许放大
+    :return: QImage（失败时为空图）
+    """
+    buffer = None
+    if isinstance(source, str):
+        reader = QImageReader(source)
+    else:
+        buffer = QBuffer()
+        buffer.setData(QByteArray(source))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        reader = QImageReader(buffer)
+    reader.setAutoTransform(True)
+    if target_size is not None and not target_size.isEmpty():
+        original_size = reader.size()
+        if original_size.isValid() and not original_size.isEmpty():
+            scaled_size = original_size.scaled(target_size, aspect_mode)
+            if allow_upscale or (scaled_size.width() <= original_size.width()
+                                 and scaled_size.height() <= original_size.height()):
+                reader.setScaledSize(scaled_size)
+    image = reader.read()
+    if buffer is not None:
+        buffer.close()
+    return image
+
+
+class ImageDecodeSignals(QObject):
+    # 解码完成信号(请求id, 图片)
+    finished = Signal(int, QImage)
+
+
+class ImageDecodeTask(QRunnable):
+    """单个解码任务（在线程池中运行）"""
+
+    def __init__(self, service, request_id, source, target_size, aspect_mode, allow_upscale, process_func):
+        super().__init__()
+        self.service = service
+        self.request_id = request_id
+        self.source = source
+        self.target_size = target_size
+        self.aspect_mode = aspect_mode
+        self.allow_upscale = allow_upscale
+        self.process_func = process_func
+        self.signals = service.signals
+
+    def run(self):
+        # 开始前已取消则直接跳过
+        if self.service.is_cancelled(self.request_id):
+            return
+        try:
+            image = decode_image(self.source, self.target_size, self.aspect_mode, self.allow_upscale)
+            if not image.isNull() and self.process_func is not None:
+                image = self.process_func(image)
+        except Exception:
+            print(f"图片解码失败:{traceback.format_exc()}")
+            image = QImage()
+        # 释放原始数据
+        self.source = None
+        self.signals.finished.emit(self.request_id, image)
+
+
+class ImageDecodeService(QObject):
+    """
+    图片解码服务
+
+    解码与缩放在线程池中完成并产出目标尺寸的QImage，GUI线程只做 QPixmap.fromImage。
+    同一 key 的新请求会取消旧请求，也可通过 cancel/cancel_key 主动取消过期请求。
+    """
+
+    def __init__(self, parent=None, max_thread_count=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        if max_thread_count is None:
+            max_thread_count = max(2, QThreadPool.globalInstance().maxThreadCount() - 1)
+        self.thread_pool.setMaxThreadCount(max_thread_count)
+        self.signals = ImageDecodeSignals()
+        self.signals.finished.connect(self._on_task_finished)
+        self.mutex = QMutex()
+        self.active_request_id_set = set()  # 未取消的请求id（工作线程会读取，需要加锁）
+        self.request_map = {}  # 请求id -> (任务, 回调, key, 设备像素比, 是否返回QImage)，仅在GUI线程访问
+        self.key_map = {}  # key -> 请求id
+        self.last_request_id = 0
+
+    def decode(self, source, callback, target_size=None, aspect_mode=Qt.AspectRatioMode.KeepAspectRatio,
+               allow_upscale=False, process_func=None, key=None, device_pixel_ratio=1.0, as_image=False):
+        """
+        提交解码请求
+        :param source: 图片数据（bytes/QByteArray）或文件路径
+        :param callback: 完成回调，参数为QPixmap（as_image时为QImage，失败时为None），在GUI线程调用
+        :param target_size: 目标尺寸（物理像素），为空时按原尺寸解码
+        :param aspect_mode: 缩放时的宽高比模式
+        :param allow_upscale: 是否允许放大
+        :param process_func: 在工作线程中对解码结果做进一步处理的函数 QImage -> QImage
+        :param key: 请求分组，同一key的新请求会取消旧请求（如同一个QLabel）
+        :param device_pixel_ratio: 结果图片的设备像素比
+        :param as_image: 回调参数为QImage（不转换为QPixmap，如交给分块图片视图的大图）
+        :return: 请求id
+        """
+        if key is not None and key in self.key_map:
+            self.cancel(self.key_map[key])
+        if isinstance(source, QByteArray):
+            source = source.data()
+        self.last_request_id += 1
+        request_id = self.last_request_id
+        task = ImageDecodeTask(self, request_id, source, target_size, aspect_mode, allow_upscale, process_func)
+        with QMutexLocker(self.mutex):
+            self.active_request_id_set.add(request_id)
+        self.request_map[request_id] = (task, callback, key, device_pixel_ratio, as_image)
+        if key is not None:
+            self.key_map[key] = request_id
+        self.thread_pool.start(task)
+        return request_id
+
+    def cancel(self, request_id):
+        """取消请求（未开始的任务直接从队列移除，进行中的任务结果将被丢弃）"""
+        with QMutexLocker(self.mutex):
+            self.active_request_id_set.discard(request_id)
+        request = self.request_map.pop(request_id, None)
+        if request is None:
+            return
+        task, _, key, _, _ = request
+        if key is not None and self.key_map.get(key) == request_id:
+            del self.key_map[key]
+        try:
+            self.thread_pool.tryTake(task)
+        except RuntimeError:
+            # 任务已执行完毕并被线程池释放
+            pass
+
+    def cancel_key(self, key):
+        """取消指定key的请求"""
+        if key in self.key_map:
+            self.cancel(self.key_map[key])
+
+    def cancel_all(self):
+        """取消全部请求"""
+        for request_id in list(self.request_map.keys()):
+            self.cancel(request_id)
+
+    def is_cancelled(self, request_id):
+        with QMutexLocker(self.mutex):
+            return request_id not in self.active_request_id_set
+
+    def _on_task_finished(self, request_id, image):
+        with QMutexLocker(self.mutex):
+            self.active_request_id_set.discard(request_id)
+        request = self.request_map.pop(request_id, None)
+        # 已取消的请求丢弃结果
+        if request is None:
+            return
+        _, callback, key, device_pixel_ratio, as_image = request
+        if key is not None and self.key_map.get(key) == request_id:
+            del self.key_map[key]
+        result = None
+        if not image.isNull():
+            result = image if as_image else QPixmap.fromImage(image)
+            result.setDevicePixelRatio(device_pixel_ratio)
+        try:
+            callback(result)
+        except RuntimeError:
+            # 回调对应的控件已被删除
+            pass
+        except Exception:
+            print(f"图片解码回调失败:{traceback.format_exc()}")
+
+
+image_decode_service = None
+
+
+def get_image_decode_service():
+    """获取全局图片解码服务（需在GUI线程首次调用）"""
+    global image_decode_service
+    if image_decode_service is None:
+        image_decode_service = ImageDecodeService()
+    return image_decode_service
+
+
+def scaled_target_size(width, height, device_pixel_ratio=1.0):
+    """根据逻辑尺寸和设备像素比计算物理像素目标尺寸"""
+    return QSize(int(width * device_pixel_ratio), int(height * device_pixel_ratio))
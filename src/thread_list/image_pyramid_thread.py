@@ -0,0 +1,50 @@
+# -- coding: utf-8 --
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, Signal, Qt
+from PySide6.QtGui import QImage
+
+
+# 最小层级的长边不小于该值时继续生成下一层
+PYRAMID_MIN_SIDE = 512
+
+
+class ImagePyramidSignals(QObject):
+    # 层级生成完成信号(任务id, 层级, 图片)，层级n为原图的 1/2^n
+    level_ready = Signal(int, int, QImage)
+    # 任务结束信号(任务id)
+    finished = Signal(int)
+
+
+class ImagePyramidTask(QRunnable):
+    """在线程池中逐级生成图片金字塔（每级为上一级的一半）"""
+
+    def __init__(self, signals, task_id, image, min_side=PYRAMID_MIN_SIDE):
+        super().__init__()
+        self.signals = signals
+        self.task_id = task_id
+        self.image = image
+        self.min_side = min_side
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            image = self.image
+            level = 0
+            while max(image.width(), image.height()) // 2 >= self.min_side and not self.cancelled:
+                image = image.scaled(max(1, image.width() // 2), max(1, image.height() // 2),
+                                     Qt.AspectRatioMode.IgnoreAspectRatio,
+                                     Qt.TransformationMode.SmoothTransformation)
+                level += 1
+                if self.cancelled:
+                    break
+                self.signals.level_ready.emit(self.task_id, level, image)
+        except Exception:
+            print(f"生成图片金字塔失败:{traceback.format_exc()}")
+        finally:
+            # 释放原图引用
+            self.image = None
+            self.signals.finished.emit(self.task_id)
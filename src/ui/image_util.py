@@ -1,10 +1,11 @@
 import base64
-import urllib
+import math
 import uuid
+from collections import OrderedDict
 from typing import Union
 
 from PIL import Image, ImageDraw
-from PySide6 import QtGui, QtCore
+from PySide6 import QtGui
 from PySide6.QtCore import QByteArray, Qt, QPoint, QRectF, QBuffer
 from PySide6.QtGui import QPainter, QPixmap, QColor, QImage, QRegion, QPainterPath
 from PySide6.QtSvg import QSvgRenderer
@@ -12,6 +13,28 @@ from io import BytesIO
 
 from PySide6.QtWidgets import QWidget
 
+# 百度OCR上传限制（base64后的大小）
+BAIDU_OCR_MAX_SIZE_BYTES = 9 * 1024 * 1024
+# 压缩结果达到上限的该比例即可停止
+COMPRESS_TARGET_FILL_RATIO = 0.85
+# 按大小估算缩放比例时预留的余量
+COMPRESS_ESTIMATE_MARGIN = 0.97
+# 压缩时最多的重新编码次数
+COMPRESS_MAX_ENCODE_COUNT = 6
+# 缩放比例的最小搜索步长
+COMPRESS_MIN_SCALE_STEP = 0.02
+# 压缩后的最小边长
+COMPRESS_MIN_SIDE = 15
+# 照片判断：取样网格和颜色比例
+PHOTO_SAMPLE_GRID = 64
+PHOTO_COLOR_RATIO = 0.5
+# 照片使用的JPEG质量
+PHOTO_JPEG_QUALITY = 90
+
+# 变色svg渲染缓存(LRU) {(svg, 目标颜色, 透明度, 缩放, 主题): QPixmap}
+MODIFY_SVG_CACHE_MAX_COUNT = 256
+modify_svg_cache = OrderedDict()
+
 
 def load_light_svg(file_path):
     with open(file_path, 'r') as file:
@@ -26,6 +49,11 @@ def load_dark_svg(file_path):
 
 
 def modify_svg(svg_str: str, target_color_list, alpha: int = 127, scale_factor: float = 1.0, is_dark=False) -> QPixmap:
+    cache_key = (svg_str, tuple(target_color_list), alpha, scale_factor, is_dark)
+    pixmap = modify_svg_cache.get(cache_key)
+    if pixmap is not None:
+        modify_svg_cache.move_to_end(cache_key)
+        return pixmap
     modified_svg = svg_str
     for target_color in target_color_list:
         modified_color = f"rgba({int(target_color[1:3], 16)}, {int(target_color[3:5], 16)}, {int(target_color[5:7], 16)}, {alpha})"
@@ -39,9 +67,17 @@ def modify_svg(svg_str: str, target_color_list, alpha: int = 127, scale_factor:
     painter = QPainter(pixmap)
     renderer.render(painter)
     painter.end()
+    modify_svg_cache[cache_key] = pixmap
+    if len(modify_svg_cache) > MODIFY_SVG_CACHE_MAX_COUNT:
+        modify_svg_cache.popitem(last=False)
     return pixmap
 
 
+def clear_svg_cache():
+    """清空变色svg渲染缓存"""
+    modify_svg_cache.clear()
+
+
 def from_file_to_image(path, radius):
     # 直接打开图片文件
     image = Image.open(path)
@@ -139,6 +175,27 @@ def create_rounded_pixmap(pixmap: QPixmap, radius: Union[int, float]) -> QPixmap
 
     return dest_image
 
+def create_rounded_image(image: QImage, radius: Union[int, float]) -> QImage:
+    """创建带圆角的 QImage（不依赖GUI线程，可在工作线程中调用），圆角参数同 create_rounded_pixmap"""
+    if image.isNull():
+        return image
+    if isinstance(radius, float) and 0 < radius < 1:
+        actual_radius = min(image.width(), image.height()) * radius
+    else:
+        actual_radius = float(radius)
+    dest_image = QImage(image.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    dest_image.fill(Qt.transparent)
+    painter = QPainter(dest_image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    path = QPainterPath()
+    path.addRoundedRect(QRectF(0, 0, image.width(), image.height()), actual_radius, actual_radius)
+    painter.setClipPath(path)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    return dest_image
+
+
 def screenshot(widget):
     try:
         widget.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -200,36 +257,92 @@ def pixmap_to_base64(pixmap: QPixmap, image_format: str = "PNG") -> str:
     return base64_data
 
 
-def compress_pixmap_for_baidu(pixmap: QPixmap, max_size_bytes=9 * 1024 * 1024) -> str:
+def compress_pixmap_for_baidu(pixmap: QPixmap, max_size_bytes=BAIDU_OCR_MAX_SIZE_BYTES) -> str:
     """压缩并编码pixmap，返回base64字符串，直到符合百度上传限制"""
+    return compress_image_for_baidu(pixmap.toImage(), max_size_bytes)
 
-    def encode_pixmap(pixmap_obj):
-        buffer = QtCore.QBuffer()
-        buffer.open(QtCore.QBuffer.ReadWrite)
-        # 你可以调节压缩质量，比如 JPEG 的 70%（但 PNG 通常更适合 OCR）
-        pixmap_obj.save(buffer, "PNG")
-        base64_data = base64.b64encode(buffer.data())
-        return urllib.parse.quote(base64_data), len(base64_data)
 
-    # 首先尝试直接编码
-    encoded_data, size = encode_pixmap(pixmap)
-    if size <= max_size_bytes:
-        return encoded_data
+def encode_image(image: QImage, image_format: str = "PNG", quality: int = -1) -> bytes:
+    """把QImage编码为图片文件数据（可在任意线程调用）"""
+    buffer = QBuffer()
+    buffer.open(QBuffer.OpenModeFlag.ReadWrite)
+    image.save(buffer, image_format, quality)
+    data = buffer.data().data()
+    buffer.close()
+    return data
+
 
-    # 如果太大，缩小尺寸再尝试
-    width = pixmap.width()
-    height = pixmap.height()
-    min_width = 15
-    min_height = 15
+def get_base64_size(data_size: int) -> int:
+    """计算base64编码后的长度"""
+    return (data_size + 2) // 3 * 4
 
-    while width > min_width and height > min_height:
-        width = int(width * 0.9)
-        height = int(height * 0.9)
 
-        scaled = pixmap.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        encoded_data, size = encode_pixmap(scaled)
+def quote_base64(base64_data: bytes) -> str:
+    """对base64做URL编码，base64中只有 + 和 = 需要转义，结果与 urllib.parse.quote 一致"""
+    return base64_data.decode("ascii").replace("+", "%2B").replace("=", "%3D")
 
-        if size <= max_size_bytes:
-            return encoded_data
 
-    raise ValueError("图像压缩后仍超过百度OCR上传限制")
\ No newline at end of file
+def is_photo_image(image: QImage) -> bool:
+    """按网格取样统计颜色数，颜色丰富的认为是照片（截图、文档的颜色通常很少）"""
+    step_x = max(1, image.width() // PHOTO_SAMPLE_GRID)
+    step_y = max(1, image.height() // PHOTO_SAMPLE_GRID)
+    color_set = set()
+    sample_count = 0
+    for y in range(0, image.height(), step_y):
+        for x in range(0, image.width(), step_x):
+            color_set.add(image.pixel(x, y) & 0xFFFFFF)
+            sample_count += 1
+    return sample_count > 0 and len(color_set) > sample_count * PHOTO_COLOR_RATIO
+
+
+def compress_image_for_baidu(image: QImage, max_size_bytes=BAIDU_OCR_MAX_SIZE_BYTES, allow_jpeg=True) -> str:
+    """
+    压缩并编码图片，返回URL编码后的base64字符串（只使用QImage，可在工作线程调用）
+
+    截图、文档使用PNG，照片使用JPEG。超出限制时按"文件大小与像素数近似成正比"估算缩放比例，
+    之后在已知的可用/超限比例之间二分，通常一到两次编码即可得到接近上限的结果。
+    """
+    if image.isNull():
+        raise ValueError("图像为空")
+    if allow_jpeg and is_photo_image(image):
+        image_format, quality = "JPG", PHOTO_JPEG_QUALITY
+    else:
+        image_format, quality = "PNG", -1
+
+    data = encode_image(image, image_format, quality)
+    if get_base64_size(len(data)) <= max_size_bytes:
+        return quote_base64(base64.b64encode(data))
+
+    target_size = max_size_bytes // 4 * 3
+    best_data = None
+    fit_scale = 0.0  # 已知可用的最大比例
+    over_scale = 1.0  # 已知超限的最小比例
+    scale = 1.0
+    size = len(data)
+    for _ in range(COMPRESS_MAX_ENCODE_COUNT):
+        # 按面积估算，留一点余量
+        next_scale = scale * math.sqrt(target_size / size) * COMPRESS_ESTIMATE_MARGIN
+        if not fit_scale < next_scale < over_scale:
+            next_scale = (fit_scale + over_scale) / 2
+        width = int(image.width() * next_scale)
+        height = int(image.height() * next_scale)
+        if width <= COMPRESS_MIN_SIDE or height <= COMPRESS_MIN_SIDE:
+            break
+        scaled = image.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio,
+                              Qt.TransformationMode.SmoothTransformation)
+        data = encode_image(scaled, image_format, quality)
+        scale, size = next_scale, len(data)
+        if get_base64_size(size) <= max_size_bytes:
+            fit_scale = scale
+            best_data = data
+            # 已经足够接近上限
+            if size >= target_size * COMPRESS_TARGET_FILL_RATIO:
+                break
+        else:
+            over_scale = scale
+        if best_data is not None and over_scale - fit_scale < COMPRESS_MIN_SCALE_STEP:
+            break
+
+    if best_data is None:
+        raise ValueError("图像压缩后仍超过百度OCR上传限制")
+    return quote_base64(base64.b64encode(best_data))
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 from PySide6.QtCore import Qt, QByteArray, QSize
 from PySide6.QtGui import QFont, QPixmap, QPainter, QIcon
 from PySide6.QtSvg import QSvgRenderer
@@ -8,7 +10,12 @@ from qframelesswindow import TitleBar
 from qframelesswindow.titlebar import MinimizeButton, MaximizeButton, CloseButton
 
 from src.card.main_card.ChatCard.chat_component.EnterTextEdit.EnterTextEdit import EnterTextEdit
-from src.ui.svg_dict import svg_dict
+from src.ui import image_util
+from src.ui.svg_archive import svg_dict
+
+# svg渲染缓存(LRU) {(svg, 尺寸, 设备像素比, 主题或颜色): QPixmap}
+SVG_PIXMAP_CACHE_MAX_COUNT = 1024
+svg_pixmap_cache = OrderedDict()
 
 '''
 **********************************svg工具 · 开始***************************************
@@ -39,7 +46,12 @@ def get_pixmap_by_path(icon_path: str, size=None, is_dark=False, custom_color=No
     return get_pixmap_by_svg(svg_data=svg_data, size=size, is_dark=is_dark, custom_color=custom_color)
 
 def get_pixmap_by_svg(svg_data: str, size=None, is_dark=False, custom_color=None):
-    """根据svg获取QPixmap"""
+    """根据svg获取QPixmap（按 svg、尺寸、主题/颜色 缓存渲染结果）"""
+    cache_key = (svg_data, size, custom_color if custom_color is not None else is_dark)
+    pixmap = svg_pixmap_cache.get(cache_key)
+    if pixmap is not None:
+        svg_pixmap_cache.move_to_end(cache_key)
+        return pixmap
     if custom_color is not None:
         svg_data = svg_data.replace("black", custom_color)
     else:
@@ -55,7 +67,15 @@ def get_pixmap_by_svg(svg_data: str, size=None, is_dark=False, custom_color=None
     painter = QPainter(pixmap)
     renderer.render(painter)
     painter.end()
+    svg_pixmap_cache[cache_key] = pixmap
+    if len(svg_pixmap_cache) > SVG_PIXMAP_CACHE_MAX_COUNT:
+        svg_pixmap_cache.popitem(last=False)
     return pixmap
+
+def clear_svg_cache():
+    """清空svg渲染缓存（切换主题时调用）"""
+    svg_pixmap_cache.clear()
+    image_util.clear_svg_cache()
 '''
 ↑                                                                                ↑
 **********************************svg工具 · 结束***************************************
@@ -0,0 +1,97 @@
+# -- coding: utf-8 --
+"""
+svg图标归档
+
+归档文件结构：魔数 + 索引长度(4字节，小端) + JSON索引 {分类: {名称: [偏移, 长度]}} + svg数据。
+启动时只读取索引，具体的svg在首次使用时才按偏移读取，取代原先启动时整体导入的 svg_dict.py。
+归档由 dev_util/build_svg_archive.py 生成。
+"""
+import json
+import struct
+import threading
+from collections.abc import Mapping
+
+# 图标归档路径
+SVG_ARCHIVE_PATH = "./static/icon/svg_icon.pack"
+# 归档魔数
+SVG_ARCHIVE_MAGIC = b"ATSVG1\n"
+# 索引长度格式
+SVG_ARCHIVE_INDEX_LENGTH_FORMAT = "<I"
+
+
+class SvgGroup(Mapping):
+    """单个图标分类，按名称读取svg"""
+
+    def __init__(self, archive, icon_type):
+        self.archive = archive
+        self.icon_type = icon_type
+
+    def __getitem__(self, icon_name):
+        return self.archive.get_svg(self.icon_type, icon_name)
+
+    def __iter__(self):
+        return iter(self.archive.get_index()[self.icon_type])
+
+    def __len__(self):
+        return len(self.archive.get_index()[self.icon_type])
+
+
+class SvgArchive(Mapping):
+    """
+    按需加载的svg图标归档
+    查找方式与原 svg_dict 相同：svg_dict[分类][名称] -> svg字符串
+    """
+
+    def __init__(self, archive_path=SVG_ARCHIVE_PATH):
+        self.archive_path = archive_path
+        self.file = None
+        self.index = None  # {分类: {名称: [偏移, 长度]}}
+        self.data_offset = 0
+        self.lock = threading.Lock()
+
+    def get_index(self):
+        """首次访问时打开归档并读取索引"""
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.file = open(self.archive_path, "rb")
+                    magic = self.file.read(len(SVG_ARCHIVE_MAGIC))
+                    if magic != SVG_ARCHIVE_MAGIC:
+                        self.file.close()
+                        self.file = None
+                        raise ValueError(f"无效的图标归档: {self.archive_path}")
+                    length_size = struct.calcsize(SVG_ARCHIVE_INDEX_LENGTH_FORMAT)
+                    index_length, = struct.unpack(SVG_ARCHIVE_INDEX_LENGTH_FORMAT, self.file.read(length_size))
+                    index = json.loads(self.file.read(index_length).decode("utf-8"))
+                    self.data_offset = len(SVG_ARCHIVE_MAGIC) + length_size + index_length
+                    self.index = index
+        return self.index
+
+    def get_svg(self, icon_type, icon_name):
+        """读取svg字符串，不存在时抛出KeyError"""
+        offset, length = self.get_index()[icon_type][icon_name]
+        with self.lock:
+            self.file.seek(self.data_offset + offset)
+            data = self.file.read(length)
+        return data.decode("utf-8")
+
+    def __getitem__(self, icon_type):
+        if icon_type not in self.get_index():
+            raise KeyError(icon_type)
+        return SvgGroup(self, icon_type)
+
+    def __iter__(self):
+        return iter(self.get_index())
+
+    def __len__(self):
+        return len(self.get_index())
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            self.file = None
+            self.index = None
+
+
+svg_dict = SvgArchive()
@@ -140,6 +140,17 @@ def get_app_data_everything_config_path(app_data_path):
         return None  # 或抛出异常
     return os.path.join(str(everything_dir), "everything.ini")
 
+def get_app_data_file_index_path(app_data_path):
+    # 跨平台安全拼接路径
+    index_dir = os.path.join(app_data_path, "DB")
+    print(f"程序文件索引目录:{index_dir}")
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+    except OSError as e:
+        print(f"无法创建目录 {index_dir}: {e}")
+        return None  # 或抛出异常
+    return os.path.join(str(index_dir), "file_index.db")
+
 def get_app_data_plugin_path(app_data_path):
     # 跨平台安全拼接路径
     plugin_dir = os.path.join(app_data_path, "Plugin")